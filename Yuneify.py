@@ -1,12 +1,14 @@
 import sys
 import os
 from PySide6.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QStackedWidget, QLabel, QHBoxLayout, QTextBrowser
-from PySide6.QtCore import Qt, QThread, Signal, QTimer
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap
 from modules.Yuneify_Settings import KeybindUI
 from modules.Yuneify_ContextWheel import main as context_wheel_main
 from modules.Yuneify_AI import MainApplication as yuneify_ai_main
 from modules.utils import setup_logger
+from modules.transport import connect_backend
+from modules.reaper_events import get_watcher, ReaperEvent
 import subprocess
 import shutil
 
@@ -14,22 +16,6 @@ def initialize_logger():
     """Initialize a logger with a unique filename for each session."""
     return setup_logger('Yuneify', 'yuneify')
 
-class DebugThread(QThread):
-    log_signal = Signal(str)
-
-    def __init__(self):
-        super().__init__()
-        self._running = True
-
-    def run(self):
-        while self._running:
-            self.log_signal.emit("Checking state...")
-            self.sleep(2)
-
-    def stop(self):
-        self._running = False
-        self.wait()  # Wait for the thread to finish
-
 class DebugWindow(QWidget):
     def __init__(self, logger):
         super().__init__()
@@ -49,6 +35,10 @@ class DebugWindow(QWidget):
     def update_log(self, message):
         self.text_browser.append(message)
 
+    def log_event(self, event):
+        """Log every event the shared REAPER watcher publishes"""
+        self.update_log(f"REAPER: {event.name}")
+
     def read_logs(self):
         base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules', 'logs')
         log_files = [f for f in os.listdir(base_path) if f.endswith('.log')]
@@ -77,9 +67,8 @@ class MainMenu(QMainWindow):
         self.setStyleSheet("background-color: #1E1E1E; color: #E0E0E0;")
         self.debug_window = DebugWindow(self.logger)
         self.debug_window.show()
-        self.debug_thread = DebugThread()
-        self.debug_thread.log_signal.connect(self.debug_window.update_log)
-        self.debug_thread.start()
+        # Logs what the shared watcher sees instead of a thread printing on a timer
+        get_watcher().subscribe(ReaperEvent, self.debug_window.log_event)
         self.main_widget = QWidget(self)
         self.setCentralWidget(self.main_widget)
         self.layout = QVBoxLayout(self.main_widget)
@@ -96,8 +85,7 @@ class MainMenu(QMainWindow):
         self.destroyed.connect(self.cleanup)
 
     def cleanup(self):
-        if self.debug_thread.isRunning():
-            self.debug_thread.stop()  # Ensure the thread is stopped
+        get_watcher().unsubscribe(ReaperEvent, self.debug_window.log_event)
 
     def get_resource_path(self, relative_path):
         # Directly return the absolute path in the expected folder
@@ -190,6 +178,8 @@ class MainMenu(QMainWindow):
 
 def main():
     logger = initialize_logger()
+    if connect_backend():
+        logger.info("Connected to the REAPER backend from the reaper_backend setting.")
     app = QApplication([])
     window = MainMenu(logger)
     window.show()
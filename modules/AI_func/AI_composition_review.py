@@ -9,6 +9,7 @@ from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QPushB
 from PySide6.QtGui import QAction
 from modules.styles import apply_dark_theme  # Import the stylesheet function
 from PySide6.QtCore import Qt, QTimer
+from modules.reaper_async import get_reaper_io, call, offload, OperationsBar
 
 class CopyableLabel(QWidget):
     """Reusable component with label and copy button"""
@@ -38,6 +39,8 @@ class CompositionSuggestionApp(QWidget):
         super().__init__()
         self.initUI()
         self.composition_suggester = AICompositionSuggester()
+        # REAPER reads and model requests run on the shared I/O thread
+        self.io = get_reaper_io()
 
     def initUI(self):
         self.setWindowTitle('Composition Suggestion')
@@ -59,6 +62,7 @@ class CompositionSuggestionApp(QWidget):
         self.tabs.addTab(self.similarity_tab, "Similarity Check")
         
         layout.addWidget(self.tabs)
+        layout.addWidget(OperationsBar(self))
 
         # Replace all QLabel feedbacks with CopyableLabel
         self.chord_feedback_label = CopyableLabel()
@@ -89,18 +93,27 @@ class CompositionSuggestionApp(QWidget):
         return tab
 
     def async_operation(func):
-        """Decorator to handle UI state during async operations."""
+        """Decorator to disable the tabs until the operation a handler scheduled finishes."""
         def wrapper(self, *args, **kwargs):
+            self.tabs.setEnabled(False)
+            operation = None
             try:
-                self.tabs.setEnabled(False)
-                [btn.setEnabled(False) for btn in self.buttons]
-                result = func(self, *args, **kwargs)
-                return result
+                operation = func(self, *args, **kwargs)
             finally:
-                self.tabs.setEnabled(True)
-                [btn.setEnabled(True) for btn in self.buttons]
+                if operation is None:
+                    self.tabs.setEnabled(True)
+                else:
+                    # Re-enabled once the operation is finished, whichever way it ends
+                    self.pending_operation = operation
+                    self.io.operations_changed.connect(self._enable_when_finished)
+            return operation
         return wrapper
 
+    def _enable_when_finished(self):
+        if self.pending_operation.finished:
+            self.tabs.setEnabled(True)
+            self.io.operations_changed.disconnect(self._enable_when_finished)
+
     @async_operation
     def on_get_suggestions(self, mode):
         # Set loading text
@@ -114,8 +127,8 @@ class CompositionSuggestionApp(QWidget):
 
         # Get suggestions
         self.composition_suggester.custom_context = self.get_custom_context(mode)
-        suggestions = self.composition_suggester.generate_suggestions(mode)
-        feedback_labels[mode].setText(suggestions)
+        return self.io.submit(self.composition_suggester.suggest(mode), "Get Suggestions",
+                              done=feedback_labels[mode].setText)
 
     def get_custom_context(self, mode):
         if mode == 'chord':
@@ -134,10 +147,22 @@ class AICompositionSuggester:
         try:
             note_infos = self.get_midi_data()
             return self._generate_suggestion(mode, note_infos)
-        except (AIModelError, ValueError) as e:  # Combine related exceptions
-            return f"⚠️ Error: {str(e)}"
         except Exception as e:
-            return f"⚠️ Unexpected Error: {str(e)}"
+            return self._error_message(e)
+
+    async def suggest(self, mode):
+        """generate_suggestions() for the REAPER I/O thread; the model request runs off it"""
+        try:
+            note_infos = await call(self.get_midi_data)
+            return await offload(self._generate_suggestion, mode, note_infos)
+        except Exception as e:
+            return self._error_message(e)
+
+    @staticmethod
+    def _error_message(e):
+        if isinstance(e, (AIModelError, ValueError)):  # Combine related exceptions
+            return f"⚠️ Error: {str(e)}"
+        return f"⚠️ Unexpected Error: {str(e)}"
 
     def get_midi_data(self):
         item = self.project.get_selected_item(0)
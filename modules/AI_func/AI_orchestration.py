@@ -7,6 +7,8 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton,
 from PySide6.QtCore import Qt
 from modules.AI_func.ai_models import get_model_handler, AIModelError
 from modules.styles import apply_dark_theme
+from modules.transport import session
+from modules.reaper_async import get_reaper_io, call, offload, OperationsBar
 
 class CopyableLabel(QWidget):
     """Reusable component with label and copy button"""
@@ -37,6 +39,8 @@ class OrchestrationConfigurator(QWidget):
         self.project = reapy.Project()
         self.model = get_model_handler('openai')
         self.suggestions = ""  # Initialize empty suggestions attribute
+        # REAPER reads and model requests run on the shared I/O thread
+        self.io = get_reaper_io()
         self.init_ui()
         
     def init_ui(self):
@@ -83,6 +87,7 @@ class OrchestrationConfigurator(QWidget):
         layout.addWidget(self.suggest_button)
         layout.addWidget(self.apply_button)
         layout.addWidget(self.feedback_label)
+        layout.addWidget(OperationsBar(self))
         
         self.setLayout(layout)
         apply_dark_theme(self)
@@ -93,29 +98,36 @@ class OrchestrationConfigurator(QWidget):
         self.apply_button.clicked.connect(self.apply_suggestions)
 
     def analyze_orchestration(self):
-        try:
-            midi_data = self.get_midi_data()
-            analysis = self.model.generate_text(
+        style = self.style_input.text()
+        self.feedback_label.setText("Analyzing orchestration...")
+
+        async def analyze():
+            midi_data = await call(self.get_midi_data)
+            return await offload(
+                self.model.generate_text,
                 system_prompt="Orchestration analysis expert",
-                user_prompt=f"Analyze current orchestration for:\n- Instrument balance\n- Range conflicts\n- Dynamic effectiveness\nStyle: {self.style_input.text()}",
+                user_prompt=f"Analyze current orchestration for:\n- Instrument balance\n- Range conflicts\n- Dynamic effectiveness\nStyle: {style}",
                 midi_data=midi_data,
                 temperature=0.4,
                 max_tokens=500
             )
-            self.feedback_label.setText(f"```markdown\n{analysis}\n```")
-        except Exception as e:
-            self.feedback_label.setText(f"⚠️ Error: {str(e)}")
+
+        self.io.submit(analyze(), "Analyze Orchestration",
+                       done=lambda analysis: self.feedback_label.setText(f"```markdown\n{analysis}\n```"),
+                       failed=lambda e: self.feedback_label.setText(f"⚠️ Error: {str(e)}"))
 
     def generate_suggestions(self):
-        try:
-            midi_data = self.get_midi_data()
-            params = {
-                'ensemble_size': self.ensemble_slider.value(),
-                'complexity': self.complexity_combo.currentText().lower(),
-                'style': self.style_input.text()
-            }
-            
-            response = self.model.generate_text(
+        params = {
+            'ensemble_size': self.ensemble_slider.value(),
+            'complexity': self.complexity_combo.currentText().lower(),
+            'style': self.style_input.text()
+        }
+        self.feedback_label.setText("Generating orchestration plan...")
+
+        async def generate():
+            midi_data = await call(self.get_midi_data)
+            return await offload(
+                self.model.generate_text,
                 system_prompt="Orchestration AI generating full score suggestions",
                 user_prompt=(
                     f"Create orchestration for:\n"
@@ -128,7 +140,8 @@ class OrchestrationConfigurator(QWidget):
                 temperature=0.7,
                 max_tokens=2000
             )
-            
+
+        def done(response):
             # Directly use the pre-validated JSON response
             self.suggestions = response
             try:
@@ -139,52 +152,75 @@ class OrchestrationConfigurator(QWidget):
                 self.feedback_label.setText(f"```markdown\n{formatted_response}\n```")
             except json.JSONDecodeError:
                 self.feedback_label.setText(f"⚠️ Error: Received valid JSON but failed to parse structure\n{response[:200]}...")
-            
-        except AIModelError as e:
-            self.feedback_label.setText(f"⚠️ AI Error: {str(e)}")
-        except Exception as e:
-            self.feedback_label.setText(f"⚠️ Unexpected Error: {str(e)}")
+
+        def failed(e):
+            if isinstance(e, AIModelError):
+                self.feedback_label.setText(f"⚠️ AI Error: {str(e)}")
+            else:
+                self.feedback_label.setText(f"⚠️ Unexpected Error: {str(e)}")
+
+        self.io.submit(generate(), "Generate Orchestration Plan", done=done, failed=failed)
 
     def apply_suggestions(self):
         try:
             self.feedback_label.setText("Applying orchestration suggestions...")
-            
-            json_blocks = re.findall(r'```(?:json)?\s*(\{.*?\})\s*```', self.suggestions, re.DOTALL)
-            if not json_blocks:
-                json_blocks = re.findall(r'\{.*?\}', self.suggestions, re.DOTALL)
-            
-            if not json_blocks:
-                raise ValueError("No valid JSON found in AI response")
+            parsed_notes = self.parse_suggestions()
+        except ValueError as e:
+            self.feedback_label.setText(f"⚠️ Validation Error: {str(e)}")
+            return
 
-            parsed_notes = []
-            instrument_channels = {}  # Track instrument to channel mapping
-            
-            for json_str in json_blocks:
-                try:
-                    data = json.loads(json_str)
-                    # Handle the orchestration object structure
-                    if 'orchestration' in data:
-                        orch_data = data['orchestration']
-                        # Create instrument to channel mapping
-                        instrument_channels = {
-                            inst['name']: idx for idx, inst in enumerate(orch_data.get('instruments', []))
-                        }
-                        # Process notes with instrument mapping
-                        for note in orch_data.get('notes', []):
-                            if 'instrument' in note:
-                                note['channel'] = instrument_channels.get(note['instrument'], 0)
-                            parsed_notes.append(note)
-                    elif 'midi_notes' in data:
-                        parsed_notes.extend(data['midi_notes'])
+        def failed(e):
+            if isinstance(e, ValueError):
+                self.feedback_label.setText(f"⚠️ Validation Error: {str(e)}")
+            else:
+                self.feedback_label.setText(f"⚠️ Unexpected Error: {str(e)}")
 
-                except json.JSONDecodeError as e:
-                    error_context = f"JSON error at line {e.lineno}: {e.msg}\n{json_str[max(0,e.pos-50):e.pos+50]}"
-                    self.feedback_label.setText(f"⚠️ JSON Error: {error_context}")
-                    continue
+        self.io.run(self.write_notes, parsed_notes, description="Apply Orchestration",
+                    done=lambda _: self.feedback_label.setText("Successfully applied orchestration suggestions!"),
+                    failed=failed)
+
+    def parse_suggestions(self):
+        """MIDI notes of every JSON block in the last suggestions, channels mapped per instrument"""
+        json_blocks = re.findall(r'```(?:json)?\s*(\{.*?\})\s*```', self.suggestions, re.DOTALL)
+        if not json_blocks:
+            json_blocks = re.findall(r'\{.*?\}', self.suggestions, re.DOTALL)
+        
+        if not json_blocks:
+            raise ValueError("No valid JSON found in AI response")
 
-            if not parsed_notes:
-                raise ValueError("No valid MIDI notes found in any JSON blocks")
+        parsed_notes = []
+        instrument_channels = {}  # Track instrument to channel mapping
+        
+        for json_str in json_blocks:
+            try:
+                data = json.loads(json_str)
+                # Handle the orchestration object structure
+                if 'orchestration' in data:
+                    orch_data = data['orchestration']
+                    # Create instrument to channel mapping
+                    instrument_channels = {
+                        inst['name']: idx for idx, inst in enumerate(orch_data.get('instruments', []))
+                    }
+                    # Process notes with instrument mapping
+                    for note in orch_data.get('notes', []):
+                        if 'instrument' in note:
+                            note['channel'] = instrument_channels.get(note['instrument'], 0)
+                        parsed_notes.append(note)
+                elif 'midi_notes' in data:
+                    parsed_notes.extend(data['midi_notes'])
 
+            except json.JSONDecodeError as e:
+                error_context = f"JSON error at line {e.lineno}: {e.msg}\n{json_str[max(0,e.pos-50):e.pos+50]}"
+                self.feedback_label.setText(f"⚠️ JSON Error: {error_context}")
+                continue
+
+        if not parsed_notes:
+            raise ValueError("No valid MIDI notes found in any JSON blocks")
+        return parsed_notes
+
+    def write_notes(self, parsed_notes):
+        """Replace the notes of the selected item's active take"""
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 raise ValueError("No MIDI item selected")
@@ -208,15 +244,6 @@ class OrchestrationConfigurator(QWidget):
                     selected=False,
                     muted=False
                 )
-            
-            self.feedback_label.setText("Successfully applied orchestration suggestions!")
-            
-        except json.JSONDecodeError:
-            self.feedback_label.setText("⚠️ Error: Invalid JSON format in AI response")
-        except ValueError as e:
-            self.feedback_label.setText(f"⚠️ Validation Error: {str(e)}")
-        except Exception as e:
-            self.feedback_label.setText(f"⚠️ Unexpected Error: {str(e)}")
 
     def get_midi_data(self):
         item = self.project.get_selected_item(0)
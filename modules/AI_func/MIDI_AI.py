@@ -17,6 +17,8 @@ from PySide6.QtGui import QIcon, QFont
 from modules.styles import apply_dark_theme  # Import the stylesheet function
 from modules.AI_func.ai_models import MidiNote, OrchestrationPlan
 from modules.AI_func.ai_models import get_model_handler
+from modules.transport import session
+from modules.reaper_async import get_reaper_io, call, offload
 from typing import Dict
 
 
@@ -30,6 +32,8 @@ class AIOrchestrationStyleSelector(QWidget):
         super().__init__()
         self.initUI()
         self.midi_orchestrator = AIMidiOrchestrator()  # Initialize orchestrator
+        # REAPER reads and the model request run on the shared I/O thread
+        self.io = get_reaper_io()
 
     def initUI(self):
         self.setWindowTitle('AI Orchestration Style')
@@ -140,7 +144,9 @@ class AIOrchestrationStyleSelector(QWidget):
         # Update the orchestrator with the selected style and custom instructions
         self.midi_orchestrator.style = selected_style
         self.midi_orchestrator.custom_instructions = custom_instructions
-        self.midi_orchestrator.run()
+        self.io.submit(self.midi_orchestrator.orchestrate(), f"Orchestrate '{selected_style}'",
+                       done=lambda _: self.status_bar.showMessage(f"Orchestrated '{selected_style}'", 3000),
+                       failed=lambda e: self.status_bar.showMessage(f"Orchestration failed: {e}", 3000))
 
     def show_prompt_examples(self):
         examples = [
@@ -159,7 +165,7 @@ class AIOrchestrationStyleSelector(QWidget):
 # Class to handle MIDI pitch transposition and orchestration
 class AIMidiOrchestrator:
     def __init__(self, style='Default', custom_instructions='', model_name='openai'):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
         self.style = style
         self.custom_instructions = custom_instructions
@@ -167,27 +173,44 @@ class AIMidiOrchestrator:
 
     # Main method to run the MIDI transposition and orchestration
     def run(self):
-        with reapy.inside_reaper():
-            item = self.project.get_selected_item(0)
-            if not item:
-                print("No selected item.")
+        with session():
+            selected = self.read_selected_notes()
+            if selected is None:
                 return
+            take, note_infos = selected
 
-            take = item.active_take
-            if not take:
-                print("No active take.")
-                return
+            orchestrated_notes = self.send_notes_to_ai(note_infos)
+            self.import_orchestrated_notes(take, orchestrated_notes)
 
-            notes = take.notes
-            if not notes:
-                print("No MIDI notes.")
-                return
+    async def orchestrate(self):
+        """run() for the REAPER I/O thread; REAPER is free while the model answers"""
+        selected = await call(self.read_selected_notes)
+        if selected is None:
+            return
+        take, note_infos = selected
 
-            print(f"Found {len(notes)} notes.")
-            note_infos = [note.infos for note in notes]
+        orchestrated_notes = await offload(self.send_notes_to_ai, note_infos)
+        await call(self.import_orchestrated_notes, take, orchestrated_notes)
 
-            orchestrated_notes = self.send_notes_to_ai(note_infos)
-            self.import_orchestrated_notes(take, orchestrated_notes)
+    def read_selected_notes(self):
+        """(take, note infos) of the selected item's active take, or None"""
+        item = self.project.get_selected_item(0)
+        if not item:
+            print("No selected item.")
+            return None
+
+        take = item.active_take
+        if not take:
+            print("No active take.")
+            return None
+
+        notes = take.notes
+        if not notes:
+            print("No MIDI notes.")
+            return None
+
+        print(f"Found {len(notes)} notes.")
+        return take, [note.infos for note in notes]
 
     def send_notes_to_ai(self, note_infos):
         """Send MIDI notes to AI for orchestration"""
@@ -262,7 +285,7 @@ class AIMidiOrchestrator:
 
     def import_orchestrated_notes(self, take, plan: OrchestrationPlan):
         """Import orchestrated notes with instrument mapping"""
-        with reapy.inside_reaper():
+        with session():
             # Get reference to the original track
             original_track = take.track
             
@@ -1,13 +1,20 @@
+import numpy as np
 import reapy
-from reapy import reascript_api as RPR
+from modules.take_buffer import CONTROL_CHANGE, get_ticks_per_quarter
+from modules.cc_curve import (
+    CCCurve, curve_values, density_positions, drop_repeats, thin_lane, resample_lane
+)
+from modules.cc_lane_index import CCLaneIndex
+from modules.edit_transaction import MidiEditTransaction
+from modules.transport import session
 
 class CCOperations:
     def __init__(self):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
 
     def get_active_take(self):
-        with reapy.inside_reaper():
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 print("No selected item.")
@@ -20,120 +27,145 @@ class CCOperations:
 
             return take
 
-    def apply_curve(self, cc_num, curve_points):
-        """Apply CC curve to selected events"""
+    def apply_curve(self, cc_num, curve_points, shape="linear", blend=1.0, density=None, channel=0):
+        """Apply CC curve to the take's CC events
+
+        curve_points are (position, value) pairs with values in 0-127; positions
+        are stretched over the take. With a density (events per quarter note)
+        the lane is regenerated along the curve instead of reshaping the
+        existing events; blend mixes the curve with the original values.
+        """
         take = self.get_active_take()
         if not take:
-            return
-
-        # Get all CC events for the specified CC number
-        cc_events = [evt for evt in take.get_cc_events() 
-                    if evt.cc_number == cc_num]
-        
-        if not cc_events:
-            print(f"No CC{cc_num} events found.")
-            return
-
-        print(f"Applying curve to {len(cc_events)} CC{cc_num} events.")
-        
-        # Normalize curve points to 0-1 range
-        x_vals = [p[0] for p in curve_points]
-        y_vals = [p[1] for p in curve_points]
-        x_min, x_max = min(x_vals), max(x_vals)
-        y_min, y_max = min(y_vals), max(y_vals)
-        
-        # Create interpolation function
-        x_normalized = [(x - x_min) / (x_max - x_min) for x in x_vals]
-        y_normalized = [(y - y_min) / (y_max - y_min) for y in y_vals]
-        
-        # Apply curve to each CC event
-        for evt in cc_events:
-            # Get normalized position in time
-            pos = evt.position / take.length
-            
-            # Find closest curve points
-            prev_idx = 0
-            while prev_idx < len(x_normalized) - 1 and x_normalized[prev_idx + 1] < pos:
-                prev_idx += 1
-                
-            if prev_idx >= len(x_normalized) - 1:
-                new_value = y_normalized[-1]
-            else:
-                # Linear interpolation between points
-                x0, x1 = x_normalized[prev_idx], x_normalized[prev_idx + 1]
-                y0, y1 = y_normalized[prev_idx], y_normalized[prev_idx + 1]
-                new_value = y0 + (y1 - y0) * (pos - x0) / (x1 - x0)
-            
-            # Scale back to 0-127 range
-            new_cc_value = int(new_value * 127)
-            new_cc_value = min(max(new_cc_value, 0), 127)
-            
-            # Update CC event
-            RPR.MIDI_SetCC(
-                take.id,
-                evt.index,
-                evt.selected,
-                evt.muted,
-                evt.position,
-                evt.channel,
-                evt.cc_number,
-                new_cc_value,
-                False
-            )
-            print(f"Updated CC{cc_num} at position {evt.position} to value {new_cc_value}.")
-
-    def adjust_cc_bulk(self, delta, overlay):
-        """Bulk adjust CC values with undo support"""
+            return 0
+
         try:
-            project = reapy.Project()
-            item = project.get_selected_item(0)
-            if not item or not item.active_take or not item.active_take.is_midi:
-                return
+            curve = CCCurve.from_points(curve_points, shape)
+        except ValueError as e:
+            print(e)
+            return 0
 
-            take = item.active_take
-            selected_cc = [cc for cc in take.cc_events if cc.selected]
-            if not selected_cc:
-                return
+        with MidiEditTransaction(f"Apply CC{cc_num} Curve", self.project) as txn:
+            buffer = txn.open(take)
+
+            # Get all CC events for the specified CC number
+            cc_events = [evt for evt in buffer.cc_events
+                        if evt.status == CONTROL_CHANGE and evt.msg[1] == cc_num]
+            take_length = buffer.length or 1
+            positions = np.array([evt.ppq for evt in cc_events], dtype=np.float64)
+            original = np.array([evt.msg[2] for evt in cc_events], dtype=np.float64)
+
+            if density:
+                lane = [evt for evt in cc_events if evt.channel == channel]
+                lane_positions = np.array([evt.ppq for evt in lane], dtype=np.float64)
+                lane_values = np.array([evt.msg[2] for evt in lane], dtype=np.float64)
+                new_positions = density_positions(0, take_length, get_ticks_per_quarter(take), density)
+                # Blend against the value the old lane held at each new position
+                held = (np.interp(new_positions, lane_positions, lane_values)
+                        if len(lane) else np.zeros(len(new_positions)))
+                values = curve_values(curve, new_positions, 0, take_length, held, blend)
+                new_positions, values = drop_repeats(new_positions, values)
+
+                buffer.remove_events(lane)
+                for ppq, value in zip(new_positions, values):
+                    buffer.add_cc(ppq, cc_num, value, channel)
+                print(f"Generated {len(values)} CC{cc_num} events.")
+                return len(values)
+
+            if not cc_events:
+                print(f"No CC{cc_num} events found.")
+                return 0
+
+            print(f"Applying curve to {len(cc_events)} CC{cc_num} events.")
+            values = curve_values(curve, positions, 0, take_length, original, blend)
+            for evt, value in zip(cc_events, values):
+                evt.msg[2] = value
+        return len(cc_events)
+
+    def thin_cc(self, tolerance=1.0, cc_num=None):
+        """Thin every CC lane (or one CC number) with RDP, returning (before, after) event counts"""
+        take = self.get_active_take()
+        if not take:
+            return 0, 0
+
+        with MidiEditTransaction("Thin CC Events", self.project) as txn:
+            buffer = txn.open(take)
+            before = after = 0
+            dropped = []
+            index = CCLaneIndex(buffer)
+            for lane in index.lanes.values() if cc_num is None else index.lanes_for(cc_num):
+                keep = thin_lane(lane.positions, lane.values, tolerance)
+                dropped.extend(evt for evt, kept in zip(lane.events, keep) if not kept)
+                before += len(lane)
+                after += int(keep.sum())
+            buffer.remove_events(dropped)
+
+        print(f"Thinned CC events from {before} to {after}.")
+        return before, after
 
-            with reapy.undo_block(f"Adjust CC {'+' if delta > 0 else '-'}{abs(delta)}"):
+    def resample_cc(self, division=16, cc_num=None, interpolate=True):
+        """Resample every CC lane (or one CC number) to division events per quarter note
+
+        Returns (before, after) event counts.
+        """
+        take = self.get_active_take()
+        if not take:
+            return 0, 0
+
+        step = get_ticks_per_quarter(take) / division
+        with MidiEditTransaction("Resample CC Events", self.project) as txn:
+            buffer = txn.open(take)
+            before = after = 0
+            replaced, resampled = [], []
+            index = CCLaneIndex(buffer)
+            for lane in index.lanes.values() if cc_num is None else index.lanes_for(cc_num):
+                if len(lane) < 2:
+                    continue
+                new_positions, new_values = resample_lane(lane.positions, lane.values, step, interpolate)
+                selected = bool(lane.selected.any())
+                replaced.extend(lane.events)
+                resampled.extend((ppq, lane.number, value, lane.channel, selected)
+                                 for ppq, value in zip(new_positions, new_values))
+                before += len(lane)
+                after += len(new_values)
+
+            buffer.remove_events(replaced)
+            for ppq, number, value, channel, selected in resampled:
+                buffer.add_cc(ppq, number, value, channel, selected)
+
+        print(f"Resampled CC events from {before} to {after}.")
+        return before, after
+
+    def adjust_cc_bulk(self, delta, overlay=None):
+        """Bulk adjust CC values with undo support; returns how many CC events changed"""
+        try:
+            take = self.get_active_take()
+            if not take or not take.is_midi:
+                return 0
+
+            with MidiEditTransaction(f"Adjust CC {'+' if delta > 0 else '-'}{abs(delta)}", self.project) as txn:
+                buffer = txn.open(take)
+                selected_cc = [cc for cc in buffer.cc_events
+                               if cc.selected and cc.status == CONTROL_CHANGE]
                 for cc in selected_cc:
-                    current_value = cc.messages[1]
-                    new_value = max(0, min(127, current_value + delta))
-                    RPR.MIDI_SetCC(
-                        take.id, cc.index, cc.selected, cc.muted, cc.position,
-                        0xB0, cc.channel, cc.messages[0], new_value, False
-                    )
-                item.update()
-
-            overlay.show_message(f"Adjusted {len(selected_cc)} CC by {delta}")
-            
+                    # msg[2] holds the CC value
+                    cc.msg[2] = max(0, min(127, cc.msg[2] + delta))
+
+            if selected_cc and overlay is not None:
+                overlay.show_message(f"Adjusted {len(selected_cc)} CC by {delta}")
+            return len(selected_cc)
+
         except Exception as e:
             print(f"CC bulk adjust error: {e}")
+            return 0
 
     def _adjust_cc_values(self, factor):
         """Generic CC value adjustment"""
-        project = reapy.Project()
-        item = project.get_selected_item(0)
-        if item and item.active_take and item.active_take.is_midi:
-            take = item.active_take
-            # Get all CC events and filter selected ones
-            for cc in take.cc_events:
-                if cc.selected:
-                    # Get current value from messages tuple (controller, value)
-                    current_value = cc.messages[1]
-                    new_value = max(0, min(127, int(current_value * factor)))
-                    # Update CC using ReaScript API with all required parameters
-                    RPR.MIDI_SetCC(
-                        take.id,        # MediaItem_Take
-                        cc.index,       # integer ccidx
-                        cc.selected,    # boolean selectedIn
-                        cc.muted,       # boolean mutedIn
-                        cc.position,    # number ppqposIn
-                        0xB0,           # integer chanmsgIn (CC message type)
-                        cc.channel,     # integer chanIn
-                        cc.messages[0], # integer msg2In (CC number)
-                        new_value,      # integer msg3In (CC value)
-                        False           # boolean noSortIn
-                    )
-            # Update the parent item
-            item.update()
+        take = self.get_active_take()
+        if take and take.is_midi:
+            with MidiEditTransaction("Scale CC Values", self.project) as txn:
+                buffer = txn.open(take)
+                # Scale the value byte of every selected CC event
+                for cc in buffer.cc_events:
+                    if cc.selected and cc.status == CONTROL_CHANGE:
+                        cc.msg[2] = max(0, min(127, int(cc.msg[2] * factor)))
@@ -1,13 +1,25 @@
 import reapy
-from reapy import reascript_api as RPR
+from modules.take_buffer import get_ticks_per_quarter
+from modules.edit_transaction import MidiEditTransaction
+from modules.event_query import EventTable, compile_query
+from modules.transport import session
+
+# Filter tab event types, the query kind each one stands for and the column
+# its value range applies to (pitch bend in -8192..8191, not its 7-bit MSB)
+FILTER_KINDS = {
+    "Notes": ("note", "value"),
+    "CC": ("cc", "value"),
+    "Pitch Bend": ("pb", "pb"),
+    "Program Change": ("program", "value"),
+}
 
 class FilterOperations:
     def __init__(self):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
 
     def get_active_take(self):
-        with reapy.inside_reaper():
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 print("No selected item.")
@@ -20,82 +32,30 @@ class FilterOperations:
 
             return take
 
-    def apply_filters(self, event_types, min_val, max_val):
-        """Filter MIDI events based on criteria"""
+    def select(self, query):
+        """Select the events matching a query like ``note and vel<40``, deselecting the rest"""
+        try:
+            evaluate = compile_query(query)
+        except ValueError as e:
+            print(e)
+            return 0
+
         take = self.get_active_take()
         if not take:
-            return
+            return 0
 
-        # Get all MIDI events
-        all_events = take.get_events()
-        
-        # Filter by event type
-        filtered_events = []
-        for evt in all_events:
-            if isinstance(evt, reapy.Note) and "Notes" in event_types:
-                if min_val <= evt.velocity <= max_val:
-                    filtered_events.append(evt)
-            elif isinstance(evt, reapy.CC) and "CC" in event_types:
-                if min_val <= evt.cc_value <= max_val:
-                    filtered_events.append(evt)
-            elif isinstance(evt, reapy.PitchBend) and "Pitch Bend" in event_types:
-                if min_val <= evt.value <= max_val:
-                    filtered_events.append(evt)
-            elif isinstance(evt, reapy.ProgramChange) and "Program Change" in event_types:
-                if min_val <= evt.program <= max_val:
-                    filtered_events.append(evt)
+        with MidiEditTransaction("Filter MIDI Events", self.project) as txn:
+            buffer = txn.open(take)
+            table = EventTable.from_buffer(buffer, get_ticks_per_quarter(take))
+            count = table.select(evaluate(table), buffer)
 
-        print(f"Filtered to {len(filtered_events)} events matching criteria.")
-        
-        # Select only the filtered events
-        RPR.MIDI_SelectAll(take.id, False)  # Deselect all first
-        for evt in filtered_events:
-            if isinstance(evt, reapy.Note):
-                RPR.MIDI_SetNote(
-                    take.id,
-                    evt.index,
-                    True,  # Selected
-                    evt.muted,
-                    evt.start,
-                    evt.end,
-                    evt.channel,
-                    evt.pitch,
-                    evt.velocity,
-                    False
-                )
-            elif isinstance(evt, reapy.CC):
-                RPR.MIDI_SetCC(
-                    take.id,
-                    evt.index,
-                    True,  # Selected
-                    evt.muted,
-                    evt.position,
-                    evt.channel,
-                    evt.cc_number,
-                    evt.cc_value,
-                    False
-                )
-            elif isinstance(evt, reapy.PitchBend):
-                RPR.MIDI_SetPitchBend(
-                    take.id,
-                    evt.index,
-                    True,  # Selected
-                    evt.muted,
-                    evt.position,
-                    evt.channel,
-                    evt.value,
-                    False
-                )
-            elif isinstance(evt, reapy.ProgramChange):
-                RPR.MIDI_SetProgramChange(
-                    take.id,
-                    evt.index,
-                    True,  # Selected
-                    evt.muted,
-                    evt.position,
-                    evt.channel,
-                    evt.program,
-                    False
-                )
+        print(f"Selected {count} events matching {query}.")
+        return count
 
-        print(f"Selected {len(filtered_events)} events matching filter criteria.")
+    def apply_filters(self, event_types, min_val, max_val):
+        """Filter MIDI events based on criteria"""
+        kinds = [FILTER_KINDS[name] for name in event_types if name in FILTER_KINDS]
+        if not kinds:
+            print("No event types to filter.")
+            return 0
+        return self.select(" or ".join(f"({kind} and {column} in {min_val}..{max_val})" for kind, column in kinds))
@@ -1,14 +1,27 @@
+import time
 import random
 import reapy
 from reapy import reascript_api as RPR
+from modules.take_buffer import TakeBuffer, get_ticks_per_quarter
+from modules.edit_transaction import MidiEditTransaction
+from modules.midi_script import ScriptSnapshot, compile_script
+from modules.script_worker import get_worker
+from modules.transport import session
+
+def take_events_hash(take_id):
+    """REAPER's hash of all of a take's events, which changes with any edit to them"""
+    return RPR.MIDI_GetHash(take_id, False, "", 64)[3]
+
 
 class ScriptOperations:
     def __init__(self):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
+        # Start the worker now, so the first script doesn't wait for its spawn and imports
+        get_worker()
 
     def get_active_take(self):
-        with reapy.inside_reaper():
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 print("No selected item.")
@@ -21,8 +34,68 @@ class ScriptOperations:
 
             return take
 
-    def execute(self, script):
-        """Execute MIDI scripting code"""
+    def execute(self, script, live=False, sandbox=True):
+        """Execute MIDI scripting code
+
+        By default scripts run against a local NumPy snapshot of the active take
+        (see modules.midi_script) in a worker process with CPU, memory and time
+        limits, and the changes are written back in one batch. sandbox=False
+        runs the snapshot script in this process; live=True keeps the old
+        behaviour of handing scripts reapy objects.
+        """
+        if live:
+            return self.execute_live(script)
+        if not sandbox:
+            return self.execute_snapshot(script)
+        job = self.start(script)
+        if job is None:
+            return 0
+        return job.wait()
+
+    def start(self, script):
+        """Start a script in the worker process and return a ScriptJob to poll, or None"""
+        return self.launch(script, self.prepare(script))
+
+    def prepare(self, script):
+        """Read the active take for a script: (snapshot, ticks per quarter, take hash), or None
+
+        The REAPER half of start(), so it can run on the I/O thread.
+        """
+        try:
+            compile_script(script)
+        except SyntaxError as e:
+            print(f"Error compiling script: {e}")
+            return None
+
+        take = self.get_active_take()
+        if not take:
+            return None
+
+        with session():
+            buffer = TakeBuffer.read(take)
+            ticks_per_quarter = get_ticks_per_quarter(take)
+            take_hash = take_events_hash(buffer.take_id)
+        return ScriptSnapshot(buffer, ticks_per_quarter), ticks_per_quarter, take_hash
+
+    def launch(self, script, prepared):
+        """Send a prepared script to the worker process and return its ScriptJob, or None"""
+        if prepared is None:
+            return None
+        worker = get_worker()
+        if worker.busy:
+            print("A script is already running.")
+            return None
+        snapshot, ticks_per_quarter, take_hash = prepared
+        worker.submit(script, snapshot.arrays(), ticks_per_quarter)
+        return ScriptJob(worker, snapshot, self.project, take_hash)
+
+    def cancel(self):
+        """Stop the running sandboxed script; nothing it did is written"""
+        get_worker().cancel()
+
+    def execute_live(self, script):
+        """Execute a script against live reapy objects"""
+
         try:
             # Create a local namespace with REAPER API access
             local_vars = {
@@ -63,24 +136,109 @@ class ScriptOperations:
                 local_vars['selected_pb'] = [p for p in local_vars['pb'] if p.selected]
                 local_vars['selected_pc'] = [p for p in local_vars['pc'] if p.selected]
 
-            # Start undo block
-            RPR.Undo_BeginBlock2(take.id)
+            # Edits made by the script go live, so snapshot the take for rollback
+            with MidiEditTransaction("Execute MIDI Script", self.project) as txn:
+                if take:
+                    txn.snapshot(take)
+
+                # Execute the script
+                exec(script, globals(), local_vars)
 
-            # Execute the script
-            exec(script, globals(), local_vars)
-            
-            # Commit changes
-            if take:
-                RPR.MIDI_Sort(take.id)
-            
-            # End undo block
-            RPR.Undo_EndBlock2(take.id, "Execute MIDI Script", -1)
-            
             print("Script executed successfully.")
-            
+
         except Exception as e:
             print(f"Error executing script: {str(e)}")
             print("Script execution failed. Changes have been rolled back.")
-            if take:
-                RPR.Undo_DoUndo2(take.id)  # Rollback changes on error
             raise
+
+    def execute_snapshot(self, script):
+        """Run a script on local arrays and commit the differences in one buffer write"""
+        try:
+            code = compile_script(script)
+        except SyntaxError as e:
+            print(f"Error compiling script: {e}")
+            return 0
+
+        take = self.get_active_take()
+        if not take:
+            return 0
+
+        with MidiEditTransaction("Execute MIDI Script", self.project) as txn:
+            snapshot = ScriptSnapshot(txn.open(take), get_ticks_per_quarter(take))
+            namespace = snapshot.namespace()
+            try:
+                exec(code, {"__builtins__": __builtins__}, namespace)
+            except Exception as e:
+                print(f"Error executing script: {str(e)}")
+                print("Script execution failed. No changes were written.")
+                raise
+            count = snapshot.commit()
+
+        print(f"Script executed successfully, {count} events changed.")
+        return count
+
+
+class ScriptJob:
+    """A script running in the worker process, committed once its edits come back."""
+
+    def __init__(self, worker, snapshot, project=None, take_hash=None):
+        self.worker = worker
+        self.snapshot = snapshot
+        self.project = project
+        # Hash of the take's events when the snapshot was read
+        self.take_hash = take_hash
+        self.result = None
+
+    def poll(self):
+        """Return None while running, else the number of changed events (0 on failure)"""
+        if self.result is None:
+            ready = self.collect()
+            if ready is None:
+                return None
+            if ready:
+                self.commit()
+        return self.result
+
+    def collect(self):
+        """Check the worker without touching REAPER.
+
+        Returns None while it runs, True once its edits are ready for
+        commit(), and False when there is nothing to write (result is 0).
+        """
+        outcome = self.worker.poll()
+        if outcome is None:
+            if self.worker.busy:
+                return None
+            # Cancelled
+            self.result = 0
+            return False
+
+        status, payload = outcome
+        if status != "ok":
+            print(f"Error executing script: {payload}")
+            print("Script execution failed. No changes were written.")
+            self.result = 0
+            return False
+
+        self.snapshot.apply_edits(payload)
+        return True
+
+    def commit(self):
+        """Write the collected edits to the take and return the number of changed events"""
+        with session():
+            # Committing the snapshot would overwrite edits made in REAPER while the script ran
+            if self.take_hash is not None and take_events_hash(self.snapshot.buffer.take_id) != self.take_hash:
+                print("The take was edited while the script ran. No changes were written; run the script again.")
+                self.result = 0
+                return self.result
+            with MidiEditTransaction("Execute MIDI Script", self.project) as txn:
+                txn.stage(self.snapshot.buffer)
+                self.result = self.snapshot.commit()
+        print(f"Script executed successfully, {self.result} events changed.")
+        return self.result
+
+    def wait(self, interval=0.01):
+        """Block until the script finishes and return the number of changed events"""
+        while self.poll() is None:
+            time.sleep(interval)
+        return self.result
@@ -1,15 +1,20 @@
-import random
-import statistics
+import numpy as np
 import reapy
-from reapy import reascript_api as RPR
+from modules.take_buffer import TakeBuffer
+from modules.note_table import NoteTable
+from modules.edit_transaction import MidiEditTransaction
+from modules.velocity_stats import get_velocity_cache
+from modules.transport import session
 
 class VelocityOperations:
     def __init__(self):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
+        self.rng = np.random.default_rng()
+        self.stats = None
 
     def get_active_take(self):
-        with reapy.inside_reaper():
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 print("No selected item.")
@@ -22,144 +27,97 @@ class VelocityOperations:
 
             return take
 
-    def randomize(self, min_vel, max_vel):
-        """Randomize velocities within range"""
+    def load_note_table(self, selected_only=False):
+        """Read the active take in one call and return (buffer, NoteTable), or (None, None)"""
         take = self.get_active_take()
         if not take:
-            return
+            return None, None
+
+        buffer = TakeBuffer.read(take)
+        self.stats = get_velocity_cache().get(take, buffer)
+        table = NoteTable.from_buffer(buffer, selected_only)
+        if not len(table):
+            print("No selected MIDI notes." if selected_only else "No MIDI notes.")
+            return None, None
+        return buffer, table
+
+    def commit(self, buffer, table, description):
+        """Write the transformed table back to REAPER as one undoable batch"""
+        table.apply()
+        with MidiEditTransaction(description, self.project) as txn:
+            txn.stage(buffer)
 
-        notes = take.notes
-        if not notes:
-            print("No MIDI notes.")
+    def randomize(self, min_vel, max_vel):
+        """Randomize velocities within range"""
+        buffer, table = self.load_note_table()
+        if table is None:
             return
 
-        print(f"Randomizing velocities for {len(notes)} notes between {min_vel}-{max_vel}.")
-        for note in notes:
-            new_velocity = random.randint(min_vel, max_vel)
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Updated note (Pitch: {note.pitch}) to new velocity: {new_velocity}.")
+        print(f"Randomizing velocities for {len(table)} notes between {min_vel}-{max_vel}.")
+        table.velocity[:] = self.rng.integers(min_vel, max_vel, size=len(table), endpoint=True)
+        self.commit(buffer, table, "Randomize Velocities")
 
     def normalize(self):
         """Normalize to median velocity"""
-        take = self.get_active_take()
-        if not take:
+        buffer, table = self.load_note_table()
+        if table is None:
             return
 
-        notes = take.notes
-        if not notes:
-            print("No MIDI notes.")
-            return
+        median_velocity = int(self.stats.all.median)
+        print(f"Normalizing velocities for {len(table)} notes to median velocity {median_velocity}.")
+        table.velocity[:] = median_velocity
+        self.commit(buffer, table, "Normalize Velocities")
 
-        print(f"Normalizing velocities for {len(notes)} notes.")
-        velocities = [note.velocity for note in notes]
-        median_velocity = statistics.median(velocities)
-        for note in notes:
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                int(start),
-                int(end),
-                channel,
-                note.pitch,
-                int(median_velocity),
-                False
-            )
-            print(f"Normalized note (Pitch: {note.pitch}) to median velocity: {median_velocity}.")
-
-    def compress(self, min_vel, max_vel):
-        """Compress velocity range"""
-        take = self.get_active_take()
-        if not take:
-            return
+    def compress(self, min_vel, max_vel, mode="linear"):
+        """Compress velocity range
 
-        notes = take.notes
-        if not notes:
-            print("No MIDI notes.")
+        mode="linear" maps the current min/max onto the target range, mode="rank"
+        spreads notes evenly over the target range by velocity rank.
+        """
+        buffer, table = self.load_note_table()
+        if table is None:
             return
 
-        print(f"Compressing velocities for {len(notes)} notes to range {min_vel}-{max_vel}.")
-        current_min = min(note.velocity for note in notes)
-        current_max = max(note.velocity for note in notes)
-        
-        for note in notes:
-            # Scale velocity to new range
-            new_velocity = min_vel + ((note.velocity - current_min) * (max_vel - min_vel)) / (current_max - current_min)
-            new_velocity = min(max(int(new_velocity), 0), 127)
-            
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Compressed note (Pitch: {note.pitch}) to velocity: {new_velocity}.")
+        print(f"Compressing velocities for {len(table)} notes to range {min_vel}-{max_vel}.")
+        velocities = table.velocity.astype(np.float64)
+        if mode == "rank":
+            ranks = velocities.argsort(kind="stable").argsort()
+            position = ranks / max(len(table) - 1, 1)
+        else:
+            current_min, current_max = self.stats.all.min, self.stats.all.max
+            span = current_max - current_min
+            position = (velocities - current_min) / span if span else np.full(len(table), 0.5)
+
+        table.velocity[:] = np.clip(min_vel + position * (max_vel - min_vel), 0, 127).astype(np.int16)
+        self.commit(buffer, table, "Compress Velocities")
 
     def scale(self, factor):
         """Scale velocities by factor"""
-        take = self.get_active_take()
-        if not take:
+        buffer, table = self.load_note_table()
+        if table is None:
             return
 
-        notes = take.notes
-        if not notes:
-            print("No MIDI notes.")
-            return
+        print(f"Scaling velocities for {len(table)} notes by factor {factor}.")
+        table.velocity[:] = np.clip(table.velocity * factor, 0, 127).astype(np.int16)
+        self.commit(buffer, table, "Scale Velocities")
 
-        print(f"Scaling velocities for {len(notes)} notes by factor {factor}.")
-        for note in notes:
-            new_velocity = min(max(int(note.velocity * factor), 0), 127)
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Scaled note (Pitch: {note.pitch}) to new velocity: {new_velocity}.")
+    def adjust_velocity_bulk(self, amount):
+        """Adjust selected note velocities by amount, returning the number of notes"""
+        buffer, table = self.load_note_table(selected_only=True)
+        if table is None:
+            return 0
+
+        table.velocity[:] = np.clip(table.velocity + amount, 0, 127)
+        self.commit(buffer, table, "Adjust Velocities")
+        return len(table)
+
+    def analyze(self, selected_only=False):
+        """Velocity histogram of the active take, served from the stats cache when unchanged"""
+        take = self.get_active_take()
+        if not take:
+            return None
+        return get_velocity_cache().get(take).histogram(selected_only)
 
     def adjust_velocity(self, amount):
         """Adjust selected note velocities by amount"""
-        for note in self.get_selected_notes():
-            new_vel = note.velocity + amount
-            note.velocity = max(0, min(127, new_vel))
-        self.update_notes()
+        self.adjust_velocity_bulk(amount)
@@ -1,52 +1,107 @@
 import reapy  # A Python library for interacting with REAPER DAW using ReaScript
+from reapy import reascript_api as RPR
 import keyboard  # A library for detecting keyboard input in Python
 from pynput import mouse  # Library for detecting mouse events
-import time  # Used for creating a small delay in the code loop
-from PySide6.QtCore import QTimer
+import time  # Used for matching Alt-clicks to the selection changes they cause
+from PySide6.QtCore import QObject, QTimer, Signal
+from modules.transport import session
+from modules.reaper_async import get_reaper_io
+from modules.reaper_events import get_watcher, SelectionChanged, FxWindowFocus, FAST_INTERVAL
 
-class FloatingFXController:
-    def __init__(self):
-        """Initialize the controller with placeholders for tracking keys, mouse events, and the last selected track."""
-        self.last_selected_track = None
-        self.mouse_pressed = False  # State variable for mouse press
+# Seconds after an Alt-click in which a track selection change counts as caused by it
+ALT_CLICK_WINDOW = 1.0
+
+class FloatingFXController(QObject):
+    # Emitted from pynput's listener thread to handle the Alt-click on the Qt thread
+    alt_clicked = Signal()
+
+    def __init__(self, parent=None):
+        """Initialize the controller with placeholders for tracking Alt-clicks and the focused FX."""
+        super().__init__(parent)
+        self.alt_click_time = None  # When the Alt-click not yet handled happened
+        self.focused_track_number = None  # Track whose FX window has focus
+        self.alt_clicked.connect(self.on_alt_click)
+
+        # The shared watcher reports selection and FX focus changes instead of a 100 ms timer
+        self.watcher = get_watcher()
+        self.watcher.subscribe(SelectionChanged, self.on_selection_changed)
+        self.watcher.subscribe(FxWindowFocus, self.on_fx_focus)
 
         # Start a listener for mouse events
         self.mouse_listener = mouse.Listener(on_click=self.on_mouse_click)
         self.mouse_listener.start()
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_alt_and_mouse)
-        self.timer.start(100)  # Check every 100 milliseconds
+    def stop(self):
+        """Stop listening for mouse clicks and REAPER events."""
+        self.mouse_listener.stop()
+        self.watcher.unsubscribe(SelectionChanged, self.on_selection_changed)
+        self.watcher.unsubscribe(FxWindowFocus, self.on_fx_focus)
 
     def on_mouse_click(self, x, y, button, pressed):
         """
-        Callback function for mouse events.
-        Updates the state variable `mouse_pressed` when the mouse is clicked or released.
+        Callback function for mouse events, run on pynput's listener thread.
+        Records Alt-clicks so the selection change they cause can open the FX window.
         """
-        self.mouse_pressed = pressed
+        if pressed and keyboard.is_pressed('alt'):
+            self.alt_clicked.emit()
 
-    def check_alt_and_mouse(self):
+    def on_alt_click(self):
         """
-        Continuously monitor if the 'Alt' key and a mouse press occur simultaneously.
-        When both are detected, it shows the floating FX window for the selected track in REAPER.
+        Open the FX window of the track the Alt-click selected. A click that changes
+        the selection is answered by on_selection_changed; one on an already selected
+        track changes nothing, so the selection is also checked once after the next sample.
         """
-        selected_tracks = reapy.Project().selected_tracks
+        self.alt_click_time = time.time()
+        # Sample at the fast rate so the selection change is seen within the window
+        self.watcher.poke()
+        QTimer.singleShot(int(FAST_INTERVAL * 2000), self.check_selection)
+
+    def check_selection(self):
+        if self.alt_click_time is None:
+            return
+        get_reaper_io().run(self.read_selected_tracks, description="Read track selection", quiet=True,
+                            done=self.open_fx_window)
 
-        if keyboard.is_pressed('alt') and self.mouse_pressed:
-            if selected_tracks:
-                selected_track = selected_tracks[0]
+    def read_selected_tracks(self):
+        """Current track selection (on the I/O thread); the shared cache is polled so it is not stale"""
+        with session():
+            self.watcher.state.poll()
+            return self.watcher.state.selection['tracks']
+
+    def on_fx_focus(self, event):
+        self.focused_track_number = event.track_number
+
+    def on_selection_changed(self, event):
+        """
+        Show the floating FX window for the newly selected track when the
+        selection changed because of an Alt-click.
+        """
+        self.open_fx_window(event.selection['tracks'])
 
-                if selected_track != self.last_selected_track:
-                    self.last_selected_track = selected_track
-                    reapy.perform_action(40536)
-                    reapy.perform_action(reapy.get_command_id("_S&M_WNTSHW3"))
+    def open_fx_window(self, selected_tracks):
+        """Show the first selected track's floating FX window once per Alt-click"""
+        if self.alt_click_time is None or time.time() - self.alt_click_time > ALT_CLICK_WINDOW:
+            return
+        if not selected_tracks:
+            return
+        self.alt_click_time = None
+        get_reaper_io().run(self.show_fx_window, selected_tracks[0], self.focused_track_number,
+                            description="Show floating FX window", quiet=True)
 
-        if not keyboard.is_pressed('alt') or not self.mouse_pressed:
-            self.last_selected_track = None
+    @staticmethod
+    def show_fx_window(track, focused_track_number):
+        # Nothing to do when this track's FX window already has focus
+        if focused_track_number == int(RPR.GetMediaTrackInfo_Value(track, "IP_TRACKNUMBER")):
+            return
+        reapy.perform_action(40536)
+        reapy.perform_action(reapy.get_command_id("_S&M_WNTSHW3"))
 
 # Run the script only if this file is executed directly
 if __name__ == "__main__":
+    import sys
+    from PySide6.QtCore import QCoreApplication
+    app = QCoreApplication(sys.argv)
     # Create an instance of the FloatingFXController class
     fx_controller = FloatingFXController()
-    # Start monitoring for 'Alt' key and mouse presses to show floating FX
-    fx_controller.check_alt_and_mouse()
+    # Watch for Alt-clicks that select tracks until the app quits
+    sys.exit(app.exec())
@@ -1,7 +1,8 @@
 import reapy
+from modules.transport import session
 
 def create_print_tracks():
-    with reapy.inside_reaper():
+    with session():
         project = reapy.Project()
         original_tracks = project.tracks
 
@@ -1,12 +1,12 @@
 import sys
 import json
+import functools
 from PySide6.QtGui import QPainterPath, QKeySequence, QAction
 import reapy
-import random
-import statistics
+import numpy as np
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, 
                               QWidget, QSpinBox, QLabel, QComboBox, QGridLayout, 
-                              QGroupBox, QScrollArea, QSlider, QCheckBox, QTabWidget, QTextEdit, QHBoxLayout)
+                              QGroupBox, QScrollArea, QSlider, QCheckBox, QTabWidget, QTextEdit, QHBoxLayout, QLineEdit)
 from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QPainter, QColor, QPen
 from reapy import reascript_api as RPR
@@ -16,6 +16,15 @@ from modules.AI_func.ops.velocity_ops import VelocityOperations
 from modules.AI_func.ops.cc_ops import CCOperations
 from modules.AI_func.ops.filter_ops import FilterOperations
 from modules.AI_func.ops.script_ops import ScriptOperations
+from modules.note_table import NoteTable
+from modules.quantize import quantize_selected
+from modules.legato import legato_selected
+from modules.humanize import humanize_selected
+from modules.cc_curve import CURVE_SHAPES
+from modules.midi_script import EXAMPLE_SCRIPTS
+from modules.edit_journal import get_journal
+from modules.velocity_stats import get_velocity_cache
+from modules.reaper_async import get_reaper_io, edit_active_take, call, OperationsBar
 import os
 from modules.context_tools import ContextToolsWindow
 from reapy.core.reaper.midi import get_active_editor as get_active_midi_editor
@@ -54,6 +63,10 @@ class FastMidiSuite(QMainWindow):
         # Create overlay UI
         self.overlay = OverlayUI(self)
         self.overlay.move(10, self.height() - 100)  # Position at bottom-left
+
+        # REAPER work runs on the shared I/O thread; the status bar shows what's in flight
+        self.io = get_reaper_io()
+        self.statusBar().addWidget(OperationsBar(self), 1)
         
     def add_velocity_tab(self):
         """Velocity editing interface"""
@@ -75,6 +88,10 @@ class FastMidiSuite(QMainWindow):
         range_layout.addWidget(QLabel("Max Velocity:"), 1, 0)
         range_layout.addWidget(self.max_velocity, 1, 1)
         
+        # Selected-note statistics from the per-take velocity cache
+        self.velocity_stats_label = QLabel()
+        range_layout.addWidget(self.velocity_stats_label, 2, 0, 1, 2)
+        
         range_group.setLayout(range_layout)
         layout.addWidget(range_group)
         
@@ -122,6 +139,12 @@ class FastMidiSuite(QMainWindow):
         tools_group.setLayout(tools_layout)
         layout.addWidget(tools_group)
         
+        # Step through Yuneify edits without reloading from REAPER's undo history
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QPushButton("Undo", clicked=self.journal_undo))
+        history_layout.addWidget(QPushButton("Redo", clicked=self.journal_redo))
+        layout.addLayout(history_layout)
+        
         self.tabs.addTab(tab, "Velocity")
         
     def add_cc_tab(self):
@@ -154,6 +177,32 @@ class FastMidiSuite(QMainWindow):
         cc_select_group.setLayout(cc_select_layout)
         layout.addWidget(cc_select_group)
         
+        # Thinning and resampling of dense or sparse CC lanes
+        reduce_group = QGroupBox("CC Density")
+        reduce_layout = QGridLayout()
+        
+        self.thin_tolerance = QSpinBox()
+        self.thin_tolerance.setRange(0, 32)
+        self.thin_tolerance.setValue(1)
+        reduce_layout.addWidget(QLabel("Tolerance:"), 0, 0)
+        reduce_layout.addWidget(self.thin_tolerance, 0, 1)
+        reduce_layout.addWidget(QPushButton("Thin", clicked=self.thin_cc), 0, 2)
+        
+        self.resample_division = QSpinBox()
+        self.resample_division.setRange(1, 64)
+        self.resample_division.setValue(16)
+        self.resample_division.setSuffix(" / quarter")
+        reduce_layout.addWidget(QLabel("Resample Grid:"), 1, 0)
+        reduce_layout.addWidget(self.resample_division, 1, 1)
+        reduce_layout.addWidget(QPushButton("Resample", clicked=self.resample_cc), 1, 2)
+        
+        # Limit both to the CC chosen above instead of every lane
+        self.reduce_selected_cc = QCheckBox("Chosen CC Only")
+        reduce_layout.addWidget(self.reduce_selected_cc, 2, 0, 1, 3)
+        
+        reduce_group.setLayout(reduce_layout)
+        layout.addWidget(reduce_group)
+        
         # CC curve editor
         curve_group = QGroupBox("CC Curve Editor")
         curve_layout = QVBoxLayout()
@@ -161,6 +210,29 @@ class FastMidiSuite(QMainWindow):
         self.canvas = CC_Canvas()
         curve_layout.addWidget(self.canvas)
         
+        curve_controls = QGridLayout()
+        self.curve_shape = QComboBox()
+        self.curve_shape.addItems(CURVE_SHAPES)
+        curve_controls.addWidget(QLabel("Shape:"), 0, 0)
+        curve_controls.addWidget(self.curve_shape, 0, 1)
+        
+        # Mix between the original values (0%) and the curve (100%)
+        self.curve_blend = QSpinBox()
+        self.curve_blend.setRange(0, 100)
+        self.curve_blend.setValue(100)
+        self.curve_blend.setSuffix("%")
+        curve_controls.addWidget(QLabel("Blend:"), 1, 0)
+        curve_controls.addWidget(self.curve_blend, 1, 1)
+        
+        # Events per quarter note when generating, 0 reshapes existing events
+        self.curve_density = QSpinBox()
+        self.curve_density.setRange(0, 64)
+        curve_controls.addWidget(QLabel("Generate Density:"), 2, 0)
+        curve_controls.addWidget(self.curve_density, 2, 1)
+        
+        curve_controls.addWidget(QPushButton("Apply Curve", clicked=self.apply_cc_curve), 3, 0, 1, 2)
+        curve_layout.addLayout(curve_controls)
+        
         curve_group.setLayout(curve_layout)
         layout.addWidget(curve_group)
         
@@ -209,6 +281,21 @@ class FastMidiSuite(QMainWindow):
         range_group.setLayout(range_layout)
         layout.addWidget(range_group)
         
+        apply_btn = QPushButton("Apply Filters", clicked=self.apply_filters)
+        layout.addWidget(apply_btn)
+        
+        # Query filters, e.g. "note and vel<40 and pitch in C3..C5 and beat%1==0.5"
+        query_group = QGroupBox("Query")
+        query_layout = QHBoxLayout()
+        
+        self.query_edit = QLineEdit("note and vel<40")
+        self.query_edit.returnPressed.connect(self.select_by_query)
+        query_layout.addWidget(self.query_edit)
+        query_layout.addWidget(QPushButton("Select", clicked=self.select_by_query))
+        
+        query_group.setLayout(query_layout)
+        layout.addWidget(query_group)
+        
         self.tabs.addTab(tab, "Filters")
         
     def add_visualization_tab(self):
@@ -235,18 +322,27 @@ class FastMidiSuite(QMainWindow):
         
         # Example scripts
         self.example_combobox = QComboBox()
-        self.example_combobox.addItems([
-            "Velocity Ramp",
-            "CC LFO",
-            "Arpeggiator",
-            "Humanize Timing"
-        ])
+        self.example_combobox.addItems(list(EXAMPLE_SCRIPTS))
+        self.example_combobox.textActivated.connect(
+            lambda name: self.script_editor.setPlainText(EXAMPLE_SCRIPTS[name]))
         editor_layout.addWidget(self.example_combobox)
         
-        # Run button
+        # Run and cancel buttons
+        button_layout = QHBoxLayout()
         self.run_btn = QPushButton("Run Script")
         self.run_btn.clicked.connect(self.run_script)
-        editor_layout.addWidget(self.run_btn)
+        button_layout.addWidget(self.run_btn)
+        
+        self.cancel_script_btn = QPushButton("Cancel")
+        self.cancel_script_btn.setEnabled(False)
+        self.cancel_script_btn.clicked.connect(self.cancel_script)
+        button_layout.addWidget(self.cancel_script_btn)
+        editor_layout.addLayout(button_layout)
+        
+        # Scripts run in a worker process, polled so the window stays responsive
+        self.script_job = None
+        self.script_timer = QTimer(self)
+        self.script_timer.timeout.connect(self._poll_script)
         
         editor_group.setLayout(editor_layout)
         layout.addWidget(editor_group)
@@ -286,7 +382,9 @@ class FastMidiSuite(QMainWindow):
                 "chord_gen": "ctrl+shift+alt+c",
                 "chord_cycle": "ctrl+shift+alt+v",
                 "select_velocity": "ctrl+shift+alt+s",
-                "select_cc": "ctrl+shift+alt+d"
+                "select_cc": "ctrl+shift+alt+d",
+                "journal_undo": "ctrl+alt+z",
+                "journal_redo": "ctrl+alt+shift+z"
             }
             with open(config_path, "w") as f:
                 json.dump(default_keybinds, f, indent=2)
@@ -304,150 +402,245 @@ class FastMidiSuite(QMainWindow):
                 "chord_gen": "ctrl+shift+alt+c",
                 "chord_cycle": "ctrl+shift+alt+v",
                 "select_velocity": "ctrl+shift+alt+s",
-                "select_cc": "ctrl+shift+alt+d"
+                "select_cc": "ctrl+shift+alt+d",
+                "journal_undo": "ctrl+alt+z",
+                "journal_redo": "ctrl+alt+shift+z"
             }
             
+    def get_editor_take(self):
+        """Return the take of the active MIDI editor, if any"""
+        editor = get_active_midi_editor()
+        if not editor:
+            return None
+        return editor.take
+
+    def schedule(self, description, coroutine, done=None):
+        """Run a REAPER job on the I/O thread; done(result) runs here once it finishes"""
+        return self.io.submit(coroutine, description, done=done)
+
     def randomize_velocities(self):
         """Randomize selected note velocities with bulk edit"""
-        try:
-            # Batch process all selected notes at once
-            editor = get_active_midi_editor()
-            if not editor:
-                return
-                
-            take = editor.take
-            if not take:
-                return
-                
-            # Get all selected notes in one call
-            selected_notes = take.get_selected_notes()
-            if not selected_notes:
-                return
-                
-            min_vel = self.min_velocity.value()
-            max_vel = self.max_velocity.value()
-            
+        min_vel = self.min_velocity.value()
+        max_vel = self.max_velocity.value()
+
+        def edit(buffer):
+            # Read every selected note in one call
+            table = NoteTable.from_buffer(buffer, selected_only=True)
             # Generate all random velocities at once
-            new_velocities = [random.randint(min_vel, max_vel) 
-                            for _ in selected_notes]
-            
-            # Update notes in bulk
-            with reapy.undo_block("Randomize Velocities"):
-                for note, vel in zip(selected_notes, new_velocities):
-                    note.velocity = vel
-                    
-                RPR.UpdateArrange()
-                
-            self.overlay.show_message(f"Randomized {len(selected_notes)} notes")
-            
-        except Exception as e:
-            print(f"Randomize error: {e}")
-        
+            table.velocity[:] = np.random.default_rng().integers(
+                min_vel, max_vel, size=len(table), endpoint=True)
+            table.apply()
+            return len(table)
+
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Randomized {count} notes")
+                self._refresh_velocity_display()
+
+        self.schedule("Randomize Velocities", edit_active_take("Randomize Velocities", edit), done)
+
     def normalize_velocities(self):
         """Normalize velocities to median with bulk edit"""
-        try:
-            editor = get_active_midi_editor()
-            if not editor:
-                return
-                
-            take = editor.take
-            if not take:
-                return
-                
-            selected_notes = take.get_selected_notes()
-            if not selected_notes:
-                return
+        def edit(buffer):
+            table = NoteTable.from_buffer(buffer, selected_only=True)
+            if not len(table):
+                return None
+            median_vel = int(get_velocity_cache().get(buffer.take_id, buffer).selected.median)
+            table.velocity[:] = median_vel
+            table.apply()
+            return len(table), median_vel
+
+        def done(result):
+            if result:
+                self.overlay.show_message(f"Normalized {result[0]} notes to {result[1]}")
+                self._refresh_velocity_display()
+
+        self.schedule("Normalize Velocities", edit_active_take("Normalize Velocities", edit), done)
 
-            # Calculate median velocity
-            velocities = [n.velocity for n in selected_notes]
-            median_vel = int(statistics.median(velocities))
-            
-            with reapy.undo_block("Normalize Velocities"):
-                for note in selected_notes:
-                    note.velocity = median_vel
-                RPR.UpdateArrange()
-                
-            self.overlay.show_message(f"Normalized {len(selected_notes)} notes to {median_vel}")
-            
-        except Exception as e:
-            print(f"Normalize error: {e}")
-        
     def compress_velocities(self):
         """Compress velocity range with bulk edit"""
-        try:
-            editor = get_active_midi_editor()
-            if not editor:
-                return
-                
-            take = editor.take
-            if not take:
-                return
-                
-            selected_notes = take.get_selected_notes()
-            if not selected_notes:
-                return
-
-            min_target = self.min_velocity.value()
-            max_target = self.max_velocity.value()
-            current_min = min(n.velocity for n in selected_notes)
-            current_max = max(n.velocity for n in selected_notes)
-            range_scale = (max_target - min_target) / (current_max - current_min)
-            
-            with reapy.undo_block("Compress Velocities"):
-                for note in selected_notes:
-                    scaled = (note.velocity - current_min) * range_scale + min_target
-                    note.velocity = int(max(min_target, min(max_target, scaled)))
-                RPR.UpdateArrange()
-                
-            self.overlay.show_message(f"Compressed {len(selected_notes)} notes to {min_target}-{max_target}")
-            
-        except Exception as e:
-            print(f"Compress error: {e}")
-        
+        min_target = self.min_velocity.value()
+        max_target = self.max_velocity.value()
+
+        def edit(buffer):
+            table = NoteTable.from_buffer(buffer, selected_only=True)
+            if not len(table):
+                return 0
+            stats = get_velocity_cache().get(buffer.take_id, buffer).selected
+            current_min, current_max = stats.min, stats.max
+            range_scale = (max_target - min_target) / (current_max - current_min) if current_max > current_min else 0
+            scaled = (table.velocity - current_min) * range_scale + min_target
+            table.velocity[:] = np.clip(scaled, min_target, max_target).astype(np.int16)
+            table.apply()
+            return len(table)
+
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Compressed {count} notes to {min_target}-{max_target}")
+                self._refresh_velocity_display()
+
+        self.schedule("Compress Velocities", edit_active_take("Compress Velocities", edit), done)
+
     def scale_velocities(self):
         """Scale velocities with dynamic factor and bulk edit"""
-        try:
-            editor = get_active_midi_editor()
-            if not editor:
-                return
-                
-            take = editor.take
-            if not take:
-                return
-                
-            selected_notes = take.get_selected_notes()
-            if not selected_notes:
-                return
+        # Calculate scale factor based on slider position (1.0-2.0)
+        scale_factor = 1.0 + (self.scale_slider.value() / 100)
+
+        def edit(buffer):
+            table = NoteTable.from_buffer(buffer, selected_only=True)
+            table.velocity[:] = np.clip(table.velocity * scale_factor, 0, 127).astype(np.int16)
+            table.apply()
+            return len(table)
+
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Scaled {count} notes by {scale_factor:.2f}x")
+                self._refresh_velocity_display()
+
+        self.schedule("Scale Velocities", edit_active_take("Scale Velocities", edit), done)
+
+    def quantize_notes(self, grid=1/16, strength=1.0):
+        """Quantize selected notes to the project grid with bulk edit"""
+        def edit(buffer):
+            return quantize_selected(buffer, grid, strength)
+
+        def done(moved):
+            if moved is not None:
+                self.overlay.show_message(f"Quantized {moved} notes")
+
+        self.schedule("Quantize Notes", edit_active_take("Quantize Notes", edit), done)
+
+    def make_legato(self, gap=10):
+        """Make selected notes legato and clear same-pitch overlaps with bulk edit"""
+        def edit(buffer):
+            return legato_selected(buffer, gap)
+
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Legato {count} notes")
+
+        self.schedule("Make Legato", edit_active_take("Make Legato", edit), done)
+
+    def humanize_notes(self, timing=10, length=0, velocity=8, distribution="gaussian", seed=None):
+        """Humanize selected notes with one seeded random draw"""
+        def edit(buffer):
+            return humanize_selected(buffer, np.random.default_rng(seed), timing, length, velocity, distribution)
+
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Humanized {count} notes")
+                self._refresh_velocity_display()
+
+        self.schedule("Humanize Notes", edit_active_take("Humanize Notes", edit), done)
+
+    def apply_filters(self):
+        """Select events by the checked types and value range"""
+        checks = (self.note_filter, self.cc_filter, self.pitch_filter, self.prog_filter)
+        event_types = [check.text() for check in checks if check.isChecked()]
+        self.schedule("Filter Events",
+                      call(self.filter_ops.apply_filters, event_types, self.min_value.value(), self.max_value.value()),
+                      lambda count: self.overlay.show_message(f"Selected {count} events"))
+
+    def select_by_query(self):
+        """Select events matching the query text"""
+        self.schedule("Select Events", call(self.filter_ops.select, self.query_edit.text()),
+                      lambda count: self.overlay.show_message(f"Selected {count} events"))
 
-            # Calculate scale factor based on slider position (1.0-2.0)
-            scale_factor = 1.0 + (self.scale_slider.value() / 100)
-            
-            with reapy.undo_block("Scale Velocities"):
-                for note in selected_notes:
-                    new_vel = int(note.velocity * scale_factor)
-                    note.velocity = max(0, min(127, new_vel))
-                RPR.UpdateArrange()
-                
-            self.overlay.show_message(f"Scaled {len(selected_notes)} notes by {scale_factor:.2f}x")
-            
-        except Exception as e:
-            print(f"Scale error: {e}")
-        
     def run_script(self):
         """Execute MIDI script"""
         script = self.script_editor.toPlainText()
-        self.script_ops.execute(script)
+        self.run_btn.setEnabled(False)
+        # The take is read on the I/O thread, the worker started back here
+        self.io.run(self.script_ops.prepare, script, description="Read Script Take",
+                    done=functools.partial(self._launch_script, script),
+                    failed=self._script_failed)
+
+    def _launch_script(self, script, prepared):
+        self.script_job = self.script_ops.launch(script, prepared)
+        if self.script_job is None:
+            self.run_btn.setEnabled(True)
+            return
+        self.cancel_script_btn.setEnabled(True)
+        self.script_timer.start(20)
+
+    def cancel_script(self):
+        """Stop the running script without writing anything"""
+        self.script_ops.cancel()
+        self.overlay.show_message("Script cancelled")
+
+    def _poll_script(self):
+        """Commit the script's edits once the worker is done"""
+        ready = self.script_job.collect()
+        if ready is None:
+            return
+        self.script_timer.stop()
+        self.cancel_script_btn.setEnabled(False)
+        if ready:
+            self.io.run(self.script_job.commit, description="Execute MIDI Script",
+                        done=self._script_finished, failed=self._script_failed)
+        else:
+            self._script_finished(self.script_job.result)
+
+    def _script_finished(self, count):
+        self.script_job = None
+        self.run_btn.setEnabled(True)
+        self.overlay.show_message(f"Script changed {count} events")
+
+    def _script_failed(self, error):
+        print(f"Error executing script: {error}")
+        self._script_finished(0)
         
     def adjust_cc_right(self):
         """Adjust CC values to the right with bulk editing"""
-        delta = self.cc_delta.value()
-        self.cc_ops.adjust_cc_bulk(delta, self.overlay)
-        self._refresh_cc_display()
+        self._adjust_cc(self.cc_delta.value())
 
     def adjust_cc_left(self):
         """Adjust CC values to the left with bulk editing"""
-        delta = -self.cc_delta.value()
-        self.cc_ops.adjust_cc_bulk(delta, self.overlay)
+        self._adjust_cc(-self.cc_delta.value())
+
+    def _adjust_cc(self, delta):
+        def done(count):
+            if count:
+                self.overlay.show_message(f"Adjusted {count} CC by {delta}")
+            self._refresh_cc_display()
+
+        self.schedule("Adjust CC", call(self.cc_ops.adjust_cc_bulk, delta), done)
+
+    def apply_cc_curve(self):
+        """Apply the drawn curve to the chosen CC lane"""
+        points = self.canvas.curve_points()
+        if len(points) < 2:
+            self.overlay.show_message("Draw at least two curve points")
+            return
+
+        def done(count):
+            self.overlay.show_message(f"Curve applied to {count} CC events")
+            self._refresh_cc_display()
+
+        apply_curve = functools.partial(
+            self.cc_ops.apply_curve,
+            self.cc_combobox.currentIndex(), points,
+            shape=self.curve_shape.currentText(),
+            blend=self.curve_blend.value() / 100,
+            density=self.curve_density.value() or None
+        )
+        self.schedule("Apply CC Curve", call(apply_curve), done)
+
+    def thin_cc(self):
+        """Thin dense CC lanes"""
+        cc_num = self.cc_combobox.currentIndex() if self.reduce_selected_cc.isChecked() else None
+        self.schedule("Thin CC", call(self.cc_ops.thin_cc, self.thin_tolerance.value(), cc_num),
+                      self._show_cc_reduction)
+
+    def resample_cc(self):
+        """Resample CC lanes to a fixed grid"""
+        cc_num = self.cc_combobox.currentIndex() if self.reduce_selected_cc.isChecked() else None
+        self.schedule("Resample CC", call(self.cc_ops.resample_cc, self.resample_division.value(), cc_num),
+                      self._show_cc_reduction)
+
+    def _show_cc_reduction(self, counts):
+        before, after = counts
+        self.overlay.show_message(f"CC events {before} -> {after}")
         self._refresh_cc_display()
 
     def _refresh_cc_display(self):
@@ -469,19 +662,43 @@ class FastMidiSuite(QMainWindow):
         self.actions["velocity_down"].triggered.connect(self.velocity_down)
         self.actions["cc_left"].triggered.connect(self.adjust_cc_left)
         self.actions["cc_right"].triggered.connect(self.adjust_cc_right)
+        self.actions["legato"].triggered.connect(lambda: self.make_legato())
+        self.actions["humanize"].triggered.connect(lambda: self.humanize_notes())
+        # Older keybinds.json files have no journal entries
+        if "journal_undo" in self.actions:
+            self.actions["journal_undo"].triggered.connect(self.journal_undo)
+        if "journal_redo" in self.actions:
+            self.actions["journal_redo"].triggered.connect(self.journal_redo)
         # Add more connections as needed
         
+    def journal_undo(self):
+        """Undo the last Yuneify edit from the in-memory journal"""
+        self.schedule("Undo", call(get_journal().undo),
+                      lambda description: self._show_journal_step("Undid", description, "Nothing to undo"))
+
+    def journal_redo(self):
+        """Redo the last undone Yuneify edit"""
+        self.schedule("Redo", call(get_journal().redo),
+                      lambda description: self._show_journal_step("Redid", description, "Nothing to redo"))
+
+    def _show_journal_step(self, verb, description, nothing):
+        self.overlay.show_message(f"{verb} {description}" if description else nothing)
+        self._refresh_velocity_display()
+        self._refresh_cc_display()
+
     def velocity_up(self):
         """Increase selected velocities with bulk processing"""
         delta = 5
-        count = self.velocity_ops.adjust_velocity_bulk(delta)
-        self.overlay.show_message(f"Velocity +{delta} ({count} notes)")
-        self._refresh_velocity_display()
+        self.schedule("Velocity Up", call(self.velocity_ops.adjust_velocity_bulk, delta),
+                      lambda count: self._show_velocity_change(f"+{delta}", count))
         
     def velocity_down(self):
         """Decrease selected velocities with bulk processing"""
         delta = -5
-        count = self.velocity_ops.adjust_velocity_bulk(delta)
+        self.schedule("Velocity Down", call(self.velocity_ops.adjust_velocity_bulk, delta),
+                      lambda count: self._show_velocity_change(f"{delta}", count))
+
+    def _show_velocity_change(self, delta, count):
         self.overlay.show_message(f"Velocity {delta} ({count} notes)")
         self._refresh_velocity_display()
 
@@ -492,6 +709,24 @@ class FastMidiSuite(QMainWindow):
             # Update velocity range display immediately
             self.min_velocity.repaint()
             self.max_velocity.repaint()
+            self.update_velocity_stats()
+
+    def update_velocity_stats(self):
+        """Show selected-note velocity statistics without reading the notes when the take is unchanged"""
+        self.io.run(self.read_velocity_stats, description="Velocity Stats", quiet=True,
+                    done=self.show_velocity_stats)
+
+    def read_velocity_stats(self):
+        take = self.get_editor_take()
+        return get_velocity_cache().get(take).selected if take else None
+
+    def show_velocity_stats(self, stats):
+        if not stats:
+            self.velocity_stats_label.setText("No selected notes")
+            return
+        self.velocity_stats_label.setText(
+            f"{len(stats)} notes  min {stats.min}  median {stats.median:g}  max {stats.max}  "
+            f"p10-p90 {stats.percentile(10):g}-{stats.percentile(90):g}")
         
 class CC_Canvas(QWidget):
     """CC curve editing canvas"""
@@ -501,6 +736,20 @@ class CC_Canvas(QWidget):
         super().__init__()
         self.setMinimumSize(400, 200)
         self.points = []
+
+    def mousePressEvent(self, event):
+        """Left click adds a curve point, right click clears the curve"""
+        if event.button() == Qt.RightButton:
+            self.points = []
+        else:
+            self.points.append(event.position().toPoint())
+            self.points.sort(key=lambda p: p.x())
+        self.update()
+
+    def curve_points(self):
+        """Curve points as (position 0-1, CC value 0-127) pairs"""
+        width, height = max(self.width(), 1), max(self.height(), 1)
+        return [(p.x() / width, (1 - p.y() / height) * 127) for p in self.points]
         
     def paintEvent(self, event):
         """Draw CC curve"""
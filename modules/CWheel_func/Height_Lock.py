@@ -1,21 +1,24 @@
 import reapy
+from modules.reaper_events import get_watcher, TrackCountChanged
 class TrackHeightLock:
     def __init__(self):
-        self.last_track_count = 0  # Initialize last_track_count
-        if reapy.is_inside_reaper():
-            self.check_for_track_changes()  # Start the non-blocking loop
+        # The shared watcher reports track count changes instead of re-deferring forever
+        self.watcher = get_watcher()
+        self.watcher.subscribe(TrackCountChanged, self.on_track_count_changed)
+        # The first sample only sets the watcher's baseline, so lock the existing tracks now
+        self.lock_track_heights()
+    def stop(self):
+        """Stop locking the heights of new tracks."""
+        self.watcher.unsubscribe(TrackCountChanged, self.on_track_count_changed)
     def lock_track_heights(self):
         """Lock the height of all tracks in the project."""
         reapy.core.reaper.reaper.perform_action(42336)  # Lock track heights using action ID 42336
-    def check_for_track_changes(self):
-        """Check for changes in the track count."""
-        project = reapy.Project()
-        current_track_count = project.n_tracks
-        if current_track_count != self.last_track_count:
-            self.lock_track_heights()
-            self.last_track_count = current_track_count
-        # Schedule the next call to this function
-        if reapy.is_inside_reaper():
-            reapy.defer(self.check_for_track_changes)
+    def on_track_count_changed(self, event):
+        """Lock heights again whenever tracks are added or removed."""
+        self.lock_track_heights()
 if __name__ == "__main__":
-    track_locker = TrackHeightLock()
\ No newline at end of file
+    import sys
+    from PySide6.QtCore import QCoreApplication
+    app = QCoreApplication(sys.argv)
+    track_locker = TrackHeightLock()
+    sys.exit(app.exec())
@@ -10,6 +10,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QCursor, QPainter, QColor, QPen, QPainterPath
 from modules.styles import apply_dark_theme
+from modules.transport import session
+from modules.reaper_async import get_reaper_io, OperationsBar
 
 import os
 import json
@@ -175,6 +177,10 @@ class VSTPresetManager(QMainWindow):
         layout.addWidget(fx_frame)
         layout.addWidget(self.preset_tree, 1)
         layout.addWidget(actions)
+        layout.addWidget(OperationsBar(self))
+
+        # REAPER work runs on the shared I/O thread; dialogs open when it's done
+        self.io = get_reaper_io()
         
         # Connect signals
         self.refresh_fx_button.clicked.connect(self.refresh_kontakt_instances)
@@ -211,23 +217,28 @@ class VSTPresetManager(QMainWindow):
 
     def refresh_kontakt_instances(self):
         """Find all tracks, including those without FX, and list them in the combo box"""
+        self.io.run(self.read_kontakt_instances, description="Find Kontakt Instances",
+                    done=self.show_kontakt_instances)
+
+    def read_kontakt_instances(self):
+        """[(label, (track_id, fx_index))] of every track and its Kontakt instances"""
+        instances = []
+        with session():
+            project = reapy.Project()
+            for track in project.tracks:
+                # Add the track itself, even if it has no FX
+                instances.append((f"{track.name} (No FX)", (track.id, -1)))  # Use -1 to indicate no FX
+
+                # Add FX instances on the track
+                for fx_index, fx in enumerate(track.fxs):
+                    if "Kontakt" in fx.name:
+                        instances.append((f"{track.name} - {fx.name}", (track.id, fx_index)))
+        return instances
+
+    def show_kontakt_instances(self, instances):
         self.fx_combo.clear()
-        project = reapy.Project()
-        
-        for track in project.tracks:
-            # Add the track itself, even if it has no FX
-            self.fx_combo.addItem(
-                f"{track.name} (No FX)", 
-                userData=(track.id, -1)  # Use -1 to indicate no FX
-            )
-            
-            # Add FX instances on the track
-            for fx_index, fx in enumerate(track.fxs):
-                if "Kontakt" in fx.name:
-                    self.fx_combo.addItem(
-                        f"{track.name} - {fx.name}", 
-                        userData=(track.id, fx_index)
-                    )
+        for label, fx_data in instances:
+            self.fx_combo.addItem(label, userData=fx_data)
 
     def get_current_fx(self):
         index = self.fx_combo.currentIndex()
@@ -252,43 +263,46 @@ class VSTPresetManager(QMainWindow):
             QMessageBox.warning(self, "Error", "No FX selected!")
             return
 
+        preset_name, ok = QInputDialog.getText(
+            self, "Preset Name", "Enter preset name:"
+        )
+        if not ok or not preset_name:
+            return
+
+        def done(file_path):
+            self.scan_presets()
+            QMessageBox.information(self, "Success", f"Preset saved to:\n{file_path}")
+
+        self.io.run(self.write_preset, fx_data, preset_name, description="Save Preset", done=done,
+                    failed=lambda e: QMessageBox.critical(self, "Error", f"Failed to save preset:\n{str(e)}"))
+
+    def write_preset(self, fx_data, preset_name):
+        """Save the FX's VST chunk as a preset file and return its path"""
         track_id, fx_index = fx_data
-        
-        try:
+
+        with session():
             (_, _, _, _, fx_name, _) = RPR.TrackFX_GetNamedConfigParm(
                 track_id, fx_index, "fx_name", "", 256
             )
-            
-            preset_name, ok = QInputDialog.getText(
-                self, "Preset Name", "Enter preset name:"
-            )
-            if not ok or not preset_name:
-                return
-
             (retval, _, _, _, chunk_b64, _) = RPR.TrackFX_GetNamedConfigParm(
                 track_id, fx_index, "vst_chunk", "", 1024 * 1024
             )
-            
-            if not retval or not chunk_b64:
-                raise Exception("Failed to retrieve VST chunk data")
+        
+        if not retval or not chunk_b64:
+            raise Exception("Failed to retrieve VST chunk data")
 
-            preset_data = {
-                "fx_name": fx_name.strip(),
-                "chunk": chunk_b64,
-                "original_name": preset_name
-            }
+        preset_data = {
+            "fx_name": fx_name.strip(),
+            "chunk": chunk_b64,
+            "original_name": preset_name
+        }
 
-            filename = self.sanitize_name(preset_name) + ".yuneify_preset"
-            file_path = os.path.join(self.presets_dir, filename)
-            
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(preset_data, f)
-            
-            self.scan_presets()
-            QMessageBox.information(self, "Success", f"Preset saved to:\n{file_path}")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save preset:\n{str(e)}")
+        filename = self.sanitize_name(preset_name) + ".yuneify_preset"
+        file_path = os.path.join(self.presets_dir, filename)
+        
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(preset_data, f)
+        return file_path
 
     def load_preset(self):
         selected = self.preset_tree.currentItem()
@@ -296,21 +310,32 @@ class VSTPresetManager(QMainWindow):
             QMessageBox.warning(self, "Error", "Select a specific preset!")
             return
 
-        try:
-            filename = selected.data(0, Qt.UserRole)
-            file_path = os.path.join(self.presets_dir, filename)
-            
-            with open(file_path, "r", encoding="utf-8") as f:
-                preset_data = json.load(f)
-            
-            selected_fx = self.get_current_fx()
-            target_fx = None
-            track_id = None
-            fx_index = -1
+        def done(preset_data):
+            QMessageBox.information(self, "Success", 
+                f"Loaded {preset_data['original_name']} into {preset_data['fx_name']}")
 
-            if selected_fx:
-                track_id, fx_index = selected_fx
+        def failed(e):
+            print(e)
+            QMessageBox.critical(self, "Error", f"Failed to load preset:\n{str(e)}")
 
+        self.io.run(self.apply_preset, selected.data(0, Qt.UserRole), self.get_current_fx(),
+                    description="Load Preset", done=done, failed=failed)
+
+    def apply_preset(self, filename, selected_fx):
+        """Load a preset file into the selected FX, adding a compatible FX if needed"""
+        file_path = os.path.join(self.presets_dir, filename)
+        
+        with open(file_path, "r", encoding="utf-8") as f:
+            preset_data = json.load(f)
+        
+        target_fx = None
+        track_id = None
+        fx_index = -1
+
+        if selected_fx:
+            track_id, fx_index = selected_fx
+
+        with session():
             if track_id is None:
                 project = reapy.Project()
                 track = project.tracks[0]
@@ -336,16 +361,10 @@ class VSTPresetManager(QMainWindow):
             retval = RPR.TrackFX_SetNamedConfigParm(
                 target_fx[0], target_fx[1], "vst_chunk", preset_data["chunk"]
             )
-            
-            if not retval:
-                raise Exception("Failed to apply VST chunk")
-            
-            QMessageBox.information(self, "Success", 
-                f"Loaded {preset_data['original_name']} into {preset_data['fx_name']}")
         
-        except Exception as e:
-            print(e)
-            QMessageBox.critical(self, "Error", f"Failed to load preset:\n{str(e)}")
+        if not retval:
+            raise Exception("Failed to apply VST chunk")
+        return preset_data
 
     def find_compatible_fx_on_track(self, track_id, required_fx_name):
         track = reapy.Track(track_id)
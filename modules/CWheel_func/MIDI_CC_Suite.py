@@ -1,13 +1,14 @@
 import sys
 import reapy
-import random
-import statistics
+import numpy as np
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, 
                               QWidget, QSpinBox, QLabel, QComboBox, QGridLayout, 
                               QGroupBox, QScrollArea)
 from PySide6.QtCore import Qt, QTimer
-from reapy import reascript_api as RPR
 from modules.styles import apply_dark_theme
+from modules.edit_transaction import MidiEditTransaction
+from modules.cc_lane_index import CCLaneIndex
+from modules.transport import session
 
 class MidiCCSuite(QMainWindow):
     def __init__(self):
@@ -100,30 +101,30 @@ class MidiCCSuite(QMainWindow):
         cc_num = int(self.cc_combobox.currentText().split()[-1])
         value = self.cc_spinbox.value()
         self.cc_controller.set_cc_values(cc_num, value)
-        print(f"Set CC{cc_num} to {value} for selected notes")
+        print(f"Set CC{cc_num} to {value}")
 
     def randomize_cc_values(self):
         """Randomize CC values"""
         cc_num = int(self.cc_combobox.currentText().split()[-1])
-        self.cc_controller.randomize_cc_values()
+        self.cc_controller.randomize_cc_values(cc_num)
         print(f"Randomized CC{cc_num} values")
 
     def humanize_cc_values(self):
         """Humanize CC values"""
         cc_num = int(self.cc_combobox.currentText().split()[-1])
-        self.cc_controller.humanize_cc_values()
+        self.cc_controller.humanize_cc_values(cc_num)
         print(f"Humanized CC{cc_num} values")
 
     def scale_cc_values(self):
         """Scale CC values"""
         cc_num = int(self.cc_combobox.currentText().split()[-1])
-        self.cc_controller.scale_cc_values()
+        self.cc_controller.scale_cc_values(cc_num)
         print(f"Scaled CC{cc_num} values")
 
     def normalize_cc_values(self):
         """Normalize CC values"""
         cc_num = int(self.cc_combobox.currentText().split()[-1])
-        self.cc_controller.normalize_cc_values()
+        self.cc_controller.normalize_cc_values(cc_num)
         print(f"Normalized CC{cc_num} values")
 
     def _process_operations(self):
@@ -146,6 +147,7 @@ class MidiCCController:
         self.learn_mode = False
         self.last_cc = None
         self.cc_value = 0
+        self.rng = np.random.default_rng()
         
     def toggle_learn(self, enabled):
         self.learn_mode = enabled
@@ -161,102 +163,79 @@ class MidiCCController:
                 self.learn_mode = False
         reapy.set_midi_input_callback(callback)
         
-    def set_cc_values(self, cc_num, value):
-        take = self.get_active_take()
-        if not take:
-            return
-            
-        for note in take.selected_notes:
-            retval, _, _, _, _, _, _, _ = RPR.MIDI_GetCC(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0)
-            RPR.MIDI_SetCC(
-                take.id, note.index,
-                note.selected, note.muted,
-                note.ppqpos, note.msg2, value,
-                note.channel, note.msg, 0)
-                
-        RPR.MIDI_Sort(take.id)
-        print(f"Set CC{cc_num} to {value} for {len(take.selected_notes)} notes")
+    def get_active_take(self):
+        with session():
+            item = reapy.Project().get_selected_item(0)
+            if not item:
+                print("No selected item.")
+                return None
 
-    def randomize_cc_values(self):
-        take = self.get_active_take()
-        if not take:
-            return
-            
-        for note in take.selected_notes:
-            new_value = random.randint(0, 127)
-            retval, _, _, _, _, _, _, _ = RPR.MIDI_GetCC(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0)
-            RPR.MIDI_SetCC(
-                take.id, note.index,
-                note.selected, note.muted,
-                note.ppqpos, note.msg2, new_value,
-                note.channel, note.msg, 0)
-                
-        RPR.MIDI_Sort(take.id)
-        print(f"Randomized CC values for {len(take.selected_notes)} notes")
+            take = item.active_take
+            if not take:
+                print("No active take.")
+                return None
 
-    def humanize_cc_values(self):
-        take = self.get_active_take()
-        if not take:
-            return
-            
-        for note in take.selected_notes:
-            retval, _, _, _, _, _, _, current_value = RPR.MIDI_GetCC(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0)
-            variation = random.randint(-5, 5)
-            new_value = min(max(current_value + variation, 0), 127)
-            RPR.MIDI_SetCC(
-                take.id, note.index,
-                note.selected, note.muted,
-                note.ppqpos, note.msg2, new_value,
-                note.channel, note.msg, 0)
-                
-        RPR.MIDI_Sort(take.id)
-        print(f"Humanized CC values for {len(take.selected_notes)} notes")
+            return take
 
-    def scale_cc_values(self, factor=1.2):
-        take = self.get_active_take()
-        if not take:
-            return
-            
-        for note in take.selected_notes:
-            retval, _, _, _, _, _, _, current_value = RPR.MIDI_GetCC(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0)
-            new_value = min(max(int(current_value * factor), 0), 127)
-            RPR.MIDI_SetCC(
-                take.id, note.index,
-                note.selected, note.muted,
-                note.ppqpos, note.msg2, new_value,
-                note.channel, note.msg, 0)
-                
-        RPR.MIDI_Sort(take.id)
-        print(f"Scaled CC values by {factor}x for {len(take.selected_notes)} notes")
+    def edit_lanes(self, cc_num, description, edit, channel=None):
+        """Read the active take once, run edit(lane, mask) on each lane of cc_num and commit one write.
 
-    def normalize_cc_values(self):
+        Each lane edits its selected events, or the whole lane when none are
+        selected. Returns the number of events edited.
+        """
         take = self.get_active_take()
         if not take:
-            return
-            
-        values = []
-        for note in take.selected_notes:
-            retval, _, _, _, _, _, _, current_value = RPR.MIDI_GetCC(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0)
-            values.append(current_value)
-            
-        if not values:
-            return
-            
-        median_value = statistics.median(values)
-        for note in take.selected_notes:
-            RPR.MIDI_SetCC(
-                take.id, note.index,
-                note.selected, note.muted,
-                note.ppqpos, note.msg2, median_value,
-                note.channel, note.msg, 0)
-                
-        RPR.MIDI_Sort(take.id)
-        print(f"Normalized CC values to median {median_value} for {len(take.selected_notes)} notes")
+            return 0
+
+        with MidiEditTransaction(description) as txn:
+            index = CCLaneIndex(txn.open(take))
+            lanes = index.lanes_for(cc_num, channel)
+            if not lanes:
+                print(f"No CC{cc_num} events found.")
+                return 0
+
+            count = 0
+            for lane in lanes:
+                mask = lane.target()
+                edit(lane, mask)
+                count += int(mask.sum())
+            index.apply()
+        return count
+
+    def set_cc_values(self, cc_num, value):
+        def edit(lane, mask):
+            lane.values[mask] = value
+
+        count = self.edit_lanes(cc_num, f"Set CC{cc_num} Values", edit)
+        print(f"Set CC{cc_num} to {value} for {count} events")
+
+    def randomize_cc_values(self, cc_num):
+        def edit(lane, mask):
+            lane.values[mask] = self.rng.integers(0, 127, size=int(mask.sum()), endpoint=True)
+
+        count = self.edit_lanes(cc_num, f"Randomize CC{cc_num} Values", edit)
+        print(f"Randomized CC{cc_num} values for {count} events")
+
+    def humanize_cc_values(self, cc_num, amount=5):
+        def edit(lane, mask):
+            lane.values[mask] += self.rng.integers(-amount, amount, size=int(mask.sum()), endpoint=True)
+
+        count = self.edit_lanes(cc_num, f"Humanize CC{cc_num} Values", edit)
+        print(f"Humanized CC{cc_num} values for {count} events")
+
+    def scale_cc_values(self, cc_num, factor=1.2):
+        def edit(lane, mask):
+            lane.values[mask] = np.clip(lane.values[mask] * factor, 0, 127).astype(np.int16)
+
+        count = self.edit_lanes(cc_num, f"Scale CC{cc_num} Values", edit)
+        print(f"Scaled CC{cc_num} values by {factor}x for {count} events")
+
+    def normalize_cc_values(self, cc_num):
+        def edit(lane, mask):
+            lane.values[mask] = int(np.median(lane.values[mask]))
+
+        count = self.edit_lanes(cc_num, f"Normalize CC{cc_num} Values", edit)
+        print(f"Normalized CC{cc_num} values to the lane median for {count} events")
 
 def main():
     app = QApplication([])
@@ -1,15 +1,36 @@
 import sys
+import numpy as np
 import reapy
 import time
 import random
-from PySide6.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QSpinBox, QLabel, QComboBox, QGridLayout, QGroupBox, QScrollArea
-from PySide6.QtCore import Qt, QTimer
+import functools
+from PySide6.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QSpinBox, QLabel, QComboBox, QGridLayout, QGroupBox, QScrollArea, QProgressBar, QLineEdit, QCheckBox
+from PySide6.QtCore import Qt, QTimer, Signal
 from reapy import reascript_api as RPR
-import statistics
 from modules.styles import apply_dark_theme  # Import the stylesheet function
+from modules.take_buffer import TakeBuffer, get_ticks_per_quarter
+from modules.edit_transaction import MidiEditTransaction
+from modules.multi_take import MultiTakeExecutor, OperationCancelled
+from modules.note_table import NoteTable
+from modules.edit_journal import get_journal
+from modules.velocity_stats import get_velocity_cache
+from modules.transpose import SCALES, EDGE_MODES, transpose_pitches, invert_pitches
+from modules.quantize import (GRID_VALUES, QuantizeGrid, GrooveTemplate, quantize_notes,
+                              list_grooves, load_groove, save_groove)
+from modules.legato import LEGATO_MODES, OVERLAP_MODES, make_legato, clean_overlaps
+from modules.humanize import DISTRIBUTIONS, DEFAULT_PROFILES, humanize_notes
+from modules.midi_pipeline import Pipeline, Transform, load_presets, save_preset
+from modules.transport import session
+from modules.reaper_async import get_reaper_io, OperationsBar
+
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
 
 class MidiSuite(QMainWindow):
+    # Multi-take progress, emitted on the REAPER I/O thread and shown on the Qt thread
+    take_progress = Signal(int, int, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("MIDI Suite")
@@ -33,10 +54,17 @@ class MidiSuite(QMainWindow):
         self.add_velocity_controls()
         self.add_transpose_controls()
         self.add_quick_tools()
+        self.add_quantize_controls()
         self.add_advanced_tools()
+        self.add_pipeline_controls()
+        self.add_history_controls()
         
         # Initialize MIDI operation classes
         self.init_midi_operations()
+        # Operations run on the shared REAPER I/O thread so the window never blocks
+        self.io = get_reaper_io()
+        self.main_layout.addWidget(OperationsBar(self))
+        self.take_progress.connect(self.report_take_progress)
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._process_operations)
         self._pending_operations = []
@@ -77,6 +105,16 @@ class MidiSuite(QMainWindow):
         self.velocity_button.clicked.connect(self.adjust_velocities)
         velocity_layout.addWidget(self.velocity_button, 3, 0, 1, 2)
         
+        # Per-take progress for project-wide passes
+        self.velocity_progress = QProgressBar(self)
+        self.velocity_progress.setValue(0)
+        velocity_layout.addWidget(self.velocity_progress, 4, 0)
+        
+        self.cancel_velocity_button = QPushButton("Cancel", self)
+        self.cancel_velocity_button.setEnabled(False)
+        self.cancel_velocity_button.clicked.connect(self.cancel_velocity_adjustment)
+        velocity_layout.addWidget(self.cancel_velocity_button, 4, 1)
+        
         velocity_group.setLayout(velocity_layout)
         self.main_layout.addWidget(velocity_group)
 
@@ -91,6 +129,21 @@ class MidiSuite(QMainWindow):
         transpose_btn = QPushButton("Transpose", clicked=self.transpose_notes)
         layout.addWidget(transpose_btn, 0, 1)
         
+        # Scale-aware transposition moves notes by scale degrees
+        self.scale_combobox = QComboBox()
+        self.scale_combobox.addItems(list(SCALES))
+        layout.addWidget(self.scale_combobox, 1, 0)
+        
+        self.root_combobox = QComboBox()
+        self.root_combobox.addItems(NOTE_NAMES)
+        layout.addWidget(self.root_combobox, 1, 1)
+        
+        # What happens to notes pushed past 0-127
+        self.edge_combobox = QComboBox()
+        self.edge_combobox.addItems(EDGE_MODES)
+        layout.addWidget(QLabel("Range Edges:"), 2, 0)
+        layout.addWidget(self.edge_combobox, 2, 1)
+        
         group.setLayout(layout)
         self.main_layout.addWidget(group)
 
@@ -119,8 +172,25 @@ class MidiSuite(QMainWindow):
         humanize_layout.addWidget(QLabel("Velocity:"), 1, 0)
         humanize_layout.addWidget(self.velocity_amount, 1, 1)
         
+        self.length_amount = QSpinBox()
+        self.length_amount.setRange(0, 480)
+        self.length_amount.setSuffix(" ticks")
+        humanize_layout.addWidget(QLabel("Length:"), 2, 0)
+        humanize_layout.addWidget(self.length_amount, 2, 1)
+        
+        self.humanize_distribution = QComboBox()
+        self.humanize_distribution.addItems(DISTRIBUTIONS)
+        humanize_layout.addWidget(QLabel("Distribution:"), 3, 0)
+        humanize_layout.addWidget(self.humanize_distribution, 3, 1)
+        
+        # 0 draws a fresh seed each run, anything else repeats exactly
+        self.humanize_seed = QSpinBox()
+        self.humanize_seed.setRange(0, 999999)
+        humanize_layout.addWidget(QLabel("Seed:"), 4, 0)
+        humanize_layout.addWidget(self.humanize_seed, 4, 1)
+        
         humanize_btn = QPushButton("Apply", clicked=self.humanize)
-        humanize_layout.addWidget(humanize_btn, 2, 0, 1, 2)
+        humanize_layout.addWidget(humanize_btn, 5, 0, 1, 2)
         
         humanize_group.setLayout(humanize_layout)
         layout.addWidget(humanize_group, 1, 0, 1, 2)
@@ -132,6 +202,73 @@ class MidiSuite(QMainWindow):
         # Fourth row
         layout.addWidget(QPushButton("Reverse", clicked=self.reverse_notes), 3, 0)
         
+        # Legato voices: whole take, per channel or per pitch
+        self.legato_mode_combobox = QComboBox()
+        self.legato_mode_combobox.addItems(LEGATO_MODES)
+        layout.addWidget(self.legato_mode_combobox, 3, 1)
+        
+        # Remove stacked duplicates and trim or merge same-pitch overlaps first
+        self.clean_overlaps_checkbox = QCheckBox("Clean Overlaps")
+        layout.addWidget(self.clean_overlaps_checkbox, 4, 0)
+        self.overlap_mode_combobox = QComboBox()
+        self.overlap_mode_combobox.addItems(OVERLAP_MODES)
+        layout.addWidget(self.overlap_mode_combobox, 4, 1)
+        
+        group.setLayout(layout)
+        self.main_layout.addWidget(group)
+
+    def add_quantize_controls(self):
+        group = QGroupBox("Quantize")
+        layout = QGridLayout()
+        
+        self.quantize_grid_combobox = QComboBox()
+        self.quantize_grid_combobox.addItems(list(GRID_VALUES))
+        self.quantize_grid_combobox.setCurrentText("1/8")
+        layout.addWidget(QLabel("Grid:"), 0, 0)
+        layout.addWidget(self.quantize_grid_combobox, 0, 1)
+        
+        self.quantize_strength = QSpinBox()
+        self.quantize_strength.setRange(0, 100)
+        self.quantize_strength.setValue(100)
+        self.quantize_strength.setSuffix("%")
+        layout.addWidget(QLabel("Strength:"), 1, 0)
+        layout.addWidget(self.quantize_strength, 1, 1)
+        
+        self.quantize_swing = QSpinBox()
+        self.quantize_swing.setRange(0, 100)
+        self.quantize_swing.setSuffix("%")
+        layout.addWidget(QLabel("Swing:"), 2, 0)
+        layout.addWidget(self.quantize_swing, 2, 1)
+        
+        # Only notes this close to a grid line (in % of a grid step) are moved
+        self.quantize_window = QSpinBox()
+        self.quantize_window.setRange(1, 100)
+        self.quantize_window.setValue(100)
+        self.quantize_window.setSuffix("%")
+        layout.addWidget(QLabel("Window:"), 3, 0)
+        layout.addWidget(self.quantize_window, 3, 1)
+        
+        self.preserve_length_checkbox = QCheckBox("Preserve Length")
+        self.preserve_length_checkbox.setChecked(True)
+        layout.addWidget(self.preserve_length_checkbox, 4, 0)
+        
+        self.use_groove_checkbox = QCheckBox("Use Groove")
+        layout.addWidget(self.use_groove_checkbox, 4, 1)
+        
+        layout.addWidget(QPushButton("Capture Groove", clicked=self.capture_groove), 5, 0)
+        layout.addWidget(QPushButton("Quantize", clicked=self.quantize_notes), 5, 1)
+        
+        # Groove library, stored as small JSON files under "config files/grooves"
+        self.groove_name_edit = QLineEdit()
+        self.groove_name_edit.setPlaceholderText("Groove name")
+        layout.addWidget(self.groove_name_edit, 6, 0)
+        layout.addWidget(QPushButton("Save Groove", clicked=self.save_groove), 6, 1)
+        
+        self.groove_combobox = QComboBox()
+        self.groove_combobox.addItems(list_grooves())
+        layout.addWidget(self.groove_combobox, 7, 0)
+        layout.addWidget(QPushButton("Apply to Selected", clicked=self.apply_groove), 7, 1)
+        
         group.setLayout(layout)
         self.main_layout.addWidget(group)
 
@@ -152,116 +289,298 @@ class MidiSuite(QMainWindow):
         group.setLayout(layout)
         self.main_layout.addWidget(group)
 
+    def add_history_controls(self):
+        group = QGroupBox("History")
+        layout = QGridLayout()
+        
+        # Yuneify's own undo journal, replayed without reloading the take
+        self.journal_undo_btn = QPushButton("Undo", clicked=self.journal_undo)
+        layout.addWidget(self.journal_undo_btn, 0, 0)
+        self.journal_redo_btn = QPushButton("Redo", clicked=self.journal_redo)
+        layout.addWidget(self.journal_redo_btn, 0, 1)
+        
+        group.setLayout(layout)
+        self.main_layout.addWidget(group)
+
+    def add_pipeline_controls(self):
+        group = QGroupBox("Pipeline")
+        layout = QGridLayout()
+        
+        # Chain of transforms run in one read / one write
+        self.pipeline_edit = QLineEdit("quantize(1/16) | humanize(timing=8, vel=6) | compress(40, 110)")
+        layout.addWidget(self.pipeline_edit, 0, 0, 1, 2)
+        layout.addWidget(QPushButton("Run Pipeline", clicked=self.run_pipeline), 1, 0, 1, 2)
+        
+        # Named presets, also offered on the MIDI context wheel
+        self.preset_name_edit = QLineEdit()
+        self.preset_name_edit.setPlaceholderText("Preset name")
+        layout.addWidget(self.preset_name_edit, 2, 0)
+        layout.addWidget(QPushButton("Save Preset", clicked=self.save_pipeline_preset), 2, 1)
+        
+        self.preset_combobox = QComboBox()
+        self.preset_combobox.addItems(load_presets().keys())
+        self.preset_combobox.textActivated.connect(self.load_pipeline_preset)
+        layout.addWidget(self.preset_combobox, 3, 0, 1, 2)
+        
+        group.setLayout(layout)
+        self.main_layout.addWidget(group)
 
     def init_midi_operations(self):
         self.velocity_adjuster = MidiVelocityAdjuster()
         self.pitch_transposer = MidiPitchTransposer()
         self.velocity_randomizer = MidiVelocityRandomizer()
         self.note_quantizer = MidiNoteQuantizer()
+        self.groove_applier = MidiGrooveApplier()
         self.timing_humanizer = MidiTimingHumanizer()
         self.velocity_scaler = MidiVelocityScaler()
         self.velocity_normalizer = MidiVelocityNormalizer()
         self.velocity_compressor = MidiVelocityCompressor()
         self.pitch_inverter = MidiPitchInverter()
         self.legato_maker = MidiLegatoMaker()
+        self.note_reverser = MidiNoteReverser()
         self.chord_generator = MidiChordGenerator()
+        self.pipeline_runner = MidiPipelineRunner()
+
+    def schedule(self, description, func, *args, done=None, failed=None, **kwargs):
+        """Run func(*args, **kwargs) on the REAPER I/O thread; done(result) or failed(error) runs here afterwards"""
+        return self.io.run(functools.partial(func, *args, **kwargs), description=description,
+                           done=done, failed=failed)
 
     def adjust_velocities(self):
         """Adjust MIDI velocities using MidiVelocityAdjuster."""
         velocity_change = self.velocity_spinbox.value()
-        self.velocity_adjuster.run(velocity_change)
-        print(f"Velocities adjusted by {velocity_change}")
+        self.velocity_progress.setValue(0)
+        self.cancel_velocity_button.setEnabled(True)
+
+        def done(count):
+            self.cancel_velocity_button.setEnabled(False)
+            if count:
+                print(f"Velocities adjusted by {velocity_change}")
+
+        def failed(error):
+            self.cancel_velocity_button.setEnabled(False)
+            print(f"Velocity adjustment error: {error}")
+
+        self.schedule("Adjust Velocities", self.velocity_adjuster.run, velocity_change,
+                      progress=self.take_progress.emit, done=done, failed=failed)
+
+    def report_take_progress(self, done, total, take_id):
+        """Show per-take progress of a multi-take pass"""
+        self.velocity_progress.setMaximum(total)
+        self.velocity_progress.setValue(done)
+
+    def cancel_velocity_adjustment(self):
+        """Cancel the running multi-take velocity pass"""
+        self.velocity_adjuster.cancel()
 
     def transpose_notes(self):
         """Transpose MIDI notes by selected interval using MidiPitchTransposer."""
+        # (semitones, scale degrees) per interval
         interval_map = {
-            "Octave": 12,
-            "Major Third": 4,
-            "Minor Third": 3,
-            "Perfect Fifth": 7
+            "Octave": (12, None),
+            "Major Third": (4, 2),
+            "Minor Third": (3, 2),
+            "Perfect Fifth": (7, 4)
         }
-        interval = interval_map[self.transpose_combobox.currentText()]
-        self.pitch_transposer.run(interval)
-        print(f"Notes transposed by {interval} semitones.")
+        semitones, degrees = interval_map[self.transpose_combobox.currentText()]
+        scale = SCALES[self.scale_combobox.currentText()]
+        edge = self.edge_combobox.currentText()
+        if scale is None:
+            self.schedule("Transpose Notes", self.pitch_transposer.run, semitones, edge=edge,
+                          done=lambda _: print(f"Notes transposed by {semitones} semitones."))
+        else:
+            # An octave spans every degree of the scale
+            degrees = len(scale) if degrees is None else degrees
+            root = self.root_combobox.currentIndex()
+            self.schedule("Transpose Notes", self.pitch_transposer.run, degrees, scale=scale, root=root, edge=edge,
+                          done=lambda _: print(f"Notes transposed by {degrees} scale degrees."))
 
     def randomize_velocities(self):
         """Randomize MIDI velocities within a specified range."""
-        self.velocity_randomizer.run()
-        print("Velocities randomized.")
+        self.schedule("Randomize Velocities", self.velocity_randomizer.run,
+                      done=lambda _: print("Velocities randomized."))
+
+    def journal_undo(self):
+        """Undo the last MIDI edit from the in-memory journal."""
+        self.schedule("Undo", get_journal().undo,
+                      done=lambda description: print(f"Undid {description}." if description else "Nothing to undo."))
+
+    def journal_redo(self):
+        """Redo the last undone MIDI edit."""
+        self.schedule("Redo", get_journal().redo,
+                      done=lambda description: print(f"Redid {description}." if description else "Nothing to redo."))
 
     def quantize_notes(self):
         """Quantize MIDI notes to the nearest grid line."""
-        self.note_quantizer.run()
-        print("Notes quantized.")
+        self.schedule(
+            "Quantize Notes", self.note_quantizer.run,
+            GRID_VALUES[self.quantize_grid_combobox.currentText()],
+            strength=self.quantize_strength.value() / 100,
+            swing=self.quantize_swing.value() / 100,
+            window=self.quantize_window.value() / 100,
+            preserve_length=self.preserve_length_checkbox.isChecked(),
+            use_groove=self.use_groove_checkbox.isChecked(),
+            done=lambda _: print("Notes quantized.")
+        )
+
+    def capture_groove(self):
+        """Extract a groove from the active take for the quantizer."""
+        def done(groove):
+            if groove:
+                self.use_groove_checkbox.setChecked(True)
+                print("Groove captured.")
+
+        self.schedule("Capture Groove", self.note_quantizer.capture_groove,
+                      GRID_VALUES[self.quantize_grid_combobox.currentText()], done=done)
+
+    def save_groove(self):
+        """Extract the active take's groove and save it to the groove library"""
+        name = self.groove_name_edit.text().strip()
+        if not name:
+            print("Enter a groove name first")
+            return
+
+        def done(groove):
+            if groove is None:
+                return
+            save_groove(name, groove)
+            if self.groove_combobox.findText(name) < 0:
+                self.groove_combobox.addItem(name)
+            self.groove_combobox.setCurrentText(name)
+            print(f"Saved groove {name}")
+
+        self.schedule("Capture Groove", self.note_quantizer.capture_groove,
+                      GRID_VALUES[self.quantize_grid_combobox.currentText()], done=done)
+
+    def apply_groove(self):
+        """Apply the chosen library groove to every selected MIDI take"""
+        name = self.groove_combobox.currentText()
+        if not name:
+            print("No saved grooves")
+            return
+        self.schedule("Apply Groove", self.groove_applier.run, name,
+                      timing=self.quantize_strength.value() / 100,
+                      window=self.quantize_window.value() / 100)
 
     def humanize(self):
-        """Humanize MIDI timing and velocities"""
+        """Humanize MIDI timing, lengths and velocities"""
         timing_amount = self.timing_amount.value()
         velocity_amount = self.velocity_amount.value()
-        self.timing_humanizer.run(timing_amount, velocity_amount)
-        print(f"Humanized timing by ±{timing_amount} ticks and velocity by ±{velocity_amount}")
+        self.schedule(
+            "Humanize", self.timing_humanizer.run,
+            timing_amount, velocity_amount,
+            length_amount=self.length_amount.value(),
+            distribution=self.humanize_distribution.currentText(),
+            seed=self.humanize_seed.value() or None,
+            done=lambda _: print(f"Humanized timing by ±{timing_amount} ticks and velocity by ±{velocity_amount}")
+        )
 
     def scale_velocities(self):
         """Scale MIDI velocities by a given factor."""
-        self.velocity_scaler.run()
-        print("Velocities scaled.")
+        self.schedule("Scale Velocities", self.velocity_scaler.run,
+                      done=lambda _: print("Velocities scaled."))
 
     def normalize_velocities(self):
         """Normalize MIDI velocities to the median value."""
-        self.velocity_normalizer.run()
-        print("Velocities normalized to median.")
+        self.schedule("Normalize Velocities", self.velocity_normalizer.run,
+                      done=lambda _: print("Velocities normalized to median."))
 
     def invert_pitch(self):
         """Invert the pitch of MIDI notes around a central pitch."""
-        self.pitch_inverter.run()
-        print("Pitch inverted.")
+        self.schedule("Invert Pitch", self.pitch_inverter.run, edge=self.edge_combobox.currentText(),
+                      done=lambda _: print("Pitch inverted."))
 
     def make_legato(self):
         """Make MIDI notes legato by overlapping them slightly."""
-        self.legato_maker.run()
-        print("Notes made legato.")
+        self.schedule(
+            "Make Legato", self.legato_maker.run,
+            by=self.legato_mode_combobox.currentText(),
+            clean=self.clean_overlaps_checkbox.isChecked(),
+            overlap_mode=self.overlap_mode_combobox.currentText(),
+            done=lambda _: print("Notes made legato.")
+        )
 
     def compress_velocities(self):
         """Compress MIDI velocities using threshold and ratio."""
         threshold = 64  # Example threshold value
         ratio = 2.0     # Example compression ratio
-        self.velocity_compressor.run(threshold, ratio)
-        print(f"Velocities compressed with {ratio}:1 ratio above {threshold}")
+        self.schedule("Compress Velocities", self.velocity_compressor.run, threshold, ratio,
+                      done=lambda _: print(f"Velocities compressed with {ratio}:1 ratio above {threshold}"))
 
     def reverse_notes(self):
         """Reverse the order of MIDI notes in time."""
-        self.note_reverser.run()
-        print("MIDI notes reversed")
+        self.schedule("Reverse Notes", self.note_reverser.run, done=lambda _: print("MIDI notes reversed"))
 
     def generate_chords(self):
         """Generate chords from selected notes"""
         chord_type = self.chord_type.currentText()
-        self.chord_generator.run(chord_type)
-        print(f"Generated {chord_type} chords from selected notes")
+        self.schedule("Generate Chords", self.chord_generator.run, chord_type,
+                      done=lambda _: print(f"Generated {chord_type} chords from selected notes"))
+
+    def run_pipeline(self):
+        """Run the pipeline expression as a single fused edit"""
+        try:
+            pipeline = Pipeline.parse(self.pipeline_edit.text())
+        except Exception as e:
+            print(f"Invalid pipeline: {e}")
+            return
+        self.schedule("Run Pipeline", self.pipeline_runner.run, pipeline,
+                      done=lambda count: print(f"Pipeline {pipeline!r} applied to {count} notes"))
+
+    def save_pipeline_preset(self):
+        """Save the pipeline expression as a named preset"""
+        name = self.preset_name_edit.text().strip()
+        if not name:
+            print("Enter a preset name first")
+            return
+        try:
+            save_preset(name, Pipeline.parse(self.pipeline_edit.text()))
+        except Exception as e:
+            print(f"Invalid pipeline: {e}")
+            return
+        if self.preset_combobox.findText(name) < 0:
+            self.preset_combobox.addItem(name)
+        print(f"Saved pipeline preset {name}")
 
+    def load_pipeline_preset(self, name):
+        """Show a saved preset in the pipeline editor"""
+        pipeline = load_presets().get(name)
+        if pipeline is not None:
+            self.pipeline_edit.setText(repr(pipeline))
+            self.preset_name_edit.setText(name)
 
     def _process_operations(self):
-        """Process queued MIDI operations in the main thread"""
+        """Hand queued MIDI operations to the REAPER I/O thread, in order
+
+        Consecutive queued transforms are fused into one pipeline, so they cost
+        one take read and one write instead of one each.
+        """
+        self._timer.stop()
         while self._pending_operations:
-            try:
+            if isinstance(self._pending_operations[0], Transform):
+                pipeline = Pipeline()
+                while self._pending_operations and isinstance(self._pending_operations[0], Transform):
+                    pipeline = pipeline | self._pending_operations.pop(0)
+                self.schedule("Run Pipeline", self.pipeline_runner.run, pipeline)
+            else:
                 func, args = self._pending_operations.pop(0)
-                func(*args)
-            except Exception as e:
-                print(f"Error processing operation: {str(e)}")
+                self.schedule(getattr(func, "__name__", "MIDI operation"), func, *args)
 
     def queue_operation(self, func, *args):
-        """Add an operation to be processed in the main thread"""
-        self._pending_operations.append((func, args))
+        """Add an operation or a pipeline Transform to be run on the REAPER I/O thread"""
+        self._pending_operations.append(func if isinstance(func, Transform) else (func, args))
         if not self._timer.isActive():
             self._timer.start(100)
 
 class MidiOperationBase:
+    undo_label = "MIDI Suite Edit"
+
     def __init__(self):
-        with reapy.inside_reaper():
+        with session():
             self.project = reapy.Project()
 
     def get_active_take(self):
-        with reapy.inside_reaper():
+        with session():
             item = self.project.get_selected_item(0)
             if not item:
                 print("No selected item.")
@@ -274,448 +593,375 @@ class MidiOperationBase:
 
             return take
 
+    def read_take_buffer(self, take):
+        """Read the whole event stream of a take in a single round trip."""
+        return TakeBuffer.read(take)
+
+    def load_notes(self, selected_only=False):
+        """Return the active take's buffer and its notes, or (None, []) when there is nothing to edit."""
+        take = self.get_active_take()
+        if not take:
+            return None, []
+
+        buffer = self.read_take_buffer(take)
+        notes = buffer.selected_notes if selected_only else buffer.notes
+        if not notes:
+            print("No selected MIDI notes." if selected_only else "No MIDI notes.")
+        return buffer, notes
+
+    def commit(self, *buffers):
+        """Write locally edited buffers back as one batch with a single sort, refresh and undo point."""
+        with MidiEditTransaction(self.undo_label, self.project) as txn:
+            for buffer in buffers:
+                txn.stage(buffer)
+
 class MidiVelocityAdjuster(MidiOperationBase):
-    def run(self, velocity_change):
+    undo_label = "Adjust Velocities"
+
+    def __init__(self):
+        super().__init__()
+        self.executor = MultiTakeExecutor()
+
+    def run(self, velocity_change, progress=None):
         self.select_all_midi_items()
-        self.adjust_midi_velocities(velocity_change)
+        return self.adjust_midi_velocities(velocity_change, progress)
+
+    def cancel(self):
+        self.executor.cancel()
 
     def select_all_midi_items(self):
         RPR.Main_OnCommand(RPR.NamedCommandLookup("_BR_SEL_ALL_ITEMS_MIDI"), 0)
         print("Selected all MIDI items.")
 
-    def adjust_midi_velocities(self, velocity_change):
-        selected_items = self.project.selected_items
-        for item in selected_items:
-            self._process_item(item, velocity_change)
-
-    def _process_item(self, item, velocity_change):
-        for take in item.takes:
-            if take.is_midi:
-                self._adjust_take_velocities(take, velocity_change)
+    def adjust_midi_velocities(self, velocity_change, progress=None):
+        with session():
+            takes = [take for item in self.project.selected_items
+                     for take in item.takes if take.is_midi]
+        try:
+            count = self.executor.run(
+                takes,
+                lambda buffer: self._adjust_take_velocities(buffer, velocity_change),
+                self.undo_label,
+                self.project,
+                progress
+            )
+        except OperationCancelled as e:
+            print(f"Velocity adjustment rolled back: {e}")
+            return 0
+        print(f"Adjusted velocities in {count} takes.")
+        return count
 
-    def _adjust_take_velocities(self, take, velocity_change):
-        notes = take.notes
-        for note in notes:
-            self._adjust_note_velocity(note, take, velocity_change)
-        RPR.MIDI_Sort(take.id)
-        print(f"Sorted MIDI events for take ID: {take.id}.")
-
-    def _adjust_note_velocity(self, note, take, velocity_change):
-        new_velocity = min(max(note.velocity + velocity_change, 0), 127)
-        retval, *other_values = RPR.MIDI_GetNote(
-            take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-        )
-        muted, start, end, channel, original_pitch, _ = other_values[-6:]
-        RPR.MIDI_SetNote(
-            take.id,
-            note.index,
-            note.selected,
-            muted,
-            start,
-            end,
-            channel,
-            note.pitch,
-            new_velocity,
-            False
-        )
-        print(f"Updated note (Pitch: {note.pitch}) to new velocity: {new_velocity}.")
+    def _adjust_take_velocities(self, buffer, velocity_change):
+        table = NoteTable.from_buffer(buffer)
+        table.velocity[:] = np.clip(table.velocity + velocity_change, 0, 127)
+        table.apply()
 
 class MidiPitchTransposer(MidiOperationBase):
-    def run(self, interval):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Transpose MIDI Notes"
 
-        notes = take.notes
+    def run(self, interval, scale=None, root=0, edge="clamp"):
+        """Transpose in place; interval is in semitones, or in scale degrees when a scale is given."""
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
-        print(f"Transposing {len(notes)} notes by {interval} semitones.")
-        self.transpose_midi_notes(take, notes, interval)
-
-    def transpose_midi_notes(self, take, notes, interval):
-        note_infos = [note.infos for note in notes]
-
-        # Start a transaction
-        RPR.Undo_BeginBlock2(take.id)
-
-        # Remove original notes
-        for note in notes:
-            RPR.MIDI_DeleteNote(
-                take.id,
-                note.index
-            )
-
-        # Add transposed notes
-        for note_info in note_infos:
-            start_ppq = take.time_to_ppq(note_info["start"])
-            end_ppq = take.time_to_ppq(note_info["end"])
-            new_pitch = note_info["pitch"] + interval
-            take.add_note(
-                start=start_ppq,
-                end=end_ppq,
-                pitch=new_pitch,
-                velocity=note_info["velocity"],
-                channel=note_info["channel"],
-                selected=note_info["selected"],
-                muted=note_info["muted"],
-                unit="ppq",
-                sort=True
-            )
-
-        # End the transaction
-        RPR.Undo_EndBlock2(take.id, "Transpose MIDI Notes", -1)
+        unit = "scale degrees" if scale is not None else "semitones"
+        print(f"Transposing {len(notes)} notes by {interval} {unit}.")
+        self.transpose_midi_notes(buffer, notes, interval, scale, root, edge)
+        self.commit(buffer)
         print("MIDI notes transposed.")
 
+    def transpose_midi_notes(self, buffer, notes, interval, scale=None, root=0, edge="clamp"):
+        # Only the pitch bytes change, so notes keep their index and position
+        table = NoteTable.from_notes(notes)
+        table.pitch[:] = transpose_pitches(table.pitch, interval, scale, root, edge)
+        table.apply()
+
 class MidiVelocityRandomizer(MidiOperationBase):
-    def run(self):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Randomize Velocities"
 
-        notes = take.notes
+    def run(self):
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
         print(f"Randomizing velocities for {len(notes)} notes.")
-        self.randomize_midi_velocities(take, notes)
+        self.randomize_midi_velocities(buffer, notes)
+        self.commit(buffer)
 
-    def randomize_midi_velocities(self, take, notes):
+    def randomize_midi_velocities(self, buffer, notes):
         for note in notes:
-            new_velocity = random.randint(0, 127)
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Updated note (Pitch: {note.pitch}) to new velocity: {new_velocity}.")
+            note.velocity = random.randint(0, 127)
 
 class MidiNoteQuantizer(MidiOperationBase):
-    def run(self):
+    undo_label = "Quantize Notes"
+
+    def __init__(self):
+        super().__init__()
+        self.groove = None
+
+    def capture_groove(self, grid):
+        """Extract a groove template from the active take to apply on later runs."""
         take = self.get_active_take()
         if not take:
-            return
+            return None
+        self.groove = GrooveTemplate.from_take(take, grid, self.project)
+        if self.groove is None:
+            print("No MIDI notes to extract a groove from.")
+        return self.groove
 
-        notes = take.notes
-        if not notes:
+    def run(self, grid=1/8, strength=1.0, swing=0.0, window=1.0, preserve_length=True, use_groove=False):
+        take = self.get_active_take()
+        if not take:
+            return
+        buffer = self.read_take_buffer(take)
+        table = NoteTable.from_buffer(buffer)
+        if not len(table):
             print("No MIDI notes.")
             return
 
-        print(f"Quantizing {len(notes)} notes.")
-        self.quantize_midi_notes(take, notes)
-
-    def quantize_midi_notes(self, take, notes):
-        for note in notes:
-            start_ppq = take.time_to_ppq(note.start)
-            quantized_start_ppq = round(start_ppq / 120) * 120  # Example quantization to nearest 1/8 note
-            end_ppq = take.time_to_ppq(note.end)
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                note.muted,
-                quantized_start_ppq,
-                end_ppq,
-                note.channel,
-                note.pitch,
-                note.velocity,
-                False
-            )
-            print(f"Quantized note (Pitch: {note.pitch}) to start at PPQ: {quantized_start_ppq}.")
+        groove = self.groove if use_groove else None
+        if groove is not None and groove.grid != grid:
+            # Groove offsets are fractions of the groove's own grid step, so quantize on that grid
+            print(f"Using the groove's grid of 1/{round(1 / groove.grid)} instead of 1/{round(1 / grid)}.")
+            grid = groove.grid
+
+        print(f"Quantizing {len(table)} notes.")
+        quantize_grid = QuantizeGrid.from_take(take, grid, table.start.min(), table.end.max(), self.project)
+        self.quantize_midi_notes(table, quantize_grid, strength, swing, window, preserve_length, groove)
+        self.commit(buffer)
+
+    def quantize_midi_notes(self, table, quantize_grid, strength=1.0, swing=0.0, window=1.0,
+                            preserve_length=True, groove=None):
+        moved = quantize_notes(table, quantize_grid, strength, swing, window, preserve_length,
+                               groove, groove_velocity=strength if groove is not None else 0.0)
+        table.apply()
+        print(f"Moved {moved} notes.")
+
+class MidiGrooveApplier(MidiOperationBase):
+    undo_label = "Apply Groove"
+
+    def run(self, name, timing=1.0, velocity=1.0, window=1.0):
+        """Apply a library groove to all selected MIDI takes in one read, one write and one undo point."""
+        groove = load_groove(name)
+        if groove is None:
+            print(f"No groove named {name}")
+            return 0
+
+        buffers, moved = [], 0
+        with session():
+            takes = [item.active_take for item in self.project.selected_items
+                     if item.active_take and item.active_take.is_midi]
+            for take in takes:
+                buffer = self.read_take_buffer(take)
+                table = NoteTable.from_buffer(buffer)
+                if not len(table):
+                    continue
+                quantize_grid = QuantizeGrid.from_take(take, groove.grid, table.start.min(),
+                                                       table.end.max(), self.project)
+                moved += groove.apply(table, quantize_grid, timing, velocity, window)
+                table.apply()
+                buffers.append(buffer)
+
+        if buffers:
+            self.commit(*buffers)
+        print(f"Applied groove {name} to {len(buffers)} takes, moved {moved} notes.")
+        return moved
 
 class MidiTimingHumanizer(MidiOperationBase):
-    def run(self, timing_amount, velocity_amount):
+    undo_label = "Humanize Notes"
+
+    def run(self, timing_amount, velocity_amount, length_amount=0, distribution="gaussian",
+            seed=None, profiles=DEFAULT_PROFILES):
         take = self.get_active_take()
         if not take:
             return
-
-        notes = take.notes
-        if not notes:
+        buffer = self.read_take_buffer(take)
+        table = NoteTable.from_buffer(buffer)
+        if not len(table):
             print("No MIDI notes.")
             return
 
-        print(f"Humanizing timing and velocity for {len(notes)} notes.")
-        self.humanize_midi(take, notes, timing_amount, velocity_amount)
+        print(f"Humanizing timing and velocity for {len(table)} notes.")
+        self.humanize_midi(table, timing_amount, velocity_amount, length_amount, distribution,
+                           np.random.default_rng(seed), get_ticks_per_quarter(take), profiles)
+        self.commit(buffer)
 
-    def humanize_midi(self, take, notes, timing_amount, velocity_amount):
-        for note in notes:
-            # Humanize timing
-            start_ppq = take.time_to_ppq(note.start)
-            timing_variation = random.randint(-timing_amount, timing_amount)
-            humanized_start_ppq = start_ppq + timing_variation
-            
-            # Humanize velocity
-            velocity_variation = random.randint(-velocity_amount, velocity_amount)
-            new_velocity = min(max(note.velocity + velocity_variation, 0), 127)
-            
-            # Apply changes
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                note.muted,
-                humanized_start_ppq,
-                take.time_to_ppq(note.end),
-                note.channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Humanized note (Pitch: {note.pitch}) - Timing: ±{timing_amount}, Velocity: {new_velocity}")
+    def humanize_midi(self, table, timing_amount, velocity_amount, length_amount=0,
+                      distribution="gaussian", rng=None, ticks_per_quarter=960, profiles=DEFAULT_PROFILES):
+        rng = rng if rng is not None else np.random.default_rng()
+        humanize_notes(table, rng, timing_amount, length_amount, velocity_amount,
+                       distribution, ticks_per_quarter, profiles)
+        table.apply()
 
 class MidiVelocityScaler(MidiOperationBase):
-    def run(self):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Scale Velocities"
 
-        notes = take.notes
+    def run(self):
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
         print(f"Scaling velocities for {len(notes)} notes.")
-        self.scale_midi_velocities(take, notes)
+        self.scale_midi_velocities(buffer, notes)
+        self.commit(buffer)
 
-    def scale_midi_velocities(self, take, notes):
+    def scale_midi_velocities(self, buffer, notes):
         scale_factor = 1.2  # Example scale factor
         for note in notes:
-            new_velocity = min(max(int(note.velocity * scale_factor), 0), 127)
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                note.pitch,
-                new_velocity,
-                False
-            )
-            print(f"Scaled note (Pitch: {note.pitch}) to new velocity: {new_velocity}.")
+            note.velocity = min(max(int(note.velocity * scale_factor), 0), 127)
 
 class MidiVelocityNormalizer(MidiOperationBase):
-    def run(self):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Normalize Velocities"
 
-        notes = take.notes
+    def run(self):
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
         print(f"Normalizing velocities for {len(notes)} notes.")
-        self.normalize_midi_velocities(take, notes)
+        self.normalize_midi_velocities(buffer, notes)
+        self.commit(buffer)
 
-    def normalize_midi_velocities(self, take, notes):
-        velocities = [note.velocity for note in notes]
-        median_velocity = statistics.median(velocities)
+    def normalize_midi_velocities(self, buffer, notes):
+        median_velocity = int(get_velocity_cache().get(buffer.take_id, buffer).all.median)
         for note in notes:
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                int(start),  # Ensure start is an integer
-                int(end),    # Ensure end is an integer
-                channel,
-                note.pitch,
-                int(median_velocity),  # Ensure velocity is an integer
-                False
-            )
-            print(f"Normalized note (Pitch: {note.pitch}) to median velocity: {median_velocity}.")
+            note.velocity = median_velocity
+        print(f"Normalized notes to median velocity: {median_velocity}.")
 
 class MidiPitchInverter(MidiOperationBase):
-    def run(self):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Invert Pitch"
 
-        notes = take.notes
+    def run(self, central_pitch=60, edge="clamp"):
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
         print(f"Inverting pitch for {len(notes)} notes.")
-        self.invert_midi_pitch(take, notes)
+        self.invert_midi_pitch(buffer, notes, central_pitch, edge)
+        self.commit(buffer)
 
-    def invert_midi_pitch(self, take, notes):
-        central_pitch = 60  # Example central pitch (Middle C)
-        for note in notes:
-            inverted_pitch = central_pitch - (note.pitch - central_pitch)
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                note.index,
-                note.selected,
-                muted,
-                start,
-                end,
-                channel,
-                inverted_pitch,
-                note.velocity,
-                False
-            )
-            print(f"Inverted note (Original Pitch: {note.pitch}) to pitch: {inverted_pitch}.")
+    def invert_midi_pitch(self, buffer, notes, central_pitch=60, edge="clamp"):
+        # Middle C by default
+        table = NoteTable.from_notes(notes)
+        table.pitch[:] = invert_pitches(table.pitch, central_pitch, edge)
+        table.apply()
 
 class MidiVelocityCompressor(MidiOperationBase):
-    def run(self, threshold, ratio):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Compress Velocities"
 
-        notes = take.notes
+    def run(self, threshold, ratio):
+        buffer, notes = self.load_notes()
         if not notes:
-            print("No MIDI notes.")
             return
 
         print(f"Compressing velocities for {len(notes)} notes with threshold {threshold} and ratio {ratio}:1.")
-        self.compress_midi_velocities(take, notes, threshold, ratio)
+        self.compress_midi_velocities(buffer, notes, threshold, ratio)
+        self.commit(buffer)
 
-    def compress_midi_velocities(self, take, notes, threshold, ratio):
+    def compress_midi_velocities(self, buffer, notes, threshold, ratio):
         for note in notes:
             if note.velocity > threshold:
                 # Calculate compressed velocity
                 excess = note.velocity - threshold
-                compressed_excess = excess / ratio
-                new_velocity = threshold + compressed_excess
-                
+                new_velocity = threshold + excess / ratio
+
                 # Clamp to valid range
-                new_velocity = min(max(int(new_velocity), 0), 127)
-                
-                retval, *other_values = RPR.MIDI_GetNote(
-                    take.id, note.index, 0, 0, 0, 0, 0, 0, 0
-                )
-                muted, start, end, channel, original_pitch, _ = other_values[-6:]
-                RPR.MIDI_SetNote(
-                    take.id,
-                    note.index,
-                    note.selected,
-                    muted,
-                    start,
-                    end,
-                    channel,
-                    note.pitch,
-                    new_velocity,
-                    False
-                )
-                print(f"Compressed note (Pitch: {note.pitch}) from {note.velocity} to {new_velocity}.")
+                note.velocity = min(max(int(new_velocity), 0), 127)
 
 class MidiLegatoMaker(MidiOperationBase):
-    def run(self):
-        take = self.get_active_take()
-        if not take:
-            return
+    undo_label = "Make Legato"
 
-        notes = take.notes
+    def run(self, gap=10, by="all", clean=False, overlap_mode="trim"):
+        # Filter only selected notes
+        buffer, notes = self.load_notes(selected_only=True)
         if not notes:
-            print("No MIDI notes.")
             return
 
-        # Filter only selected notes
-        selected_notes = [note for note in notes if note.selected]
-        print(f"Making {len(selected_notes)} selected notes legato.")
-        self.make_midi_legato(take, selected_notes)
-
-    def make_midi_legato(self, take, notes):
-        for i in range(len(notes) - 1):
-            current_note = notes[i]
-            next_note = notes[i + 1]
-            new_end = take.time_to_ppq(next_note.start) - 10  # Overlap by 10 PPQ
-            retval, *other_values = RPR.MIDI_GetNote(
-                take.id, current_note.index, 0, 0, 0, 0, 0, 0, 0
-            )
-            muted, start, end, channel, original_pitch, _ = other_values[-6:]
-            RPR.MIDI_SetNote(
-                take.id,
-                current_note.index,
-                current_note.selected,
-                muted,
-                start,
-                new_end,
-                channel,
-                current_note.pitch,
-                current_note.velocity,
-                False
-            )
-            print(f"Adjusted note (Pitch: {current_note.pitch}) to end at PPQ: {new_end}.")
+        print(f"Making {len(notes)} selected notes legato.")
+        self.make_midi_legato(buffer, notes, gap, by, clean, overlap_mode)
+        self.commit(buffer)
 
+    def make_midi_legato(self, buffer, notes, gap=10, by="all", clean=False, overlap_mode="trim"):
+        table = NoteTable.from_notes(notes)
+        if clean:
+            # Stacked duplicates would otherwise all be stretched to the same end
+            removed = clean_overlaps(buffer, table, overlap_mode)
+            print(f"Removed {removed} overlapping notes.")
+            table = NoteTable.from_buffer(buffer, selected_only=True)
+        make_legato(table, gap, by)
+        table.apply()
 
+class MidiNoteReverser(MidiOperationBase):
+    undo_label = "Reverse Notes"
 
-class MidiChordGenerator(MidiOperationBase):
     def run(self):
-        take = self.get_active_take()
-        if not take:
+        buffer, notes = self.load_notes()
+        if not notes:
             return
 
-        notes = [note for note in take.notes if note.selected]
+        print(f"Reversing {len(notes)} notes.")
+        self.reverse_midi_notes(buffer, notes)
+        self.commit(buffer)
+
+    def reverse_midi_notes(self, buffer, notes):
+        # Mirror every note inside the span covered by the notes
+        span_start = min(note.start for note in notes)
+        span_end = max(note.end for note in notes)
+        for note in notes:
+            note.start, note.end = span_start + span_end - note.end, span_start + span_end - note.start
+
+class MidiChordGenerator(MidiOperationBase):
+    undo_label = "Generate Chords"
+
+    # Define chord intervals for each type
+    CHORD_INTERVALS = {
+        "Major": [4, 7],
+        "Minor": [3, 7],
+        "7th": [4, 7, 10],
+        "Maj7": [4, 7, 11],
+        "Min7": [3, 7, 10],
+        "Sus2": [2, 7],
+        "Sus4": [5, 7],
+        "Dim": [3, 6],
+        "Aug": [4, 8]
+    }
+
+    def run(self, chord_type="Major"):
+        buffer, notes = self.load_notes(selected_only=True)
         if not notes:
             print("No selected notes to generate chords from")
             return
 
         print(f"Generating chords for {len(notes)} selected notes")
-        self.generate_midi_chords(take, notes)
-
-    def generate_midi_chords(self, take, notes, chord_type):
-        RPR.Undo_BeginBlock2(take.id, "Generate Chords", -1)
-        
-        # Define chord intervals for each type
-        chord_intervals = {
-            "Major": [4, 7],
-            "Minor": [3, 7],
-            "7th": [4, 7, 10],
-            "Maj7": [4, 7, 11],
-            "Min7": [3, 7, 10],
-            "Sus2": [2, 7],
-            "Sus4": [5, 7],
-            "Dim": [3, 6],
-            "Aug": [4, 8]
-        }
-        
-        intervals = chord_intervals.get(chord_type, [4, 7])  # Default to major if invalid
-        
+        self.generate_midi_chords(buffer, notes, chord_type)
+        self.commit(buffer)
+
+    def generate_midi_chords(self, buffer, notes, chord_type):
+        intervals = self.CHORD_INTERVALS.get(chord_type, [4, 7])  # Default to major if invalid
+
         for note in notes:
             for interval in intervals:
-                take.add_note(
-                    start=take.time_to_ppq(note.start),
-                    end=take.time_to_ppq(note.end),
+                if note.pitch + interval > 127:
+                    continue
+                buffer.add_note(
+                    start=note.start,
+                    end=note.end,
                     pitch=note.pitch + interval,
                     velocity=note.velocity,
                     channel=note.channel,
                     selected=False,
-                    muted=note.muted,
-                    unit="ppq",
-                    sort=False
+                    muted=note.muted
                 )
-        
-        RPR.MIDI_Sort(take.id)
-        RPR.Undo_EndBlock2(take.id, "Generate Chords", -1)
+
+class MidiPipelineRunner(MidiOperationBase):
+    undo_label = "MIDI Pipeline"
+
+    def run(self, pipeline):
+        take = self.get_active_take()
+        if not take:
+            return 0
+        return pipeline.run(take, self.project)
 
 def main():
     app = QApplication([])
@@ -1,6 +1,10 @@
 import sys
 import reapy
 from reapy import reascript_api as RPR
+from modules.transport import session, batch, defer
+from modules.project_state import get_project_state
+from modules.reaper_events import get_watcher, MarkersChanged
+from modules.reaper_async import get_reaper_io
 from PySide6.QtWidgets import (QApplication, QMainWindow, QTableWidget,
                                QTableWidgetItem, QPushButton, QVBoxLayout,
                                QWidget, QHeaderView, QLabel, QHBoxLayout,
@@ -13,11 +17,12 @@ class MarkerAdjustWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.project = reapy.Project()
+        self.project_state = get_project_state()
+        self.markers_version = None
         self.sorted_markers = []
         # Get initial time signature from project settings
         self.initial_num, self.initial_denom = self.get_project_time_signature()
         self.time_sig_beats = self.initial_num
-        self.timer = QTimer()
         self.tap_times = []
         # Add debounce timer
         self.debounce_timer = QTimer()
@@ -67,13 +72,21 @@ class MarkerAdjustWindow(QMainWindow):
         
         central_widget.setLayout(layout)
         
-        # Set up refresh timer
-        self.timer.timeout.connect(self.check_for_updates)
-        self.timer.start(2000)  # Check every 2 seconds
+        # Refresh when the shared watcher sees the markers change
+        get_watcher().subscribe(MarkersChanged, self.check_for_updates)
         
     def load_markers(self):
-        # Use list comprehension for faster marker processing
-        markers = sorted(self.project.markers, key=lambda m: m.position)
+        # Read on the I/O thread; the table is filled back here once it's done
+        get_reaper_io().run(self.read_markers, description="Read Markers", quiet=True, done=self.show_markers)
+
+    def read_markers(self):
+        """(markers, version, can_undo) from the shared project state cache, on the I/O thread"""
+        with session():
+            self.project_state.poll()
+            return self.project_state.markers, self.project_state.version("markers"), self.project.can_undo
+
+    def show_markers(self, result):
+        markers, self.markers_version, can_undo = result
         marker_count = len(markers)
         self.apply_btn.setEnabled(marker_count >= 2)
 
@@ -81,7 +94,7 @@ class MarkerAdjustWindow(QMainWindow):
         self.sorted_markers = [None] * marker_count
         for idx, m in enumerate(markers):
             self.sorted_markers[idx] = {
-                'time': m.position,
+                'time': m['position'],
                 'measure': idx + 1,
                 'beat': 1.0,
                 'bpm': 0.0,
@@ -91,7 +104,7 @@ class MarkerAdjustWindow(QMainWindow):
         
         self.calculate_bpms()
         self.populate_table()
-        self.undo_btn.setEnabled(self.project.can_undo)
+        self.undo_btn.setEnabled(can_undo)
         
     def populate_table(self):
         # Disable sorting during updates
@@ -253,17 +266,18 @@ class MarkerAdjustWindow(QMainWindow):
             item.setText(f"{bpm:.2f}" if bpm > 0 else "Invalid")
             
     def apply_changes(self):
-        with reapy.undo_block('Adjust Marker Beat Alignment'):
+        # Every delete and insert below is queued and sent as one pipelined batch
+        with session(), reapy.undo_block('Adjust Marker Beat Alignment'), batch():
             project_id = self.project.id
             
             # Batch delete tempo markers
             num_tempo = RPR.CountTempoTimeSigMarkers(project_id)
             for i in reversed(range(num_tempo)):
-                RPR.DeleteTempoTimeSigMarker(project_id, i)
+                defer(RPR.DeleteTempoTimeSigMarker, project_id, i)
             
             # Batch delete regular markers
             for marker in self.project.markers:
-                marker.delete()
+                defer(marker.delete)
             
             # Batch create new tempo markers
             valid_markers = [
@@ -274,7 +288,8 @@ class MarkerAdjustWindow(QMainWindow):
             
             for prev, current in valid_markers:
                 total_beats = ((prev['measure'] - 1) * prev['numerator']) + prev['beat']
-                RPR.SetTempoTimeSigMarker(
+                defer(
+                    RPR.SetTempoTimeSigMarker,
                     project_id, -1,
                     prev['time'],
                     -1,
@@ -285,10 +300,12 @@ class MarkerAdjustWindow(QMainWindow):
                 )
             
             # Batch recreate markers
-            add_marker = self.project.add_marker
             for marker in self.sorted_markers:
-                add_marker(marker['time'])
+                defer(self.project.add_marker, marker['time'])
         
+        # Our own edit, so the next check doesn't report it as an external change
+        self.project_state.poll()
+        self.markers_version = self.project_state.version("markers")
         self.info_label.setText("Changes applied successfully!")
         self.undo_btn.setEnabled(self.project.can_undo)
         
@@ -296,8 +313,7 @@ class MarkerAdjustWindow(QMainWindow):
         if self.project.can_undo:
             self.project.undo()
             self.info_label.setText("Changes undone")
-            self.load_markers()  # Reload markers to reflect the undo
-            self.undo_btn.setEnabled(self.project.can_undo)
+            self.load_markers()  # Reload markers (and the undo button) to reflect the undo
 
     def eventFilter(self, source, event):
         """Handle mouse wheel events on editable columns"""
@@ -366,19 +382,16 @@ class MarkerAdjustWindow(QMainWindow):
             item.setText(f"{value:{fmt}}".rstrip('0').rstrip('.') if fmt else str(value))
             self.table.blockSignals(False)
 
-    def check_for_updates(self):
+    def check_for_updates(self, event=None):
         """Check for external marker changes and refresh UI"""
-        current_markers = sorted(self.project.markers, key=lambda m: m.position)
-        current_positions = [m.position for m in current_markers]
-        stored_positions = [m['time'] for m in self.sorted_markers]
-        
-        if current_positions != stored_positions:
+        # Changes applied from this window were already synced in apply_changes
+        if self.project_state.version("markers") != self.markers_version:
             self.load_markers()
             self.info_label.setText("Detected marker changes - UI updated")
 
     def closeEvent(self, event):
-        """Stop timer when window closes"""
-        self.timer.stop()
+        """Stop listening for marker changes when window closes"""
+        get_watcher().unsubscribe(MarkersChanged, self.check_for_updates)
         super().closeEvent(event)
 
     def handle_tap_tempo(self):
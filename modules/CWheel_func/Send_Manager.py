@@ -6,6 +6,9 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QTimer, QThread, Signal
 import reapy
 from modules.styles import apply_dark_theme  # Import the stylesheet function
+from modules.transport import session, batch, defer
+from modules.project_state import get_project_state
+from modules.reaper_async import get_reaper_io, OperationsBar
 
 class TrackProcessingThread(QThread):
     tracks_processed = Signal(list)
@@ -66,52 +69,77 @@ class TrackRouter(QMainWindow):
         
         # Set the main widget
         container = QWidget()
-        container.setLayout(main_layout)
+        container_layout = QVBoxLayout(container)
+        container_layout.addLayout(main_layout)
+        container_layout.addWidget(OperationsBar(self))
         self.setCentralWidget(container)
 
+        # REAPER work runs on the shared I/O thread; handlers redraw when it's done
+        self.io = get_reaper_io()
+
         # Initialize track lists
+        self.tracks_version = None
         self.refresh_tracks()
 
     def refresh_tracks(self):
-        with reapy.inside_reaper():
-            project = reapy.Project()
-            
-            # Preserve the current destination track selection
-            current_dest_index = self.destination_combo.currentIndex()
-            
-            # Only update if the number of tracks has changed
-            if self.destination_combo.count() != len(project.tracks):
-                self.destination_combo.clear()
-                for track in project.tracks:
-                    self.destination_combo.addItem(track.name)
-            
-            # Restore the previous destination track selection if possible
-            if current_dest_index >= 0 and current_dest_index < self.destination_combo.count():
-                self.destination_combo.setCurrentIndex(current_dest_index)
-            
-            # Update sends list only if necessary
-            current_sends = set(self.sends_list.item(i).text() for i in range(self.sends_list.count()))
-            new_sends = set()
-            sends_by_dest = {}
-            for track in project.tracks:
-                for send in track.sends:
-                    dest_track = send.dest_track
-                    if dest_track.name not in sends_by_dest:
-                        sends_by_dest[dest_track.name] = []
-                    sends_by_dest[dest_track.name].append(track.name)
-            
-            for dest_name, source_names in sends_by_dest.items():
-                new_sends.add(f"→ {dest_name}")
-                for source_name in source_names:
-                    new_sends.add(f"    {source_name}")
-            if current_sends != new_sends:
-                self.sends_list.clear()
-                for send in new_sends:
-                    self.sends_list.addItem(send)
+        self.io.run(self.read_tracks, description="Read Tracks", done=self.show_tracks)
+
+    def read_tracks(self):
+        """(version, tracks) from the shared project state cache, or None when nothing changed"""
+        # Track names and sends come from the shared project state cache, which
+        # only reads them again once REAPER reports a project change
+        state = get_project_state()
+        state.poll()
+        if state.version("tracks") == self.tracks_version:
+            return None
+        return state.version("tracks"), state.tracks
+
+    def show_tracks(self, result):
+        if result is None:
+            return
+        self.tracks_version, tracks = result
+        names = {track['id']: track['name'] for track in tracks}
+        
+        # Preserve the current destination track selection
+        current_dest_index = self.destination_combo.currentIndex()
+        
+        # Only update if the track names have changed
+        track_names = [track['name'] for track in tracks]
+        if [self.destination_combo.itemText(i) for i in range(self.destination_combo.count())] != track_names:
+            self.destination_combo.clear()
+            for name in track_names:
+                self.destination_combo.addItem(name)
+        
+        # Restore the previous destination track selection if possible
+        if current_dest_index >= 0 and current_dest_index < self.destination_combo.count():
+            self.destination_combo.setCurrentIndex(current_dest_index)
+        
+        # Update sends list only if necessary
+        current_sends = set(self.sends_list.item(i).text() for i in range(self.sends_list.count()))
+        new_sends = set()
+        sends_by_dest = {}
+        for track in tracks:
+            for dest_id in track['sends']:
+                dest_name = names.get(dest_id, "")
+                if dest_name not in sends_by_dest:
+                    sends_by_dest[dest_name] = []
+                sends_by_dest[dest_name].append(track['name'])
+        
+        for dest_name, source_names in sends_by_dest.items():
+            new_sends.add(f"→ {dest_name}")
+            for source_name in source_names:
+                new_sends.add(f"    {source_name}")
+        if current_sends != new_sends:
+            self.sends_list.clear()
+            for send in new_sends:
+                self.sends_list.addItem(send)
 
     def create_send(self):
-        with reapy.inside_reaper():
-            self.refresh_tracks()  # Refresh tracks when the button is pressed
+        self.io.run(self.create_sends, description="Create Send", done=lambda _: self.refresh_tracks())
+
+    def create_sends(self):
+        """Send every selected track but the last to the last one"""
+        with session():
             project = reapy.Project()
             
             # Get all currently selected tracks in Reaper
@@ -123,63 +151,63 @@ class TrackRouter(QMainWindow):
             # Assume the last selected track is the destination
             dest_track = selected_tracks[-1]
             
-            for source_track in selected_tracks[:-1]:
-                # Debugging: Print source and destination track names
-                print(f"Attempting to create send from {source_track.name} to {dest_track.name}")
-                
-                if source_track == dest_track:
-                    continue
+            # Every send goes out in one pipelined batch
+            with batch():
+                for source_track in selected_tracks[:-1]:
+                    # Debugging: Print source and destination track names
+                    print(f"Attempting to create send from {source_track.name} to {dest_track.name}")
                     
-                source_track.add_send(dest_track)
-                print(f"Created send: {source_track.name} → {dest_track.name}")
-            
-            self.refresh_tracks()
+                    if source_track == dest_track:
+                        continue
+                        
+                    defer(source_track.add_send, dest_track)
+                    print(f"Created send: {source_track.name} → {dest_track.name}")
 
     def remove_send(self):
-        with reapy.inside_reaper():
-            self.refresh_tracks()  # Refresh tracks when the button is pressed
+        selected_sends = [send_item.text() for send_item in self.sends_list.selectedItems()]
+        if not selected_sends:
+            print("No sends selected")
+            return
+        self.io.run(self.remove_sends, selected_sends, description="Remove Send",
+                    done=lambda _: self.refresh_tracks())
+
+    def remove_sends(self, send_texts):
+        """Remove the sends listed as 'source → destination'"""
+        with session():
             project = reapy.Project()
-            selected_sends = self.sends_list.selectedItems()
-            
-            if not selected_sends:
-                print("No sends selected")
-                return
-            
-            for send_item in selected_sends:
-                # Parse the send text to get source and destination
-                source_name, dest_name = send_item.text().split(" → ")
-                
-                # Find the corresponding tracks
-                source_track = None
-                for track in project.tracks:
-                    if track.name == source_name:
-                        source_track = track
-                        break
-                
-                if source_track:
-                    # Remove all sends to the destination track
-                    for send in source_track.sends:
-                        dest_track = send.dest_track
-                        if dest_track.name == dest_name:
-                            send.delete()
+            with batch():
+                for send_text in send_texts:
+                    # Parse the send text to get source and destination
+                    source_name, dest_name = send_text.split(" → ")
+                    
+                    # Find the corresponding tracks
+                    source_track = None
+                    for track in project.tracks:
+                        if track.name == source_name:
+                            source_track = track
+                            break
+                    
+                    if source_track:
+                        # Remove all sends to the destination track, highest index first
+                        # so the queued deletes don't shift each other's indices
+                        sends = [send for send in source_track.sends if send.dest_track.name == dest_name]
+                        for send in reversed(sends):
+                            defer(send.delete)
                             print(f"Removed send: {source_name} → {dest_name}")
-            
-            # Refresh the display
-            self.refresh_tracks()
 
     def get_tracks(self):
-        with reapy.inside_reaper():
+        with session():
             project = reapy.Project()
             return project.tracks
 
     def create_send_to_track(self, dest_track):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             selected_tracks = project.selected_tracks
 
             for source_track in selected_tracks:
                 if source_track != dest_track:
-                    source_track.add_send(dest_track)
+                    defer(source_track.add_send, dest_track)
                     print(f"Created send: {source_track.name} → {dest_track.name}")
 
     def update_ui_with_tracks(self, tracks):
@@ -3,6 +3,7 @@ import sys
 from PySide6.QtWidgets import QApplication, QMainWindow, QPushButton, QGridLayout, QWidget, QLabel, QComboBox
 from PySide6.QtCore import Qt
 from modules.styles import apply_dark_theme  # Import the stylesheet function
+from modules.transport import batch, defer
 
 class TrackControlApp(QMainWindow):
     def __init__(self):
@@ -68,36 +69,36 @@ class TrackControlApp(QMainWindow):
         self.setCentralWidget(container)
 
     def mute_all_tracks(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             for track in project.tracks:
-                track.mute()
+                defer(track.mute)
                 print(track.name)
             print("All tracks muted.")
 
     def unmute_all_tracks(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             for track in project.tracks:
-                track.unmute()
+                defer(track.unmute)
             print("All tracks unmuted.")
 
     def solo_all_tracks(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             for track in project.tracks:
-                track.solo()
+                defer(track.solo)
             print("All tracks soloed.")
 
     def unsolo_all_tracks(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             for track in project.tracks:
-                track.unsolo()
+                defer(track.unsolo)
             print("All tracks unsoloed.")
 
     def solo_selected_track_group(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             selected_tracks = [track for track in project.tracks if track.is_selected]
 
@@ -115,15 +116,15 @@ class TrackControlApp(QMainWindow):
                 # Solo all tracks with the same parent
                 for track in project.tracks:
                     if track.parent_track == parent_track:
-                        track.solo()
+                        defer(track.solo)
                         print(f"Soloed track: {track.name}")
 
                 # Solo the parent track
-                parent_track.solo()
+                defer(parent_track.solo)
                 print(f"Soloed parent track: {parent_track.name}")
 
     def unsolo_selected_track_group(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             selected_tracks = [track for track in project.tracks if track.is_selected]
 
@@ -141,15 +142,15 @@ class TrackControlApp(QMainWindow):
                 # Unsolo all tracks with the same parent
                 for track in project.tracks:
                     if track.parent_track == parent_track:
-                        track.unsolo()
+                        defer(track.unsolo)
                         print(f"Unsoloed track: {track.name}")
 
                 # Unsolo the parent track
-                parent_track.unsolo()
+                defer(parent_track.unsolo)
                 print(f"Unsoloed parent track: {parent_track.name}")
 
     def mute_selected_track_group(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             selected_tracks = [track for track in project.tracks if track.is_selected]
 
@@ -167,15 +168,15 @@ class TrackControlApp(QMainWindow):
                 # Mute all tracks with the same parent
                 for track in project.tracks:
                     if track.parent_track == parent_track:
-                        track.mute()
+                        defer(track.mute)
                         print(f"Muted track: {track.name}")
 
                 # Mute the parent track
-                parent_track.mute()
+                defer(parent_track.mute)
                 print(f"Muted parent track: {parent_track.name}")
 
     def unmute_selected_track_group(self):
-        with reapy.inside_reaper():
+        with batch():
             project = reapy.Project()
             selected_tracks = [track for track in project.tracks if track.is_selected]
 
@@ -193,11 +194,11 @@ class TrackControlApp(QMainWindow):
                 # Unmute all tracks with the same parent
                 for track in project.tracks:
                     if track.parent_track == parent_track:
-                        track.unmute()
+                        defer(track.unmute)
                         print(f"Unmuted track: {track.name}")
 
                 # Unmute the parent track
-                parent_track.unmute()
+                defer(parent_track.unmute)
                 print(f"Unmuted parent track: {parent_track.name}")
 
 if __name__ == "__main__":
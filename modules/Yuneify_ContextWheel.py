@@ -9,6 +9,7 @@ from PySide6.QtCore import Qt, QPoint, Signal, QObject, QEvent, QThread, QTimer
 from PySide6.QtGui import QPainter, QColor, QPen, QCursor
 
 from modules.CWheel_func.State_Suite import TrackControlApp
+from modules.transport import connect_backend
 from modules.CWheel_func.MIDI_Suite import MidiSuite
 from modules.CWheel_func.Fast_MIDI_Suite import FastMidiSuite
 from modules.CWheel_func.Send_Manager import TrackRouter
@@ -17,6 +18,8 @@ from modules.CWheel_func.Height_Lock import TrackHeightLock
 from modules.CWheel_func.Auto_VST_Window import FloatingFXController
 from modules.CWheel_func.Insert_Kontakt_Track import create_vst_preset_manager
 from modules.CWheel_func.Marker_Manager import MarkerAdjustWindow
+from modules.midi_pipeline import load_presets, run_preset
+from modules.reaper_async import get_reaper_io, call
 from modules.utils import setup_logger
 
 
@@ -238,6 +241,7 @@ class ContextWheel(QMainWindow):
 
     def toggle_height_lock(self):
         if self.height_lock_enabled:
+            self.height_lock_instance.stop()
             self.height_lock_instance = None
             print("Height Lock disabled")
         else:
@@ -247,6 +251,7 @@ class ContextWheel(QMainWindow):
 
     def toggle_auto_vst_window(self):
         if self.auto_vst_window_enabled:
+            self.auto_vst_window_instance.stop()
             self.auto_vst_window_instance = None
             print("Auto VST Window disabled")
         else:
@@ -343,8 +348,8 @@ def main():
     send_manager_actions = [
         ("Create Send", lambda: create_send_sub_wheel(track_router)),
         ("Remove Send", track_router.remove_send),
-        ("Toggle Height Lock", lambda: TrackHeightLock().toggle_lock()),
-        ("Toggle Auto VST Window", lambda: FloatingFXController().toggle_windows()),
+        ("Toggle Height Lock", lambda: send_manager_wheel.toggle_height_lock()),
+        ("Toggle Auto VST Window", lambda: send_manager_wheel.toggle_auto_vst_window()),
         ("VST Presets", create_vst_preset_manager),
         ("Print Tracks", create_print_tracks),
         ("Marker Manager", lambda: [app.window_references.append(MarkerAdjustWindow()), app.window_references[-1].show()])
@@ -359,6 +364,13 @@ def main():
         ("Legato", lambda: FastMidiSuite().make_legato()),
         ("CC Adjust", lambda: FastMidiSuite().adjust_cc_right())
     ]
+    # Saved MIDI pipeline presets, each applied as one fused edit
+    pipeline_presets = list(load_presets())
+    if pipeline_presets:
+        midi_suite_actions.append(
+            ("Pipelines", [(name, lambda n=name: get_reaper_io().submit(call(run_preset, n), f"MIDI Pipeline: {n}"))
+                           for name in pipeline_presets])
+        )
     midi_suite_wheel = ContextWheel(midi_suite_actions)
     app.window_references.append(midi_suite_wheel)
 
@@ -374,4 +386,5 @@ def main():
     app.exec()
     
 if __name__ == "__main__":
+    connect_backend()
     main()
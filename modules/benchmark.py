@@ -0,0 +1,470 @@
+"""Benchmarks for Yuneify's MIDI operations on reproducible synthetic takes.
+
+Every velocity, CC, quantize, legato, transpose and filter operation runs
+against takes of 1k / 10k / 100k notes (dense piano, drum grids, long CC
+lanes) on a local fake REAPER (modules.fake_reaper), or on any REAPER
+given with --backend. Wall time, distant API call count and peak Python
+memory are recorded per operation, appended to a JSON history and compared
+against a baseline:
+
+    python -m modules.benchmark --sizes 1000 10000
+    python -m modules.benchmark --save-baseline
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import contextlib
+import subprocess
+import tracemalloc
+import numpy as np
+
+BENCHMARK_DIR = "benchmarks"
+HISTORY_PATH = os.path.join(BENCHMARK_DIR, "history.json")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+SIZES = (1000, 10000, 100000)
+KINDS = ("piano", "drums", "cc")
+
+# Relative slowdown (or memory growth) over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.2
+
+# Timing differences below this are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.005
+
+TICKS_PER_QUARTER = 960
+
+
+def piano_events(count, rng):
+    """Dense two-hand piano: overlapping chords and runs on a jittered 1/16 grid"""
+    starts = np.sort(rng.integers(0, count // 4 + 1, size=count)) * (TICKS_PER_QUARTER // 4)
+    starts = np.maximum(starts + rng.integers(-12, 13, size=count), 0)
+    lengths = rng.choice(np.array([1, 2, 4, 8]) * (TICKS_PER_QUARTER // 4), size=count)
+    pitches = rng.integers(36, 97, size=count)
+    velocities = rng.integers(30, 111, size=count)
+    return _note_events(starts, starts + lengths, pitches, velocities, rng.random(count) < 0.5)
+
+
+# (16th step, pitch, base velocity) of one drum bar
+_DRUM_BAR = [(step, 42, 70 + 20 * (step % 4 == 0)) for step in range(16)] + [
+    (0, 36, 110), (8, 36, 105), (10, 36, 90), (4, 38, 105), (12, 38, 110), (14, 46, 80),
+]
+
+
+def drum_events(count, rng):
+    """A four-on-the-floor drum grid: hats every 16th, kick and snare with accents"""
+    bar = np.array(_DRUM_BAR)
+    bars = -(-count // len(bar))
+    steps = (bar[:, 0][None, :] + 16 * np.arange(bars)[:, None]).ravel()[:count]
+    starts = steps * (TICKS_PER_QUARTER // 4)
+    pitches = np.tile(bar[:, 1], bars)[:count]
+    velocities = np.clip(np.tile(bar[:, 2], bars)[:count] + rng.integers(-8, 9, size=count), 1, 127)
+    order = np.argsort(starts, kind="stable")
+    return _note_events(starts[order], starts[order] + TICKS_PER_QUARTER // 8, pitches[order],
+                        velocities[order], rng.random(count) < 0.5)
+
+
+def cc_events(count, rng):
+    """Long CC lanes (mod wheel, expression, sustain, pitch bend) under sparse pad notes"""
+    from modules.take_buffer import MidiEvent
+
+    lanes = 4
+    per_lane = -(-count // lanes)
+    positions = np.arange(per_lane) * (TICKS_PER_QUARTER // 32)
+    phase = positions / (4 * TICKS_PER_QUARTER)
+    curves = [
+        (0xB0, 1, 64 + 60 * np.sin(2 * np.pi * phase / 3)),
+        (0xB0, 11, 80 + 40 * np.sin(2 * np.pi * phase / 7)),
+        (0xB0, 64, np.where(np.sin(2 * np.pi * phase) > 0, 127, 0)),
+        (0xE0, None, 8192 + 6000 * np.sin(2 * np.pi * phase / 5)),
+    ]
+    events = []
+    for status, number, values in curves:
+        values = np.clip(values + rng.normal(0, 2, size=per_lane), 0, 16383 if number is None else 127).astype(int)
+        selected = rng.random(per_lane) < 0.5
+        for ppq, value, sel in zip(positions, values, selected):
+            msg = (status, value & 0x7F, value >> 7) if number is None else (status, number, value)
+            events.append(MidiEvent(int(ppq), int(sel), bytes(msg)))
+    events = events[:count]
+
+    pads = max(count // 20, 1)
+    starts = np.arange(pads) * 2 * TICKS_PER_QUARTER
+    pitches = rng.integers(48, 73, size=pads)
+    events.extend(_note_events(starts, starts + 2 * TICKS_PER_QUARTER - 10, pitches,
+                               rng.integers(50, 100, size=pads), rng.random(pads) < 0.5))
+    return events
+
+
+def _note_events(starts, ends, pitches, velocities, selected):
+    from modules.take_buffer import NOTE_OFF, NOTE_ON, MidiEvent
+
+    events = []
+    for start, end, pitch, velocity, sel in zip(starts, ends, pitches, velocities, selected):
+        events.append(MidiEvent(int(start), int(sel), bytes((NOTE_ON, int(pitch), int(velocity)))))
+        events.append(MidiEvent(int(end), int(sel), bytes((NOTE_OFF, int(pitch), 0))))
+    return events
+
+
+GENERATORS = {"piano": piano_events, "drums": drum_events, "cc": cc_events}
+
+
+def synthetic_take(kind, size, seed=0):
+    """Packed event stream of a synthetic take; the same kind, size and seed give the same bytes"""
+    from modules.take_buffer import encode_events
+
+    rng = np.random.default_rng([seed, size, KINDS.index(kind)])
+    return encode_events(GENERATORS[kind](size, rng))
+
+
+def _edit_selected(description, edit):
+    """run(take) for an engine function that edits a TakeBuffer, committed as reaper_async.edit_take does"""
+    def run(take):
+        from modules.edit_transaction import MidiEditTransaction
+
+        with MidiEditTransaction(description) as txn:
+            return edit(txn.open(take))
+    return run
+
+
+def _ops_operations(seed):
+    from modules.AI_func.ops.velocity_ops import VelocityOperations
+    from modules.AI_func.ops.cc_ops import CCOperations
+    from modules.AI_func.ops.filter_ops import FilterOperations
+
+    velocity, cc, filters = VelocityOperations(), CCOperations(), FilterOperations()
+    velocity.rng = np.random.default_rng(seed)
+    curve = [(0.0, 0), (0.5, 127), (1.0, 20)]
+    return [
+        ("velocity_ops.randomize", lambda take: velocity.randomize(40, 100)),
+        ("velocity_ops.normalize", lambda take: velocity.normalize()),
+        ("velocity_ops.compress", lambda take: velocity.compress(40, 100)),
+        ("velocity_ops.scale", lambda take: velocity.scale(1.2)),
+        ("velocity_ops.adjust", lambda take: velocity.adjust_velocity_bulk(5)),
+        ("cc_ops.curve", lambda take: cc.apply_curve(1, curve)),
+        ("cc_ops.curve_density", lambda take: cc.apply_curve(1, curve, density=8)),
+        ("cc_ops.thin", lambda take: cc.thin_cc(1.0)),
+        ("cc_ops.resample", lambda take: cc.resample_cc(16)),
+        ("cc_ops.adjust", lambda take: cc.adjust_cc_bulk(5)),
+        ("filter_ops.filters", lambda take: filters.apply_filters(["Notes", "CC"], 40, 100)),
+        ("filter_ops.query", lambda take: filters.select("note and vel<40")),
+    ]
+
+
+def _midi_suite_operations(seed):
+    instances = {}
+
+    def op(name, call):
+        """run(take) calling call on one MIDI_Suite operation instance, as MidiSuite.init_midi_operations keeps them.
+
+        MIDI_Suite needs PySide6, so it is imported on the first run: without
+        it every operation is reported with the import error.
+        """
+        def run(take):
+            if name not in instances:
+                from modules.CWheel_func import MIDI_Suite as suite
+                instances[name] = getattr(suite, name)()
+            return call(instances[name])
+        return run
+
+    return [
+        ("midi_suite.adjust", op("MidiVelocityAdjuster", lambda adjuster: adjuster.run(5))),
+        ("midi_suite.randomize", op("MidiVelocityRandomizer", lambda randomizer: randomizer.run())),
+        ("midi_suite.scale", op("MidiVelocityScaler", lambda scaler: scaler.run())),
+        ("midi_suite.normalize", op("MidiVelocityNormalizer", lambda normalizer: normalizer.run())),
+        ("midi_suite.compress", op("MidiVelocityCompressor", lambda compressor: compressor.run(90, 2))),
+        ("midi_suite.transpose", op("MidiPitchTransposer", lambda transposer: transposer.run(2))),
+        ("midi_suite.transpose_scale", op("MidiPitchTransposer", lambda transposer: transposer.run(1, "Major", 0))),
+        ("midi_suite.invert", op("MidiPitchInverter", lambda inverter: inverter.run(60))),
+        ("midi_suite.quantize", op("MidiNoteQuantizer", lambda quantizer: quantizer.run(1/16))),
+        ("midi_suite.humanize", op("MidiTimingHumanizer", lambda humanizer: humanizer.run(10, 8, seed=seed))),
+        ("midi_suite.legato", op("MidiLegatoMaker", lambda legato: legato.run(10))),
+        ("midi_suite.reverse", op("MidiNoteReverser", lambda reverser: reverser.run())),
+    ]
+
+
+def _fast_suite_operations(seed):
+    # The same engine functions FastMidiSuite's handlers run on the active take
+    from modules.quantize import quantize_selected
+    from modules.legato import legato_selected
+    from modules.humanize import humanize_selected
+
+    return [
+        ("fast_suite.quantize", _edit_selected("Quantize Notes", lambda buffer: quantize_selected(buffer, 1/16))),
+        ("fast_suite.legato", _edit_selected("Make Legato", lambda buffer: legato_selected(buffer, 10))),
+        ("fast_suite.humanize", _edit_selected(
+            "Humanize Notes",
+            lambda buffer: humanize_selected(buffer, np.random.default_rng(seed), 10, 0, 8, "gaussian"))),
+    ]
+
+
+def operations(seed=0, only=None):
+    """(name, run(take)) for every benchmarked operation whose name contains one of only.
+
+    An operation that can't run here (MIDI_Suite needs PySide6) is reported
+    with its error, and counts as a regression against a baseline it ran in.
+    """
+    found = []
+    for group in (_ops_operations, _midi_suite_operations, _fast_suite_operations):
+        found.extend(group(seed))
+    if only:
+        found = [(name, run) for name, run in found if any(part in name for part in only)]
+    return found
+
+
+@contextlib.contextmanager
+def count_calls():
+    """Count distant API requests sent while the scope runs (HOLD/RELEASE excluded)."""
+    from reapy.tools.network import machines
+
+    counter = {"calls": 0}
+    client = machines.get_selected_client()
+    if client is None:
+        yield counter
+        return
+    send = client.send
+
+    def counting_send(data):
+        if b'"HOLD"' not in data[:40] and b'"RELEASE"' not in data[:40]:
+            counter["calls"] += 1
+        return send(data)
+
+    client.send = counting_send
+    try:
+        yield counter
+    finally:
+        del client.send
+
+
+class BenchmarkRunner:
+    """Runs operations on one synthetic take at a time in the connected project.
+
+    Each take gets its own track, so operations that act on every MIDI item
+    only see that take. Before every run the take is rewritten with its
+    original events and the velocity cache and edit journal are cleared, so
+    runs are independent and repeatable.
+    """
+
+    def __init__(self, repeat=3, seed=0):
+        import reapy
+        from modules.transport import session
+
+        with session():
+            self.project = reapy.Project()
+        self.repeat = repeat
+        self.seed = seed
+
+    def create_take(self, data):
+        """A new track holding one selected MIDI item with the packed events"""
+        from reapy import reascript_api as RPR
+        from modules.take_buffer import decode_events, write_events
+        from modules.transport import session
+
+        events = decode_events(data)
+        quarters = (events[-1].ppq if events else 0) / TICKS_PER_QUARTER + 1
+        with session():
+            index = RPR.CountTracks(self.project.id)
+            RPR.InsertTrackAtIndex(index, True)
+            track = RPR.GetTrack(self.project.id, index)
+            item = RPR.CreateNewMIDIItemInProj(track, 0, RPR.TimeMap2_QNToTime(self.project.id, quarters), False)
+            take = RPR.GetActiveTake(item)
+            write_events(take, data)
+        return track, item, take
+
+    def reset(self, item, take, data):
+        """Restore the take, select only its item and reseed the random sources operations use"""
+        from reapy import reascript_api as RPR
+        from modules.edit_journal import get_journal
+        from modules.take_buffer import write_events
+        from modules.transport import session
+        from modules.velocity_stats import get_velocity_cache
+
+        with session():
+            RPR.SelectAllMediaItems(self.project.id, False)
+            RPR.SetMediaItemSelected(item, True)
+            write_events(take, data)
+        get_velocity_cache().invalidate()
+        get_journal().clear()
+        random.seed(self.seed)
+
+    def measure(self, run, item, take, data):
+        """{"seconds", "calls", "peak_kb"} of one operation: best of repeat timed runs plus one traced run"""
+        import reapy
+
+        take_object = reapy.Take(take)
+        seconds = []
+        for _ in range(self.repeat):
+            self.reset(item, take, data)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                run(take_object)
+                seconds.append(time.perf_counter() - start)
+
+        # Tracing slows Python down, so calls and memory come from a separate run
+        self.reset(item, take, data)
+        tracemalloc.start()
+        try:
+            with count_calls() as counter, contextlib.redirect_stdout(io.StringIO()):
+                run(take_object)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {"seconds": round(min(seconds), 6), "calls": counter["calls"], "peak_kb": round(peak / 1024, 1)}
+
+    def run(self, kinds=KINDS, sizes=SIZES, only=None):
+        from reapy import reascript_api as RPR
+
+        ops = operations(self.seed, only)
+        results = []
+        for kind in kinds:
+            for size in sizes:
+                data = synthetic_take(kind, size, self.seed)
+                track, item, take = self.create_take(data)
+                try:
+                    for name, run in ops:
+                        result = {"operation": name, "take": f"{kind}-{size}"}
+                        try:
+                            result.update(self.measure(run, item, take, data))
+                        except Exception as e:
+                            result["error"] = f"{type(e).__name__}: {e}"
+                        results.append(result)
+                        print(_format_result(result), flush=True)
+                finally:
+                    RPR.DeleteTrack(track)
+        return results
+
+
+def _format_result(result):
+    if "error" in result:
+        return f"{result['operation']:<28} {result['take']:<14} ERROR {result['error']}"
+    return (f"{result['operation']:<28} {result['take']:<14} {1000 * result['seconds']:>10.1f} ms "
+            f"{result['calls']:>6} calls {result['peak_kb']:>10.1f} KiB")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_record(results, **settings):
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "settings": settings,
+        "results": results,
+    }
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def append_history(record, path=HISTORY_PATH):
+    history = load_history(path)
+    history.append(record)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=1)
+    return len(history)
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(record, path=BASELINE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(record, f, indent=1)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regression messages for results that are slower, chattier or hungrier than the baseline"""
+    previous = {(r["operation"], r["take"]): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result["operation"], result["take"]))
+        if before is None:
+            continue
+        label = f"{result['operation']} on {result['take']}"
+        if "error" in result:
+            regressions.append(f"{label}: did not run ({result['error']})")
+            continue
+        if (result["seconds"] > before["seconds"] * (1 + threshold)
+                and result["seconds"] - before["seconds"] > MIN_REGRESSION_SECONDS):
+            regressions.append(f"{label}: {1000 * before['seconds']:.1f} -> {1000 * result['seconds']:.1f} ms")
+        if result["calls"] > before["calls"]:
+            regressions.append(f"{label}: {before['calls']} -> {result['calls']} API calls")
+        if result["peak_kb"] > before["peak_kb"] * (1 + threshold) and result["peak_kb"] - before["peak_kb"] > 64:
+            regressions.append(f"{label}: {before['peak_kb']:.0f} -> {result['peak_kb']:.0f} KiB peak")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Yuneify MIDI operations on synthetic takes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--ops", nargs="+", help="only operations whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake REAPER per-call latency in ms")
+    parser.add_argument("--backend", help="host:web_interface_port of a running REAPER instead of a fake one")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    from modules.transport import connect_backend
+
+    server = None
+    if args.backend:
+        host, _, port = args.backend.rpartition(":")
+        backend = (host or "localhost", int(port))
+    else:
+        from modules.fake_reaper.server import DEFAULT_WEB_INTERFACE_PORT, spawn
+        server = spawn(latency=args.latency / 1000, demo=False)
+        backend = ("localhost", DEFAULT_WEB_INTERFACE_PORT)
+    try:
+        if not connect_backend(*backend):
+            print(f"Could not reach REAPER at {backend[0]}:{backend[1]}.")
+            return 2
+        results = BenchmarkRunner(args.repeat, args.seed).run(args.kinds, args.sizes, args.ops)
+    finally:
+        if server is not None:
+            server.terminate()
+
+    record = make_record(results, sizes=args.sizes, kinds=args.kinds, repeat=args.repeat, seed=args.seed,
+                         latency_ms=args.latency, backend="fake" if server is not None else args.backend)
+    count = append_history(record, args.history)
+    print(f"Recorded run {count} in {args.history}.")
+
+    if args.save_baseline:
+        save_baseline(record, args.baseline)
+        print(f"Saved baseline to {args.baseline}.")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline to compare against; run with --save-baseline to create one.")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regressions over {args.threshold:.0%} against the baseline from {baseline['timestamp']}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+from math import comb
+import numpy as np
+
+CURVE_SHAPES = ("linear", "exponential", "s-curve", "bezier", "stepped")
+
+# Samples used to turn a Bezier curve into a lookup table
+BEZIER_SAMPLES = 1024
+
+
+class CCCurve:
+    """A curve through (position, value) points, precomputed once and evaluated for many positions.
+
+    Positions and values are normalized to 0..1. linear, exponential and
+    s-curve shape each segment between neighbouring points, stepped holds each
+    point's value until the next one, and bezier uses the points as control
+    points of a single smooth curve.
+    """
+
+    def __init__(self, points, shape="linear", exponent=2.0):
+        if shape not in CURVE_SHAPES:
+            raise ValueError(f"Unknown curve shape: {shape}")
+        points = sorted(points)
+        if len(points) < 2:
+            raise ValueError("A curve needs at least two points")
+        self.shape = shape
+        self.exponent = exponent
+        self.x = np.array([p[0] for p in points], dtype=np.float64)
+        self.y = np.array([p[1] for p in points], dtype=np.float64)
+        if shape == "bezier":
+            self.x, self.y = self._bezier_table()
+
+    @classmethod
+    def from_points(cls, points, shape="linear", exponent=2.0):
+        """Build a curve from points in any units, normalizing both axes to their span."""
+        x = np.array([p[0] for p in points], dtype=np.float64)
+        y = np.array([p[1] for p in points], dtype=np.float64)
+        x_span = (x.max() - x.min()) or 1.0
+        return cls(zip((x - x.min()) / x_span, y / 127), shape, exponent)
+
+    def _bezier_table(self):
+        n = len(self.x) - 1
+        t = np.linspace(0, 1, BEZIER_SAMPLES)[:, None]
+        k = np.arange(n + 1)
+        weights = np.array([comb(n, i) for i in k]) * t ** k * (1 - t) ** (n - k)
+        return weights @ self.x, weights @ self.y
+
+    def _ease(self, t):
+        if self.shape == "exponential":
+            return t ** self.exponent
+        if self.shape == "s-curve":
+            return t * t * (3 - 2 * t)
+        return t
+
+    def evaluate(self, positions):
+        """Return curve values (0..1) at normalized positions, holding the end values outside the curve."""
+        positions = np.clip(np.asarray(positions, dtype=np.float64), self.x[0], self.x[-1])
+        if self.shape in ("linear", "bezier"):
+            return np.interp(positions, self.x, self.y)
+
+        segment = np.clip(np.searchsorted(self.x, positions, side="right") - 1, 0, len(self.x) - 2)
+        if self.shape == "stepped":
+            return np.where(positions >= self.x[-1], self.y[-1], self.y[segment])
+        x0, x1 = self.x[segment], self.x[segment + 1]
+        y0, y1 = self.y[segment], self.y[segment + 1]
+        width = np.where(x1 > x0, x1 - x0, 1.0)
+        return y0 + (y1 - y0) * self._ease((positions - x0) / width)
+
+
+def curve_values(curve, positions, start, end, original=None, blend=1.0):
+    """Evaluate a curve over PPQ positions spanning start..end as 0-127 CC values.
+
+    With blend below 1 the result is mixed with the original values.
+    """
+    span = (end - start) or 1
+    values = curve.evaluate((np.asarray(positions, dtype=np.float64) - start) / span) * 127
+    if original is not None and blend < 1.0:
+        values = np.asarray(original, dtype=np.float64) * (1 - blend) + values * blend
+    return np.clip(np.round(values), 0, 127).astype(np.int64)
+
+
+def density_positions(start, end, ticks_per_quarter, density):
+    """PPQ positions for density events per quarter note between start and end."""
+    step = ticks_per_quarter / density
+    return np.arange(start, end, step).round()
+
+
+def drop_repeats(positions, values):
+    """Keep only events whose value differs from the one before."""
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return positions[keep], values[keep]
+
+
+def thin_lane(positions, values, tolerance=1.0):
+    """Ramer-Douglas-Peucker thinning measured in CC value units.
+
+    Returns a mask of the events to keep: the lane drawn linearly through the
+    kept events never strays more than tolerance from any dropped event. The
+    first and last events are always kept.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = np.zeros(len(values), dtype=bool)
+    if len(values) <= 2:
+        keep[:] = True
+        return keep
+
+    keep[0] = keep[-1] = True
+    stack = [(0, len(values) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = slice(first + 1, last)
+        span = positions[last] - positions[first]
+        if span > 0:
+            t = (positions[inner] - positions[first]) / span
+        else:
+            t = np.zeros(last - first - 1)
+        line = values[first] + (values[last] - values[first]) * t
+        error = np.abs(values[inner] - line)
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def resample_lane(positions, values, step, interpolate=True):
+    """Resample a lane onto a fixed grid of step ticks between its first and last events.
+
+    interpolate draws straight lines between the original events, otherwise
+    each grid point holds the last value before it. Repeated values are dropped.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    grid = np.union1d(np.arange(positions[0], positions[-1], step).round(), positions[-1:])
+    if interpolate:
+        new_values = np.interp(grid, positions, values)
+    else:
+        new_values = values[np.searchsorted(positions, grid, side="right") - 1]
+    return drop_repeats(grid, np.round(new_values).astype(np.int64))
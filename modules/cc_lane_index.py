@@ -0,0 +1,69 @@
+import numpy as np
+from modules.take_buffer import CONTROL_CHANGE
+
+
+class CCLane:
+    """The events of one (channel, cc number) lane as position-sorted arrays.
+
+    values can be edited in place as a whole array; ``apply`` writes back only
+    the events whose value changed.
+    """
+
+    def __init__(self, channel, number, events):
+        self.channel = channel
+        self.number = number
+        self.events = events
+        self.positions = np.array([event.ppq for event in events], dtype=np.float64)
+        self.values = np.array([event.msg[2] for event in events], dtype=np.int16)
+        self.selected = np.array([event.selected for event in events], dtype=bool)
+        self._original = self.values.copy()
+
+    def __len__(self):
+        return len(self.events)
+
+    def target(self):
+        """Mask of the events an edit applies to: the selected ones, or the whole lane if none are."""
+        return self.selected if self.selected.any() else np.ones(len(self), dtype=bool)
+
+    def apply(self):
+        """Push changed values back into the buffer events and return how many changed."""
+        self.values[:] = np.clip(self.values, 0, 127)
+        changed = np.flatnonzero(self.values != self._original)
+        for i in changed:
+            self.events[i].msg[2] = int(self.values[i])
+        self._original = self.values.copy()
+        return len(changed)
+
+
+class CCLaneIndex:
+    """Control change events of a take buffer grouped by (channel, cc number), built in one pass."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        events = [event for event in buffer.events
+                  if event.status == CONTROL_CHANGE and len(event.msg) > 2]
+        self.lanes = {}
+        if not events:
+            return
+
+        keys = np.array([(event.msg[0] & 0x0F) * 128 + event.msg[1] for event in events])
+        positions = np.array([event.ppq for event in events], dtype=np.float64)
+        order = np.lexsort((positions, keys))
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for lane_order in np.split(order, bounds):
+            key = int(keys[lane_order[0]])
+            channel, number = divmod(key, 128)
+            self.lanes[(channel, number)] = CCLane(channel, number, [events[i] for i in lane_order])
+
+    def lane(self, channel, number):
+        return self.lanes.get((channel, number))
+
+    def lanes_for(self, number, channel=None):
+        """Every lane of a cc number, or only the one on a channel."""
+        return [lane for (lane_channel, lane_number), lane in self.lanes.items()
+                if lane_number == number and (channel is None or lane_channel == channel)]
+
+    def apply(self):
+        """Push every lane's edits back into the buffer and return how many events changed."""
+        return sum(lane.apply() for lane in self.lanes.values())
@@ -1,9 +1,12 @@
 from PySide6.QtWidgets import (QWidget, QPushButton, QVBoxLayout, QLabel, QHBoxLayout, QGridLayout, QSizePolicy)
-from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QPoint
+from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QPoint
 from PySide6.QtGui import QColor, QPainter, QBrush, QPen, QFont
 import reapy
 from reapy import reascript_api as RPR
 from modules.styles import apply_dark_theme
+from modules.project_state import get_project_state
+from modules.reaper_events import get_watcher, TakeEdited
+from modules.reaper_async import get_reaper_io
 from reapy.core.reaper.midi import get_active_editor as get_active_midi_editor
 import statistics
 
@@ -31,10 +34,8 @@ class ContextToolsWindow(QWidget):
         layout.addWidget(self.quantize_btn)
         layout.addWidget(self.humanize_btn)
         
-        # Position tracking
-        self.position_timer = QTimer(self)
-        self.position_timer.timeout.connect(self.check_selection)
-        self.position_timer.start(100)
+        # Position tracking follows edits and selection changes in the editor's take
+        get_watcher().subscribe(TakeEdited, self.check_selection)
         
     def follow_mouse(self):
         """Smart positioning relative to MIDI editor or selection"""
@@ -86,70 +87,85 @@ class ContextToolsWindow(QWidget):
         self.last_scroll_pos = (0, 0)
         self.last_zoom = 0
         self.position_history = QPoint(0, 0)
+        self.last_take_version = None
         
-    def check_selection(self):
-        try:
-            editor = get_active_midi_editor()
-            if not editor:
-                return
-                
-            # Cache editor state if changed
-            if editor.id != self.last_editor_id:
-                self.last_editor_id = editor.id
-                self.last_scroll_pos = (
-                    RPR.MIDIEditor_GetSetting_int(editor.id, "scroll_x"),
-                    RPR.MIDIEditor_GetSetting_int(editor.id, "scroll_y")
-                )
-                self.last_zoom = RPR.MIDIEditor_GetSetting_int(editor.id, "zoom")
-                
-            take = editor.take
-            if not take:
-                return
-                
-            # Batch get all selected events
-            selected_notes = take.get_selected_notes()
-            selected_cc = take.get_selected_cc()
-            
-            if selected_notes:
-                # Calculate using numpy for speed
-                avg_pos = statistics.mean(n.start for n in selected_notes)
-                avg_pitch = statistics.mean(n.pitch for n in selected_notes)
-                
-                # Convert using cached scroll/zoom
-                x = int((avg_pos - self.last_scroll_pos[0]) * self.last_zoom)
-                y = int((127 - avg_pitch - self.last_scroll_pos[1]) * self.last_zoom)
-                
-                new_pos = QPoint(
-                    self.parent().x() + x + 50,
-                    self.parent().y() + y
-                )
-                
-            elif selected_cc:
-                first_cc = selected_cc[0]
-                x = int((first_cc.position - self.last_scroll_pos[0]) * self.last_zoom)
-                y = int((127 - first_cc.value - self.last_scroll_pos[1]) * self.last_zoom)
-                
-                new_pos = QPoint(
-                    self.parent().x() + x + 50,
-                    self.parent().y() + y
-                )
-                
-            else:
-                return
-                
-            # Animate position changes smoothly
-            if new_pos != self.position_history:
-                anim = QPropertyAnimation(self, b"pos")
-                anim.setDuration(100)
-                anim.setStartValue(self.pos())
-                anim.setEndValue(new_pos)
-                anim.setEasingCurve(QEasingCurve.OutQuad)
-                anim.start()
-                self.position_history = new_pos
-                
-        except Exception as e:
-            print(f"Positioning error: {e}")
-            
+    def check_selection(self, event=None):
+        # The shared cache only re-reads the take when its event hash changes
+        state = get_project_state()
+        if state.version("selected_take") == self.last_take_version:
+            return
+        self.last_take_version = state.version("selected_take")
+        buffer = state.selected_take
+        if buffer is None:
+            return
+        # Editor settings and project times are read on the I/O thread, never blocking the UI
+        get_reaper_io().run(self.read_selection_position, buffer, self.last_editor_id,
+                            description="Locate selection", quiet=True,
+                            done=self.move_to_selection,
+                            failed=lambda error: print(f"Positioning error: {error}"))
+
+    @staticmethod
+    def read_selection_position(buffer, last_editor_id):
+        """(editor id, new editor settings or None, project time, value) of the selection, on the I/O thread"""
+        editor = get_active_midi_editor()
+        if not editor:
+            return None
+
+        # Editor settings are only read again when the editor changed
+        settings = None
+        if editor.id != last_editor_id:
+            settings = (
+                (RPR.MIDIEditor_GetSetting_int(editor.id, "scroll_x"),
+                 RPR.MIDIEditor_GetSetting_int(editor.id, "scroll_y")),
+                RPR.MIDIEditor_GetSetting_int(editor.id, "zoom")
+            )
+
+        # Selected events come from the cached buffer, not one call per event
+        selected_notes = buffer.selected_notes
+        selected_cc = [event for event in buffer.cc_events if event.selected]
+
+        if selected_notes:
+            avg_ppq = statistics.mean(n.start for n in selected_notes)
+            position = RPR.MIDI_GetProjTimeFromPPQPos(buffer.take_id, avg_ppq)
+            value = statistics.mean(n.pitch for n in selected_notes)
+        elif selected_cc:
+            first_cc = selected_cc[0]
+            position = RPR.MIDI_GetProjTimeFromPPQPos(buffer.take_id, first_cc.ppq)
+            value = first_cc.msg[2] if len(first_cc.msg) > 2 else 0
+        else:
+            position = value = None
+        return editor.id, settings, position, value
+
+    def move_to_selection(self, result):
+        if result is None:
+            return
+        editor_id, settings, position, value = result
+        # Cache editor state if changed
+        if settings is not None:
+            self.last_editor_id = editor_id
+            self.last_scroll_pos, self.last_zoom = settings
+        if position is None:
+            return
+
+        # Convert using cached scroll/zoom
+        x = int((position - self.last_scroll_pos[0]) * self.last_zoom)
+        y = int((127 - value - self.last_scroll_pos[1]) * self.last_zoom)
+
+        new_pos = QPoint(
+            self.parent().x() + x + 50,
+            self.parent().y() + y
+        )
+
+        # Animate position changes smoothly
+        if new_pos != self.position_history:
+            anim = QPropertyAnimation(self, b"pos")
+            anim.setDuration(100)
+            anim.setStartValue(self.pos())
+            anim.setEndValue(new_pos)
+            anim.setEasingCurve(QEasingCurve.OutQuad)
+            anim.start()
+            self.position_history = new_pos
+
     def update_tools(self, selection_type):
         if selection_type == self.last_selection_type:
             return
@@ -0,0 +1,180 @@
+from collections import Counter
+from modules.take_buffer import MidiEvent, decode_events
+from modules.transport import session
+
+# Default memory budget for all journal entries together
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Rough per-event bookkeeping cost on top of the message bytes
+_EVENT_OVERHEAD = 64
+
+
+def _event_keys(data):
+    return [(int(round(event.ppq)), event.flags, bytes(event.msg)) for event in decode_events(data)]
+
+
+def diff_streams(before, after):
+    """Compare two packed event streams and return (removed, added) event tuples.
+
+    Events are compared as (ppq, flags, msg) values, so an edited event shows up
+    as its old version removed and its new version added, and untouched
+    events cost nothing.
+    """
+    before_count = Counter(_event_keys(before))
+    after_count = Counter(_event_keys(after))
+    return list((before_count - after_count).elements()), list((after_count - before_count).elements())
+
+
+def replay(buffer, remove, add):
+    """Swap events in a buffer: drop one of each tuple in remove, append add.
+
+    Returns False (leaving the buffer alone) when the take no longer holds the
+    events to remove, i.e. it was edited outside the journal.
+    """
+    pending = Counter(remove)
+    kept = []
+    for event in buffer.events:
+        key = (int(round(event.ppq)), event.flags, bytes(event.msg))
+        if pending[key] > 0:
+            pending[key] -= 1
+        else:
+            kept.append(event)
+    if +pending:
+        return False
+    kept.extend(MidiEvent(ppq, flags, msg) for ppq, flags, msg in add)
+    buffer.replace_events(kept)
+    return True
+
+
+class JournalEntry:
+    """Per-take (removed, added) event diffs recorded for one operation."""
+
+    def __init__(self, description, diffs):
+        self.description = description
+        self.diffs = diffs
+        self.size = sum(
+            len(msg) + _EVENT_OVERHEAD
+            for removed, added in diffs.values() for _, _, msg in removed + added
+        )
+        self.last_used = 0
+
+
+class EditJournal:
+    """In-memory undo/redo history of Yuneify MIDI edits.
+
+    Each committed MidiEditTransaction records compact per-take event diffs.
+    Undo and redo replay the inverse or forward diff through one bulk buffer
+    write per take, so nothing has to be reloaded from the project. Entries
+    are evicted least recently used first when the memory budget is exceeded;
+    only the oldest undo step or the furthest redo step can go, so the
+    remaining history always stays replayable.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.undo_stack = []
+        self.redo_stack = []
+        self.size = 0
+        self._clock = 0
+        self.enabled = True
+
+    def _touch(self, entry):
+        self._clock += 1
+        entry.last_used = self._clock
+
+    def record(self, description, streams):
+        """Record an operation from {take_id: (before, after)} packed streams."""
+        return self.record_diffs(description, {
+            take_id: diff_streams(before, after) for take_id, (before, after) in streams.items()})
+
+    def record_diffs(self, description, diffs):
+        """Record an operation from {take_id: (removed, added)} event diffs."""
+        if not self.enabled:
+            return None
+        diffs = {take_id: diff for take_id, diff in diffs.items() if diff[0] or diff[1]}
+        if not diffs:
+            return None
+
+        entry = JournalEntry(description, diffs)
+        self._touch(entry)
+        self.undo_stack.append(entry)
+        self.size += entry.size
+        # A new edit ends the redo branch
+        self.size -= sum(e.size for e in self.redo_stack)
+        self.redo_stack.clear()
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self.size > self.budget_bytes and (self.undo_stack or self.redo_stack):
+            candidates = []
+            if self.undo_stack:
+                candidates.append((self.undo_stack[0].last_used, self.undo_stack))
+            if self.redo_stack:
+                candidates.append((self.redo_stack[0].last_used, self.redo_stack))
+            _, stack = min(candidates, key=lambda candidate: candidate[0])
+            self.size -= stack.pop(0).size
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self, project=None):
+        """Revert the last recorded operation and return its description, or None."""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        if not self._apply(entry, inverse=True, project=project):
+            self.size -= entry.size
+            return None
+        self._touch(entry)
+        # Redo pops from the end, eviction from the front (furthest step)
+        self.redo_stack.append(entry)
+        return entry.description
+
+    def redo(self, project=None):
+        """Re-apply the last undone operation and return its description, or None."""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        if not self._apply(entry, inverse=False, project=project):
+            self.size -= entry.size
+            return None
+        self._touch(entry)
+        self.undo_stack.append(entry)
+        return entry.description
+
+    def _apply(self, entry, inverse, project=None):
+        # Imported here because transactions record into the journal
+        from modules.edit_transaction import MidiEditTransaction
+
+        label = f"{'Undo' if inverse else 'Redo'}: {entry.description}"
+        with MidiEditTransaction(label, project, record=False) as txn:
+            with session():
+                buffers = {take_id: txn.open(take_id) for take_id in entry.diffs}
+            for take_id, (removed, added) in entry.diffs.items():
+                remove, add = (added, removed) if inverse else (removed, added)
+                if not replay(buffers[take_id], remove, add):
+                    print(f"{label} skipped: the take was edited outside Yuneify.")
+                    # Leave every take as it is rather than half-applying the entry
+                    txn.buffers.clear()
+                    txn.touched.clear()
+                    return False
+        return True
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+
+_journal = EditJournal()
+
+
+def get_journal():
+    """The journal shared by every Yuneify MIDI operation in this process."""
+    return _journal
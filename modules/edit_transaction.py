@@ -0,0 +1,222 @@
+from reapy import reascript_api as RPR
+from modules.take_buffer import TakeBuffer
+from modules.edit_journal import diff_streams, get_journal
+from modules.velocity_stats import get_velocity_cache, take_states
+from modules.transport import session, pipeline
+
+# Undo_EndBlock2 extra flags: store all project state, or none so no undo point is added
+UNDO_STATE_ALL = -1
+UNDO_STATE_NONE = 0
+
+
+class MidiEditTransaction:
+    """Deferred-commit scope for MIDI edits.
+
+    Edits are collected locally (take buffers and queued setter calls) and sent
+    to REAPER on exit as one batch: UI refresh is suspended around it, only
+    events that differ from the snapshot are sent, every setter gets
+    noSort=True, and each changed take is sorted once before a single
+    UpdateArrange and a single undo point. If the block raises, the undo
+    block is closed without an undo point and touched takes are restored from
+    their snapshots instead of issuing a REAPER undo.
+
+        with MidiEditTransaction("Scale Velocities") as txn:
+            buffer = txn.open(take)
+            ...
+    """
+
+    def __init__(self, description, project=None, record=True):
+        self.description = description
+        # Committed edits go to the shared in-memory undo journal
+        self.journal = get_journal() if record else None
+        self.velocity_cache = get_velocity_cache()
+        # 0 addresses the active project in the ReaScript API
+        self.project_id = project.id if project is not None else 0
+        self.buffers = {}
+        self.snapshots = {}
+        self.calls = []
+        self.touched = []
+        self.flushed = set()
+        # take_state() of cached takes before this transaction first wrote to them
+        self.states = {}
+        self._batch_open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    @staticmethod
+    def _take_id(take):
+        return take.id if hasattr(take, "id") else take
+
+    def _touch(self, take_id):
+        if take_id not in self.touched:
+            self.touched.append(take_id)
+
+    def open(self, take):
+        """Read a take into a TakeBuffer whose edits are written back on commit."""
+        take_id = self._take_id(take)
+        if take_id not in self.buffers:
+            self.stage(TakeBuffer.read(take_id))
+        return self.buffers[take_id]
+
+    def stage(self, buffer):
+        """Register an already-read TakeBuffer to be written back on commit."""
+        self.buffers[buffer.take_id] = buffer
+        if buffer.snapshot is not None:
+            self.snapshots.setdefault(buffer.take_id, buffer.snapshot)
+        self._touch(buffer.take_id)
+        return buffer
+
+    def snapshot(self, take):
+        """Capture a take for rollback before editing it live inside the block."""
+        take_id = self._take_id(take)
+        if take_id not in self.snapshots:
+            self.snapshots[take_id] = TakeBuffer.read(take_id).snapshot
+        self._touch(take_id)
+        self._record_states([take_id])
+        self._begin_batch()
+
+    def flush(self, buffer):
+        """Write a staged buffer right away inside the open batch so writes overlap remaining work."""
+        changes = buffer.diff()
+        if changes is not None and not changes:
+            return 0
+        self._record_states([buffer.take_id])
+        self._begin_batch()
+        self.flushed.add(buffer.take_id)
+        return buffer.write(changes)
+
+    def set_note(self, take, index, selected, muted, start, end, channel, pitch, velocity):
+        """Queue a MIDI_SetNote call for commit."""
+        take_id = self._take_id(take)
+        self._touch(take_id)
+        self.calls.append((RPR.MIDI_SetNote, (
+            take_id, index, selected, muted, start, end, channel, pitch, velocity, True
+        )))
+
+    def set_cc(self, take, index, selected, muted, position, chanmsg, channel, msg2, msg3):
+        """Queue a MIDI_SetCC call for commit."""
+        take_id = self._take_id(take)
+        self._touch(take_id)
+        self.calls.append((RPR.MIDI_SetCC, (
+            take_id, index, selected, muted, position, chanmsg, channel, msg2, msg3, True
+        )))
+
+    def _begin_batch(self):
+        if not self._batch_open:
+            RPR.PreventUIRefresh(1)
+            RPR.Undo_BeginBlock2(self.project_id)
+            self._batch_open = True
+
+    def _end_batch(self, flags=UNDO_STATE_ALL):
+        if self._batch_open:
+            RPR.Undo_EndBlock2(self.project_id, self.description, flags)
+            RPR.PreventUIRefresh(-1)
+            self._batch_open = False
+
+    def commit(self):
+        """Write every changed buffer and queued call, then sort, refresh and close the undo point.
+
+        Buffers without changes are skipped, and when nothing changed at all no
+        undo point is created.
+        """
+        changes = {take_id: buffer.diff() for take_id, buffer in self.buffers.items()}
+        for take_id, changed in changes.items():
+            if (changed is not None and not changed and not self._has_calls(take_id)
+                    and take_id not in self.flushed):
+                del self.buffers[take_id]
+                self.snapshots.pop(take_id, None)
+                self.touched.remove(take_id)
+        if not self.touched and not self._batch_open:
+            self._clear()
+            return
+
+        with session():
+            # Takes only edited through queued setters still need a rollback point
+            for take_id in self.touched:
+                if take_id not in self.snapshots:
+                    self.snapshots[take_id] = TakeBuffer.read(take_id).snapshot
+
+            self._record_states(self.touched)
+            self._begin_batch()
+            try:
+                for take_id, buffer in self.buffers.items():
+                    buffer.write(changes[take_id])
+                pipeline(self.calls + [(RPR.MIDI_Sort, (take_id,)) for take_id in self.touched])
+                streams = self._edit_streams()
+                states = dict(self.states)
+            except Exception:
+                self._abort()
+                raise
+            else:
+                self._end_batch()
+            finally:
+                self._clear()
+            diffs = {take_id: diff_streams(before, after) for take_id, (before, after) in streams.items()}
+            for take_id, (removed, added) in diffs.items():
+                self.velocity_cache.update(take_id, removed, added, states.get(take_id))
+            RPR.UpdateArrange()
+        if diffs and self.journal is not None:
+            self.journal.record_diffs(self.description, diffs)
+
+    def _edit_streams(self):
+        """Before/after packed streams of touched takes, for the undo journal and the stats cache."""
+        if self.journal is not None and self.journal.enabled:
+            take_ids = self.touched
+        else:
+            take_ids = [take_id for take_id in self.touched if take_id in self.velocity_cache]
+        streams = {}
+        for take_id in take_ids:
+            buffer = self.buffers.get(take_id)
+            if buffer is not None and not self._has_calls(take_id):
+                after = buffer.encode()
+            else:
+                # Edited through setters or live, so only REAPER knows the result
+                after = TakeBuffer.read(take_id).snapshot
+            streams[take_id] = (self.snapshots[take_id], after)
+        return streams
+
+    def _record_states(self, take_ids):
+        """Note the state of cached takes before their first write, for the velocity stats cache"""
+        take_ids = [take_id for take_id in take_ids
+                    if take_id in self.velocity_cache and take_id not in self.states]
+        if take_ids:
+            self.states.update(take_states(take_ids))
+
+    def _has_calls(self, take_id):
+        return any(args[0] == take_id for _, args in self.calls)
+
+    def rollback(self):
+        """Discard pending edits and restore takes that were edited live."""
+        if self._batch_open:
+            with session():
+                self._abort()
+        self._clear()
+
+    def _abort(self):
+        """Close the undo block without an undo point, then put the snapshots back.
+
+        The restore is still a change to the project (it is marked dirty),
+        but it leaves nothing in the undo history.
+        """
+        self._end_batch(UNDO_STATE_NONE)
+        self._restore()
+
+    def _restore(self):
+        for take_id, data in self.snapshots.items():
+            TakeBuffer(take_id, [], data).restore()
+
+    def _clear(self):
+        self.buffers.clear()
+        self.snapshots.clear()
+        self.calls.clear()
+        self.touched.clear()
+        self.flushed.clear()
+        self.states.clear()
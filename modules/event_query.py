@@ -0,0 +1,257 @@
+import ast
+import re
+from functools import lru_cache
+import numpy as np
+from modules.take_buffer import (
+    POLY_AFTERTOUCH, CONTROL_CHANGE, PROGRAM_CHANGE, CHANNEL_PRESSURE, PITCH_BEND
+)
+
+# Event kinds usable as bare words in a query (``note and vel<40``)
+KINDS = {
+    "note": 0,
+    "cc": 1,
+    "pb": 2,
+    "pitchbend": 2,
+    "program": 3,
+    "aftertouch": 4,
+    "pressure": 5,
+}
+
+_KIND_OF_STATUS = {
+    CONTROL_CHANGE: KINDS["cc"],
+    PITCH_BEND: KINDS["pb"],
+    PROGRAM_CHANGE: KINDS["program"],
+    POLY_AFTERTOUCH: KINDS["aftertouch"],
+    CHANNEL_PRESSURE: KINDS["pressure"],
+}
+
+# Query names that refer to another column
+ALIASES = {
+    "vel": "velocity",
+    "chan": "channel",
+    "pos": "ppq",
+    "len": "length",
+    "pitchbend": "pb",
+}
+
+NOTE_NAMES = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11}
+
+_NOTE_NAME = re.compile(r"(?<![\w#])([A-Ga-g])([#b]?)(-?\d+)(?![\w#])")
+_SPAN = re.compile(r"(-?\d+(?:\.\d+)?)\s*\.\.\s*(-?\d+(?:\.\d+)?)")
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod)
+_COMPARE_OPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+class EventTable:
+    """Columnar view of a take's notes and CC-family events for queries.
+
+    Every column is a float array with NaN where a column does not apply to a
+    row (``vel`` of a CC, ``cc`` of a note), so comparisons against it are
+    simply False. A note is one row covering both its note-on and note-off.
+    """
+
+    def __init__(self, columns, events):
+        self.columns = columns
+        # Buffer events behind each row, (note-on, note-off) for notes
+        self.events = events
+
+    @classmethod
+    def from_buffer(cls, buffer, ticks_per_quarter=960):
+        notes = buffer.notes
+        ccs = buffer.cc_events
+        count = len(notes) + len(ccs)
+        columns = {name: np.full(count, np.nan) for name in (
+            "kind", "ppq", "beat", "channel", "pitch", "velocity", "length",
+            "cc", "program", "pb", "value", "selected", "muted"
+        )}
+
+        if notes:
+            n = len(notes)
+            columns["kind"][:n] = KINDS["note"]
+            columns["ppq"][:n] = [note.start for note in notes]
+            columns["channel"][:n] = [note.channel + 1 for note in notes]
+            columns["pitch"][:n] = [note.pitch for note in notes]
+            columns["velocity"][:n] = [note.velocity for note in notes]
+            columns["length"][:n] = [note.end - note.start for note in notes]
+            columns["value"][:n] = columns["velocity"][:n]
+            columns["selected"][:n] = [note.selected for note in notes]
+            columns["muted"][:n] = [note.muted for note in notes]
+
+        if ccs:
+            rows = slice(len(notes), count)
+            status = np.array([event.status for event in ccs])
+            data1 = np.array([event.msg[1] for event in ccs], dtype=np.float64)
+            data2 = np.array([event.msg[2] if len(event.msg) > 2 else 0 for event in ccs], dtype=np.float64)
+            kind = np.array([_KIND_OF_STATUS[s] for s in status], dtype=np.float64)
+            columns["kind"][rows] = kind
+            columns["ppq"][rows] = [event.ppq for event in ccs]
+            columns["channel"][rows] = [event.channel + 1 for event in ccs]
+            columns["selected"][rows] = [event.selected for event in ccs]
+            columns["muted"][rows] = [event.muted for event in ccs]
+
+            is_cc = kind == KINDS["cc"]
+            is_pb = kind == KINDS["pb"]
+            is_program = kind == KINDS["program"]
+            is_aftertouch = kind == KINDS["aftertouch"]
+            is_pressure = kind == KINDS["pressure"]
+            columns["cc"][rows] = np.where(is_cc, data1, np.nan)
+            columns["program"][rows] = np.where(is_program, data1, np.nan)
+            columns["pb"][rows] = np.where(is_pb, data1 + data2 * 128 - 8192, np.nan)
+            columns["pitch"][rows] = np.where(is_aftertouch, data1, np.nan)
+            # The 7-bit value each family is edited by; the MSB for pitch bend
+            columns["value"][rows] = np.select(
+                [is_cc | is_pb | is_aftertouch, is_program | is_pressure], [data2, data1], np.nan)
+
+        columns["beat"][:] = columns["ppq"] / ticks_per_quarter
+        events = [(note.on, note.off) for note in notes] + [(event,) for event in ccs]
+        return cls(columns, events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def select(self, mask, buffer):
+        """Select the events of matching rows and deselect every other event in the buffer."""
+        matched = {id(event) for row in np.flatnonzero(mask) for event in self.events[row]}
+        for event in buffer.events:
+            event.selected = id(event) in matched
+        return int(np.count_nonzero(mask))
+
+
+class _QueryCompiler(ast.NodeTransformer):
+    """Rewrite a parsed query into element-wise NumPy operations."""
+
+    def _bool(self, node):
+        # Bare words in a boolean position become masks
+        if isinstance(node, ast.Name):
+            if node.id in KINDS:
+                return _call("_kind", ast.Constant(KINDS[node.id]))
+            return _call("_truthy", self.visit(node))
+        if isinstance(node, (ast.BoolOp, ast.Compare)) or (
+                isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            return self.visit(node)
+        if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+            return _call("_const", node)
+        return _call("_truthy", self.visit(node))
+
+    def visit_Expression(self, node):
+        node.body = self._bool(node.body)
+        return node
+
+    def visit_BoolOp(self, node):
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self._bool(value) for value in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = ast.BinOp(result, op, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(ast.Invert(), self._bool(node.operand))
+        if isinstance(node.op, (ast.USub, ast.UAdd)):
+            node.operand = self.visit(node.operand)
+            return node
+        raise ValueError("Unsupported operator in query")
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BIN_OPS):
+            raise ValueError("Unsupported operator in query")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_Compare(self, node):
+        parts = []
+        left = self.visit(node.left)
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not (isinstance(right, ast.Call) and isinstance(right.func, ast.Name)
+                        and right.func.id == "_span" and len(right.args) == 2 and not right.keywords):
+                    raise ValueError("'in' needs a range like 48..72 or C3..C5")
+                # Bounds go through the same whitelist as every other operand
+                low, high = (self.visit(bound) for bound in right.args)
+                part = ast.BinOp(
+                    ast.Compare(left, [ast.GtE()], [low]), ast.BitAnd(),
+                    ast.Compare(left, [ast.LtE()], [high]))
+                if isinstance(op, ast.NotIn):
+                    part = ast.UnaryOp(ast.Invert(), part)
+                parts.append(part)
+                continue
+            if not isinstance(op, _COMPARE_OPS):
+                raise ValueError("Unsupported comparison in query")
+            right = self.visit(right)
+            parts.append(ast.Compare(left, [op], [right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(result, ast.BitAnd(), part)
+        return result
+
+    def visit_Name(self, node):
+        name = ALIASES.get(node.id, node.id)
+        if name == "note":
+            name = "pitch"
+        if name not in _COLUMN_NAMES:
+            raise ValueError(f"Unknown name in query: {node.id}")
+        return ast.Subscript(ast.Name("_columns", ast.Load()), ast.Constant(name), ast.Load())
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float)):
+            raise ValueError("Only numbers are allowed in queries")
+        return node
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.Load)):
+            raise ValueError(f"Unsupported syntax in query: {type(node).__name__}")
+        return super().generic_visit(node)
+
+
+_COLUMN_NAMES = {
+    "ppq", "beat", "channel", "pitch", "velocity", "length",
+    "cc", "program", "pb", "value", "selected", "muted"
+}
+
+
+def _call(name, *args):
+    return ast.Call(ast.Name(name, ast.Load()), list(args), [])
+
+
+def note_number(name, accidental, octave):
+    """MIDI note number of a note name, with C4 as middle C (60)."""
+    offset = {"#": 1, "b": -1}.get(accidental, 0)
+    return (int(octave) + 1) * 12 + NOTE_NAMES[name.lower()] + offset
+
+
+def _preprocess(text):
+    text = _NOTE_NAME.sub(lambda m: str(note_number(*m.groups())), text)
+    return _SPAN.sub(r"_span(\1, \2)", text)
+
+
+@lru_cache(maxsize=128)
+def compile_query(text):
+    """Compile a query string into a function mapping an EventTable to a boolean mask.
+
+    Compiled queries are cached by their text, so repeating a filter only
+    costs the vectorized evaluation.
+    """
+    try:
+        tree = ast.parse(_preprocess(text.strip()), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid query: {text}") from e
+    tree = ast.fix_missing_locations(_QueryCompiler().visit(tree))
+    code = compile(tree, "<midi query>", "eval")
+
+    def evaluate(table):
+        columns = table.columns
+        namespace = {
+            "_columns": columns,
+            "_kind": lambda kind: columns["kind"] == kind,
+            "_truthy": lambda values: np.nan_to_num(np.asarray(values, dtype=np.float64)) != 0,
+            "_const": lambda value: np.full(len(table), bool(value)),
+        }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mask = eval(code, {"__builtins__": {}}, namespace)
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (len(table),))
+
+    return evaluate
@@ -0,0 +1,3 @@
+from modules.fake_reaper.server import main
+
+main()
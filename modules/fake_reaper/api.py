@@ -0,0 +1,882 @@
+import functools
+import tempfile
+import zlib
+from modules.fake_reaper.model import (
+    FX, TICKS_PER_QUARTER, Event, Item, MidiEditor, Project, Reaper, Send, TempoMarker, Take, Track,
+    null_pointer,
+)
+
+# Main_OnCommand ids the fake understands
+CMD_TOGGLE_SOLO = 7
+CMD_SELECT_ALL_ITEMS = 40182
+CMD_TOGGLE_MUTE = 40280
+CMD_UNSELECT_ALL_ITEMS = 40289
+CMD_UNSELECT_ALL_TRACKS = 40297
+CMD_UNDO = 40029
+CMD_REDO = 40030
+
+# Named (extension) commands resolve to ids above this
+NAMED_COMMAND_BASE = 100000
+
+
+def _mutates(func):
+    """Count a call as a project state change, like REAPER's GetProjectStateChangeCount."""
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        result = func(self, *args)
+        self._project_for(args[0] if args else None).touch()
+        return result
+    return wrapper
+
+
+class FakeApi:
+    """The ReaScript functions Yuneify and reapy use, answered from an in-memory Reaper.
+
+    Method names and return shapes follow reaper_python: functions with
+    output or buffer parameters return (retval, *arguments) with the outputs
+    filled in, the others return their value alone. Every public method
+    becomes an RPR_<name> function of the fake reaper_python module.
+    """
+
+    def __init__(self, reaper=None):
+        self.reaper = reaper if reaper is not None else Reaper()
+        self.resource_path = tempfile.mkdtemp(prefix="fake_reaper_")
+        self.named_commands = {}
+
+    def functions(self):
+        return {
+            name: getattr(self, name) for name in dir(self)
+            if name[:1].isupper() and callable(getattr(self, name))
+        }
+
+    # Pointer helpers
+
+    def _get(self, pointer, cls):
+        obj = self.reaper.pointers.resolve(pointer)
+        if not isinstance(obj, cls):
+            raise ValueError("Invalid {} pointer: {!r}".format(cls.__name__, pointer))
+        return obj
+
+    def _project(self, proj):
+        return self.reaper.resolve_project(proj)
+
+    def _project_for(self, obj):
+        if isinstance(obj, str):
+            resolved = self.reaper.pointers.resolve(obj)
+            if isinstance(resolved, Project):
+                return resolved
+            if resolved is not None and not isinstance(resolved, (Reaper, MidiEditor)):
+                return self.reaper.project_of(resolved)
+        return self.reaper.project
+
+    @staticmethod
+    def _pick(items, index, kind):
+        return items[index].id if 0 <= index < len(items) else null_pointer(kind)
+
+    # Projects
+
+    def EnumProjects(self, idx, projfn, projfn_sz):
+        if idx < 0:
+            project = self.reaper.project
+        elif idx < len(self.reaper.projects):
+            project = self.reaper.projects[idx]
+        else:
+            return (null_pointer("ReaProject"), idx, "", projfn_sz)
+        return (project.id, idx, project.name + ".rpp", projfn_sz)
+
+    def GetProjectName(self, proj, buf, buf_sz):
+        return (None, proj, self._project(proj).name + ".rpp", buf_sz)
+
+    def SelectProjectInstance(self, proj):
+        project = self._project(proj)
+        self.reaper.current = self.reaper.projects.index(project)
+
+    def GetProjectStateChangeCount(self, proj):
+        return self._project(proj).state_changes
+
+    def GetProjectTimeSignature2(self, proj, bpm, bpi):
+        time_map = self._project(proj).time_map
+        return (proj, time_map.bpm, float(time_map.num))
+
+    @_mutates
+    def SetCurrentBPM(self, proj, bpm, wantUndo):
+        self._project(proj).time_map.bpm = bpm
+
+    def Master_GetTempo(self):
+        return self.reaper.project.time_map.bpm
+
+    def GetCursorPosition(self):
+        return self.reaper.project.cursor
+
+    def GetCursorPositionEx(self, proj):
+        return self._project(proj).cursor
+
+    def SetEditCurPos(self, time, moveview, seekplay):
+        self.reaper.project.cursor = time
+
+    def SetEditCurPos2(self, proj, time, moveview, seekplay):
+        self._project(proj).cursor = time
+
+    def GetPlayState(self):
+        return self.reaper.project.play_state
+
+    def GetPlayStateEx(self, proj):
+        return self._project(proj).play_state
+
+    def GetSet_ArrangeView2(self, proj, isSet, screen_x_start, screen_x_end, start_time, end_time):
+        return (proj, isSet, screen_x_start, screen_x_end, 0.0, 60.0)
+
+    def GetResourcePath(self):
+        return self.resource_path
+
+    def GetAppVersion(self):
+        return "7.0/linux-x86_64"
+
+    def ValidatePtr(self, pointer, ctypename):
+        return self.reaper.pointers.resolve(pointer) is not None
+
+    def ValidatePtr2(self, proj, pointer, ctypename):
+        return self.reaper.pointers.resolve(pointer) is not None
+
+    def ShowConsoleMsg(self, msg):
+        print(msg, end="")
+
+    def ClearConsole(self):
+        pass
+
+    def GetExtState(self, section, key):
+        return self.reaper.ext_state.get((section, key), "")
+
+    def SetExtState(self, section, key, value, persist):
+        self.reaper.ext_state[(section, key)] = value
+
+    def HasExtState(self, section, key):
+        return (section, key) in self.reaper.ext_state
+
+    def DeleteExtState(self, section, key, persist):
+        self.reaper.ext_state.pop((section, key), None)
+
+    # UI no-ops
+
+    def UpdateArrange(self):
+        pass
+
+    def UpdateTimeline(self):
+        pass
+
+    def TrackList_AdjustWindows(self, isMinor):
+        pass
+
+    def PreventUIRefresh(self, prevent_count):
+        self.reaper.project.ui_refresh_depth += prevent_count
+
+    def GetMainHwnd(self):
+        return self.reaper.main_hwnd
+
+    def JS_Window_GetRect(self, windowHWND, *outputs):
+        left, top, right, bottom = 0, 0, 1920, 1080
+        if outputs:
+            return (True, windowHWND, left, top, right, bottom)
+        return (True, left, top, right, bottom)
+
+    def GetToggleCommandState(self, command_id):
+        return 0
+
+    # Actions
+
+    def NamedCommandLookup(self, command_name):
+        if not command_name.startswith("_"):
+            return 0
+        return self.named_commands.setdefault(
+            command_name, NAMED_COMMAND_BASE + zlib.crc32(command_name.encode()) % NAMED_COMMAND_BASE)
+
+    def Main_OnCommand(self, command, flag):
+        self.Main_OnCommandEx(command, flag, None)
+
+    @_mutates
+    def Main_OnCommandEx(self, command, flag, proj):
+        project = self._project(proj)
+        if command == CMD_TOGGLE_MUTE:
+            for track in project.selected_tracks:
+                track.info["B_MUTE"] = 0.0 if track.info["B_MUTE"] else 1.0
+        elif command == CMD_TOGGLE_SOLO:
+            for track in project.selected_tracks:
+                track.info["I_SOLO"] = 0.0 if track.info["I_SOLO"] else 2.0
+        elif command == CMD_UNSELECT_ALL_TRACKS:
+            for track in project.tracks:
+                track.selected = False
+        elif command in (CMD_SELECT_ALL_ITEMS, CMD_UNSELECT_ALL_ITEMS):
+            for item in project.all_items:
+                item.selected = command == CMD_SELECT_ALL_ITEMS
+        elif command == self.named_commands.get("_BR_SEL_ALL_ITEMS_MIDI"):
+            for item in project.all_items:
+                item.selected = bool(item.takes)
+        elif command == CMD_UNDO:
+            project.undo()
+        elif command == CMD_REDO:
+            project.redo()
+
+    # Undo
+
+    def Undo_BeginBlock(self):
+        self.reaper.project.begin_undo()
+
+    def Undo_BeginBlock2(self, proj):
+        self._project(proj).begin_undo()
+
+    def Undo_EndBlock(self, descchange, extraflags):
+        self.reaper.project.end_undo(descchange)
+
+    def Undo_EndBlock2(self, proj, descchange, extraflags):
+        # No state flags: the block closes without an undo point
+        self._project(proj).end_undo(descchange, record=extraflags != 0)
+
+    def Undo_OnStateChange(self, descchange):
+        project = self.reaper.project
+        project.begin_undo()
+        project.end_undo(descchange)
+
+    def Undo_CanUndo2(self, proj):
+        stack = self._project(proj).undo_stack
+        return stack[-1][0] if stack else None
+
+    def Undo_CanRedo2(self, proj):
+        stack = self._project(proj).redo_stack
+        return stack[-1][0] if stack else None
+
+    def Undo_DoUndo2(self, proj):
+        return int(self._project(proj).undo())
+
+    def Undo_DoRedo2(self, proj):
+        return int(self._project(proj).redo())
+
+    # Tracks
+
+    def CountTracks(self, proj):
+        return len(self._project(proj).tracks)
+
+    def GetTrack(self, proj, trackidx):
+        return self._pick(self._project(proj).tracks, trackidx, "MediaTrack")
+
+    @_mutates
+    def InsertTrackAtIndex(self, idx, wantDefaults):
+        project = self.reaper.project
+        project.add_track(index=max(0, min(idx, len(project.tracks))))
+
+    def DeleteTrack(self, tr):
+        track = self._get(tr, Track)
+        track.project.delete_track(track)
+        track.project.touch()
+
+    def CountSelectedTracks(self, proj):
+        return len(self._project(proj).selected_tracks)
+
+    def CountSelectedTracks2(self, proj, wantmaster):
+        return len(self._project(proj).selected_tracks)
+
+    def GetSelectedTrack(self, proj, seltrackidx):
+        return self._pick(self._project(proj).selected_tracks, seltrackidx, "MediaTrack")
+
+    def GetSelectedTrack2(self, proj, seltrackidx, wantmaster):
+        return self.GetSelectedTrack(proj, seltrackidx)
+
+    def IsTrackSelected(self, track):
+        return self._get(track, Track).selected
+
+    @_mutates
+    def SetTrackSelected(self, track, selected):
+        self._get(track, Track).selected = selected
+
+    @_mutates
+    def SetOnlyTrackSelected(self, track):
+        track = self._get(track, Track)
+        for other in track.project.tracks:
+            other.selected = other is track
+
+    def GetTrackName(self, track, buf, buf_sz):
+        track = self._get(track, Track)
+        name = track.name or "Track {}".format(track.project.tracks.index(track) + 1)
+        return (True, track.id, name, buf_sz)
+
+    def GetSetMediaTrackInfo_String(self, tr, parmname, stringNeedBig, setNewValue):
+        track = self._get(tr, Track)
+        if parmname != "P_NAME":
+            return (False, tr, parmname, stringNeedBig, setNewValue)
+        if setNewValue:
+            track.name = stringNeedBig
+            track.project.touch()
+        return (True, tr, parmname, track.name, setNewValue)
+
+    def GetMediaTrackInfo_Value(self, tr, parmname):
+        track = self._get(tr, Track)
+        if parmname == "IP_TRACKNUMBER":
+            return float(track.project.tracks.index(track) + 1)
+        return track.info.get(parmname, 0.0)
+
+    @_mutates
+    def SetMediaTrackInfo_Value(self, tr, parmname, newvalue):
+        self._get(tr, Track).info[parmname] = float(newvalue)
+        return True
+
+    def GetParentTrack(self, track):
+        self._get(track, Track)
+        return null_pointer("MediaTrack")
+
+    def GetTrackColor(self, track):
+        return int(self._get(track, Track).info["I_CUSTOMCOLOR"])
+
+    @_mutates
+    def SetTrackColor(self, track, color):
+        self._get(track, Track).info["I_CUSTOMCOLOR"] = float(color | 0x1000000)
+
+    # Items and takes
+
+    def CountMediaItems(self, proj):
+        return len(self._project(proj).all_items)
+
+    def GetMediaItem(self, proj, itemidx):
+        return self._pick(self._project(proj).all_items, itemidx, "MediaItem")
+
+    def CountTrackMediaItems(self, track):
+        return len(self._get(track, Track).items)
+
+    def GetTrackMediaItem(self, tr, itemidx):
+        return self._pick(self._get(tr, Track).items, itemidx, "MediaItem")
+
+    def CountSelectedMediaItems(self, proj):
+        return len(self._project(proj).selected_items)
+
+    def GetSelectedMediaItem(self, proj, selitem):
+        return self._pick(self._project(proj).selected_items, selitem, "MediaItem")
+
+    @_mutates
+    def SetMediaItemSelected(self, item, selected):
+        self._get(item, Item).selected = bool(selected)
+
+    @_mutates
+    def SelectAllMediaItems(self, proj, selected):
+        for item in self._project(proj).all_items:
+            item.selected = bool(selected)
+
+    def GetMediaItemInfo_Value(self, item, parmname):
+        item = self._get(item, Item)
+        values = {"D_POSITION": item.position, "D_LENGTH": item.length, "B_UISEL": float(item.selected),
+                  "I_CURTAKE": float(item.active), "B_MUTE": 0.0}
+        return values.get(parmname, 0.0)
+
+    @_mutates
+    def SetMediaItemInfo_Value(self, item, parmname, newvalue):
+        item = self._get(item, Item)
+        if parmname == "D_POSITION":
+            item.position = newvalue
+        elif parmname == "D_LENGTH":
+            item.length = newvalue
+        elif parmname == "B_UISEL":
+            item.selected = bool(newvalue)
+        elif parmname == "I_CURTAKE":
+            item.active = int(newvalue)
+        return True
+
+    @_mutates
+    def SetMediaItemPosition(self, item, position, refreshUI):
+        self._get(item, Item).position = position
+        return True
+
+    @_mutates
+    def SetMediaItemLength(self, item, length, refreshUI):
+        self._get(item, Item).length = length
+        return True
+
+    def GetMediaItemTrack(self, item):
+        return self._get(item, Item).track.id
+
+    def GetItemProjectContext(self, item):
+        return self._get(item, Item).track.project.id
+
+    @_mutates
+    def CreateNewMIDIItemInProj(self, track, starttime, endtime, qnInOptional):
+        track = self._get(track, Track)
+        time_map = track.project.time_map
+        if qnInOptional:
+            starttime, endtime = time_map.qn_to_time(starttime), time_map.qn_to_time(endtime)
+        item = track.project.add_item(track, starttime, endtime - starttime)
+        track.project.add_midi_take(item)
+        return item.id
+
+    @_mutates
+    def DeleteTrackMediaItem(self, tr, it):
+        track, item = self._get(tr, Track), self._get(it, Item)
+        track.items.remove(item)
+        for take in item.takes:
+            track.project.pointers.forget(take)
+        track.project.pointers.forget(item)
+        return True
+
+    def GetMediaItemNumTakes(self, item):
+        return len(self._get(item, Item).takes)
+
+    def GetMediaItemTake(self, item, tk):
+        return self._pick(self._get(item, Item).takes, tk, "MediaItem_Take")
+
+    def GetActiveTake(self, item):
+        take = self._get(item, Item).active_take
+        return take.id if take is not None else null_pointer("MediaItem_Take")
+
+    def GetMediaItemTake_Item(self, take):
+        return self._get(take, Take).item.id
+
+    def GetMediaItemTake_Track(self, take):
+        return self._get(take, Take).item.track.id
+
+    def TakeIsMIDI(self, take):
+        self._get(take, Take)
+        return True
+
+    def GetTakeName(self, take):
+        return self._get(take, Take).name
+
+    def GetMediaItemTakeInfo_Value(self, take, parmname):
+        self._get(take, Take)
+        return {"D_PLAYRATE": 1.0, "D_VOL": 1.0}.get(parmname, 0.0)
+
+    # MIDI
+
+    def _take_start_qn(self, take):
+        return take.item.track.project.time_map.time_to_qn(take.item.position)
+
+    def MIDI_GetPPQPosFromProjQN(self, take, projqn):
+        take = self._get(take, Take)
+        return (projqn - self._take_start_qn(take)) * TICKS_PER_QUARTER
+
+    def MIDI_GetProjQNFromPPQPos(self, take, ppqpos):
+        take = self._get(take, Take)
+        return self._take_start_qn(take) + ppqpos / TICKS_PER_QUARTER
+
+    def MIDI_GetPPQPosFromProjTime(self, take, projtime):
+        qn = self._get(take, Take).item.track.project.time_map.time_to_qn(projtime)
+        return self.MIDI_GetPPQPosFromProjQN(take, qn)
+
+    def MIDI_GetProjTimeFromPPQPos(self, take, ppqpos):
+        time_map = self._get(take, Take).item.track.project.time_map
+        return time_map.qn_to_time(self.MIDI_GetProjQNFromPPQPos(take, ppqpos))
+
+    def MIDI_GetAllEvts(self, take, buf, buf_sz):
+        data = self._get(take, Take).data
+        if len(data) > buf_sz:
+            return (False, take, "", buf_sz)
+        return (True, take, data.decode("latin-1"), buf_sz)
+
+    @_mutates
+    def MIDI_SetAllEvts(self, take, buf, buf_sz):
+        self._get(take, Take).data = buf.encode("latin-1")[:buf_sz]
+        return True
+
+    def MIDI_CountEvts(self, take, notecnt, ccevtcnt, textsyxevtcnt):
+        tk = self._get(take, Take)
+        return (len(tk.notes) + len(tk.ccs), take, len(tk.notes), len(tk.ccs), 0)
+
+    def MIDI_GetHash(self, take, notesonly, hash, hash_sz):
+        return (True, take, notesonly, self._get(take, Take).hash(notesonly), hash_sz)
+
+    def MIDI_GetTrackHash(self, track, notesonly, hash, hash_sz):
+        takes = [take for item in self._get(track, Track).items for take in item.takes]
+        combined = "".join(take.hash(notesonly) for take in takes)
+        return (True, track, notesonly, "{:016X}".format(zlib.crc32(combined.encode())), hash_sz)
+
+    def MIDI_GetNote(self, take, noteidx, selected, muted, startppqpos, endppqpos, chan, pitch, vel):
+        notes = self._get(take, Take).notes
+        if not 0 <= noteidx < len(notes):
+            return (False, take, noteidx, selected, muted, startppqpos, endppqpos, chan, pitch, vel)
+        on, off = notes[noteidx]
+        return (True, take, noteidx, bool(on.flags & 1), bool(on.flags & 2), float(on.ppq), float(off.ppq),
+                on.msg[0] & 0x0F, on.msg[1], on.msg[2])
+
+    @_mutates
+    def MIDI_SetNote(self, take, noteidx, selectedIn, mutedIn, startppqposIn, endppqposIn,
+                     chanIn, pitchIn, velIn, noSortIn):
+        tk = self._get(take, Take)
+        if not 0 <= noteidx < len(tk.notes):
+            return False
+        on, off = tk.notes[noteidx]
+        for event in (on, off):
+            if selectedIn is not None:
+                event.flags = (event.flags & ~1) | (1 if selectedIn else 0)
+            if mutedIn is not None:
+                event.flags = (event.flags & ~2) | (2 if mutedIn else 0)
+        status_on, status_off = on.msg[0] & 0xF0, off.msg[0] & 0xF0
+        chan = on.msg[0] & 0x0F if chanIn is None else chanIn
+        pitch = on.msg[1] if pitchIn is None else pitchIn
+        on.msg = bytes([status_on | chan, pitch, on.msg[2] if velIn is None else velIn])
+        off.msg = bytes([status_off | chan, pitch, off.msg[2]])
+        if startppqposIn is not None:
+            on.ppq = int(round(startppqposIn))
+        if endppqposIn is not None:
+            off.ppq = int(round(endppqposIn))
+        if noSortIn:
+            tk.changed(structure=False)
+        else:
+            tk.sort()
+        return True
+
+    @_mutates
+    def MIDI_InsertNote(self, take, selected, muted, startppqpos, endppqpos, chan, pitch, vel, noSortIn):
+        tk = self._get(take, Take)
+        flags = (1 if selected else 0) | (2 if muted else 0)
+        tk.events.append(Event(startppqpos, flags, bytes([0x90 | chan, pitch, vel])))
+        tk.events.append(Event(endppqpos, flags, bytes([0x80 | chan, pitch, 0])))
+        if noSortIn:
+            tk.changed()
+        else:
+            tk.sort()
+        return True
+
+    @_mutates
+    def MIDI_DeleteNote(self, take, noteidx):
+        tk = self._get(take, Take)
+        if not 0 <= noteidx < len(tk.notes):
+            return False
+        on, off = tk.notes[noteidx]
+        tk.events = [event for event in tk.events if event is not on and event is not off]
+        tk.changed()
+        return True
+
+    def MIDI_GetCC(self, take, ccidx, selected, muted, ppqpos, chanmsg, chan, msg2, msg3):
+        ccs = self._get(take, Take).ccs
+        if not 0 <= ccidx < len(ccs):
+            return (False, take, ccidx, selected, muted, ppqpos, chanmsg, chan, msg2, msg3)
+        event = ccs[ccidx]
+        return (True, take, ccidx, bool(event.flags & 1), bool(event.flags & 2), float(event.ppq),
+                event.status, event.msg[0] & 0x0F, event.msg[1], event.msg[2] if len(event.msg) > 2 else 0)
+
+    @_mutates
+    def MIDI_SetCC(self, take, ccidx, selectedIn, mutedIn, ppqposIn, chanmsgIn, chanIn, msg2In, msg3In, noSortIn):
+        tk = self._get(take, Take)
+        ccs = tk.ccs
+        if not 0 <= ccidx < len(ccs):
+            return False
+        event = ccs[ccidx]
+        if selectedIn is not None:
+            event.flags = (event.flags & ~1) | (1 if selectedIn else 0)
+        if mutedIn is not None:
+            event.flags = (event.flags & ~2) | (2 if mutedIn else 0)
+        if ppqposIn is not None:
+            event.ppq = int(round(ppqposIn))
+        status = event.status if chanmsgIn is None else chanmsgIn
+        chan = event.msg[0] & 0x0F if chanIn is None else chanIn
+        msg2 = event.msg[1] if msg2In is None else msg2In
+        if len(event.msg) > 2 or status not in (0xC0, 0xD0):
+            msg3 = (event.msg[2] if len(event.msg) > 2 else 0) if msg3In is None else msg3In
+            event.msg = bytes([status | chan, msg2, msg3])
+        else:
+            event.msg = bytes([status | chan, msg2])
+        if noSortIn:
+            tk.changed(structure=False)
+        else:
+            tk.sort()
+        return True
+
+    @_mutates
+    def MIDI_InsertCC(self, take, selected, muted, ppqpos, chanmsg, chan, msg2, msg3):
+        tk = self._get(take, Take)
+        flags = (1 if selected else 0) | (2 if muted else 0)
+        msg = bytes([chanmsg | chan, msg2]) if chanmsg in (0xC0, 0xD0) else bytes([chanmsg | chan, msg2, msg3])
+        tk.events.append(Event(ppqpos, flags, msg))
+        tk.sort()
+        return True
+
+    @_mutates
+    def MIDI_DeleteCC(self, take, ccidx):
+        tk = self._get(take, Take)
+        ccs = tk.ccs
+        if not 0 <= ccidx < len(ccs):
+            return False
+        tk.events = [event for event in tk.events if event is not ccs[ccidx]]
+        tk.changed()
+        return True
+
+    @_mutates
+    def MIDI_SelectAll(self, take, select):
+        tk = self._get(take, Take)
+        for event in tk.events:
+            event.flags = (event.flags & ~1) | (1 if select else 0)
+        tk.changed(structure=False)
+
+    @_mutates
+    def MIDI_Sort(self, take):
+        self._get(take, Take).sort()
+
+    def MIDI_GetGrid(self, take, swingOutOptional, noteLenOutOptional):
+        return (0.25, take, 0.0, 0.0)
+
+    def MIDIEditor_GetActive(self):
+        editor = self.reaper.midi_editor
+        return editor.id if editor is not None else null_pointer("HWND")
+
+    def MIDIEditor_GetTake(self, midieditor):
+        editor = self.reaper.pointers.resolve(midieditor)
+        return editor.take.id if isinstance(editor, MidiEditor) else null_pointer("MediaItem_Take")
+
+    def MIDIEditor_GetSetting_int(self, midieditor, setting_desc):
+        editor = self.reaper.pointers.resolve(midieditor)
+        return editor.settings.get(setting_desc, -1) if isinstance(editor, MidiEditor) else -1
+
+    def MIDIEditor_GetMode(self, midieditor):
+        return 0 if isinstance(self.reaper.pointers.resolve(midieditor), MidiEditor) else -1
+
+    def MIDIEditor_OnCommand(self, midieditor, command_id):
+        return isinstance(self.reaper.pointers.resolve(midieditor), MidiEditor)
+
+    # Markers and regions
+
+    def CountProjectMarkers(self, proj, num_markersOut, num_regionsOut):
+        markers = self._project(proj).markers
+        regions = sum(marker.is_region for marker in markers)
+        return (len(markers), proj, len(markers) - regions, regions)
+
+    def EnumProjectMarkers2(self, proj, idx, isrgnOut, posOut, rgnendOut, nameOut, markrgnindexnumberOut):
+        markers = self._project(proj).markers
+        if not 0 <= idx < len(markers):
+            return (0, proj, idx, False, 0.0, 0.0, "", 0)
+        marker = markers[idx]
+        return (idx + 1, proj, idx, marker.is_region, marker.position, marker.end, marker.name, marker.number)
+
+    def EnumProjectMarkers3(self, proj, idx, isrgnOut, posOut, rgnendOut, nameOut, markrgnindexnumberOut, colorOut):
+        result = self.EnumProjectMarkers2(proj, idx, isrgnOut, posOut, rgnendOut, nameOut, markrgnindexnumberOut)
+        markers = self._project(proj).markers
+        return result + ((markers[idx].color if 0 <= idx < len(markers) else 0),)
+
+    @_mutates
+    def AddProjectMarker2(self, proj, isrgn, pos, rgnend, name, wantidx, color):
+        return self._project(proj).add_marker(pos, name, color, bool(isrgn), rgnend, wantidx).number
+
+    def AddProjectMarker(self, proj, isrgn, pos, rgnend, name, wantidx):
+        return self.AddProjectMarker2(proj, isrgn, pos, rgnend, name, wantidx, 0)
+
+    @_mutates
+    def DeleteProjectMarker(self, proj, markrgnindexnumber, isrgn):
+        project = self._project(proj)
+        for marker in project.markers:
+            if marker.number == markrgnindexnumber and marker.is_region == bool(isrgn):
+                project.markers.remove(marker)
+                return True
+        return False
+
+    @_mutates
+    def DeleteProjectMarkerByIndex(self, proj, markrgnidx):
+        markers = self._project(proj).markers
+        if not 0 <= markrgnidx < len(markers):
+            return False
+        del markers[markrgnidx]
+        return True
+
+    @_mutates
+    def SetProjectMarker3(self, proj, markrgnindexnumber, isrgn, pos, rgnend, name, color):
+        project = self._project(proj)
+        for marker in project.markers:
+            if marker.number == markrgnindexnumber and marker.is_region == bool(isrgn):
+                marker.position, marker.end, marker.name = pos, rgnend, name
+                if color:
+                    marker.color = color
+                project.markers.sort(key=lambda m: (m.position, m.is_region))
+                return True
+        return False
+
+    def SetProjectMarker2(self, proj, markrgnindexnumber, isrgn, pos, rgnend, name):
+        return self.SetProjectMarker3(proj, markrgnindexnumber, isrgn, pos, rgnend, name, 0)
+
+    def SetProjectMarker(self, markrgnindexnumber, isrgn, pos, rgnend, name):
+        return self.SetProjectMarker3(None, markrgnindexnumber, isrgn, pos, rgnend, name, 0)
+
+    # Tempo map
+
+    def CountTempoTimeSigMarkers(self, proj):
+        return len(self._project(proj).time_map.markers)
+
+    def GetTempoTimeSigMarker(self, proj, ptidx, timeposOut, measureposOut, beatposOut, bpmOut,
+                              timesig_numOut, timesig_denomOut, lineartempoOut):
+        time_map = self._project(proj).time_map
+        if not 0 <= ptidx < len(time_map.markers):
+            return (False, proj, ptidx, 0.0, 0, 0.0, 0.0, 0, 0, False)
+        marker = time_map.markers[ptidx]
+        measure, measure_start, _, _, _ = time_map.measure_at(time_map.time_to_qn(marker.time))
+        beat = time_map.time_to_qn(marker.time) - measure_start
+        return (True, proj, ptidx, marker.time, measure, beat, marker.bpm,
+                marker.num, marker.denom, marker.linear)
+
+    @_mutates
+    def SetTempoTimeSigMarker(self, proj, ptidx, timepos, measurepos, beatpos, bpm,
+                              timesig_num, timesig_denom, lineartempo):
+        time_map = self._project(proj).time_map
+        if timepos < 0:
+            qn = time_map.measure_start(max(measurepos, 0)) + beatpos
+            timepos = time_map.qn_to_time(qn)
+        marker = TempoMarker(timepos, bpm, timesig_num, timesig_denom, bool(lineartempo))
+        if 0 <= ptidx < len(time_map.markers):
+            time_map.markers[ptidx] = marker
+        else:
+            time_map.markers.append(marker)
+        time_map.sort()
+        return True
+
+    @_mutates
+    def DeleteTempoTimeSigMarker(self, project, markerindex):
+        markers = self._project(project).time_map.markers
+        if not 0 <= markerindex < len(markers):
+            return False
+        del markers[markerindex]
+        return True
+
+    def TimeMap2_timeToQN(self, proj, tpos):
+        return self._project(proj).time_map.time_to_qn(tpos)
+
+    def TimeMap2_QNToTime(self, proj, qn):
+        return self._project(proj).time_map.qn_to_time(qn)
+
+    def TimeMap_timeToQN(self, tpos):
+        return self.reaper.project.time_map.time_to_qn(tpos)
+
+    def TimeMap_QNToTime(self, qn):
+        return self.reaper.project.time_map.qn_to_time(qn)
+
+    def TimeMap_QNToMeasures(self, proj, qn, qnMeasureStartOutOptional, qnMeasureEndOutOptional):
+        measure, start, end, _, _ = self._project(proj).time_map.measure_at(qn)
+        return (measure, proj, qn, start, end)
+
+    def TimeMap2_timeToBeats(self, proj, tpos, measuresOutOptional, cmlOutOptional,
+                             fullbeatsOutOptional, cdenomOutOptional):
+        time_map = self._project(proj).time_map
+        qn = time_map.time_to_qn(tpos)
+        measure, start, _, num, denom = time_map.measure_at(qn)
+        return ((qn - start) * denom / 4, proj, tpos, measure, num, qn * denom / 4, denom)
+
+    def TimeMap2_beatsToTime(self, proj, tpos, measuresInOptional):
+        time_map = self._project(proj).time_map
+        return time_map.qn_to_time(time_map.measure_start(measuresInOptional or 0) + tpos)
+
+    def TimeMap_GetTimeSigAtTime(self, proj, time, timesig_numOut, timesig_denomOut, tempoOut):
+        time_map = self._project(proj).time_map
+        _, _, _, num, denom = time_map.measure_at(time_map.time_to_qn(time))
+        return (proj, time, num, denom, time_map.bpm_at(time))
+
+    # Sends
+
+    def _routes(self, track, category):
+        if category < 0:
+            return [send for other in track.project.tracks for send in other.sends if send.dest is track]
+        return track.sends if category == 0 else []
+
+    def GetTrackNumSends(self, tr, category):
+        return len(self._routes(self._get(tr, Track), category))
+
+    @_mutates
+    def CreateTrackSend(self, tr, desttrInOptional):
+        track = self._get(tr, Track)
+        track.sends.append(Send(track, self._get(desttrInOptional, Track)))
+        return len(track.sends) - 1
+
+    @_mutates
+    def RemoveTrackSend(self, tr, category, sendidx):
+        routes = self._routes(self._get(tr, Track), category)
+        if not 0 <= sendidx < len(routes):
+            return False
+        send = routes[sendidx]
+        send.source.sends.remove(send)
+        return True
+
+    def GetTrackSendInfo_Value(self, tr, category, sendidx, parmname):
+        routes = self._routes(self._get(tr, Track), category)
+        if not 0 <= sendidx < len(routes):
+            return 0.0
+        send = routes[sendidx]
+        if parmname in ("P_DESTTRACK", "P_SRCTRACK"):
+            return float(int((send.dest if parmname == "P_DESTTRACK" else send.source).id[-16:], 16))
+        return send.info.get(parmname, 0.0)
+
+    @_mutates
+    def SetTrackSendInfo_Value(self, tr, category, sendidx, parmname, newvalue):
+        routes = self._routes(self._get(tr, Track), category)
+        if not 0 <= sendidx < len(routes):
+            return False
+        routes[sendidx].info[parmname] = float(newvalue)
+        return True
+
+    def BR_GetSetTrackSendInfo(self, track, category, sendidx, parmname, setNewValue, newValue):
+        if setNewValue:
+            self.SetTrackSendInfo_Value(track, category, sendidx, parmname, newValue)
+        return self.GetTrackSendInfo_Value(track, category, sendidx, parmname)
+
+    # FX
+
+    def TrackFX_GetCount(self, track):
+        return len(self._get(track, Track).fxs)
+
+    def TrackFX_GetFXName(self, track, fx, buf, buf_sz):
+        fxs = self._get(track, Track).fxs
+        if not 0 <= fx < len(fxs):
+            return (False, track, fx, "", buf_sz)
+        return (True, track, fx, fxs[fx].name, buf_sz)
+
+    @_mutates
+    def TrackFX_AddByName(self, track, fxname, recFX, instantiate):
+        fxs = self._get(track, Track).fxs
+        for index, fx in enumerate(fxs):
+            if fxname.lower() in fx.name.lower() and instantiate <= 0:
+                return index
+        if instantiate == -1:
+            return -1
+        fxs.append(FX(fxname))
+        return len(fxs) - 1
+
+    @_mutates
+    def TrackFX_Delete(self, track, fx):
+        fxs = self._get(track, Track).fxs
+        if not 0 <= fx < len(fxs):
+            return False
+        del fxs[fx]
+        return True
+
+    def TrackFX_GetInstrument(self, track):
+        for index, fx in enumerate(self._get(track, Track).fxs):
+            if fx.name.startswith("VSTi") or fx.name.startswith("VST3i"):
+                return index
+        return -1
+
+    def TrackFX_GetEnabled(self, track, fx):
+        fxs = self._get(track, Track).fxs
+        return fxs[fx].enabled if 0 <= fx < len(fxs) else False
+
+    @_mutates
+    def TrackFX_SetEnabled(self, track, fx, enabled):
+        fxs = self._get(track, Track).fxs
+        if 0 <= fx < len(fxs):
+            fxs[fx].enabled = bool(enabled)
+
+    def TrackFX_Show(self, track, index, showFlag):
+        track = self._get(track, Track)
+        # 1 shows the chain and 3 floats a window; 0 and 2 hide them
+        if showFlag in (1, 3):
+            self.reaper.focused_fx = (track, index)
+        elif self.reaper.focused_fx is not None and self.reaper.focused_fx[0] is track:
+            self.reaper.focused_fx = None
+
+    def GetFocusedFX(self, tracknumberOut, itemnumberOut, fxnumberOut):
+        focused = self.reaper.focused_fx
+        if focused is None or focused[0].project is not self.reaper.project \
+                or focused[0] not in focused[0].project.tracks:
+            return (0, 0, 0, 0)
+        track, index = focused
+        return (1, track.project.tracks.index(track) + 1, -1, index)
+
+    def TrackFX_GetNamedConfigParm(self, track, fx, parmname, bufOut, bufOut_sz):
+        fxs = self._get(track, Track).fxs
+        if not 0 <= fx < len(fxs) or parmname not in fxs[fx].params:
+            return (False, track, fx, parmname, "", bufOut_sz)
+        return (True, track, fx, parmname, fxs[fx].params[parmname], bufOut_sz)
+
+    @_mutates
+    def TrackFX_SetNamedConfigParm(self, track, fx, parmname, value):
+        fxs = self._get(track, Track).fxs
+        if not 0 <= fx < len(fxs) or parmname == "fx_name":
+            return False
+        fxs[fx].params[parmname] = value
+        return True
@@ -0,0 +1,479 @@
+import bisect
+import struct
+
+# Ticks per quarter note of every take, as in a default REAPER project
+TICKS_PER_QUARTER = 960
+
+_HEADER = struct.Struct("<iBi")
+
+# Status nibbles REAPER addresses through MIDI_GetCC / MIDI_SetCC
+CC_FAMILY = (0xA0, 0xB0, 0xC0, 0xD0, 0xE0)
+
+
+def null_pointer(kind):
+    return "({}*)0x{:016X}".format(kind, 0)
+
+
+class Pointers:
+    """Hands out REAPER-style pointer strings and resolves them back to objects."""
+
+    def __init__(self):
+        self.objects = {}
+        self.next_address = 0x10000
+
+    def register(self, kind, obj):
+        pointer = "({}*)0x{:016X}".format(kind, self.next_address)
+        self.next_address += 0x10
+        self.objects[pointer] = obj
+        obj.id = pointer
+        return pointer
+
+    def resolve(self, pointer):
+        return self.objects.get(pointer)
+
+    def forget(self, obj):
+        self.objects.pop(obj.id, None)
+
+
+class Event:
+    """One MIDI event of a take: absolute PPQ position, flag bits and message bytes."""
+    __slots__ = ("ppq", "flags", "msg")
+
+    def __init__(self, ppq, flags, msg):
+        self.ppq = int(round(ppq))
+        self.flags = flags & 0xFF
+        self.msg = bytes(msg)
+
+    @property
+    def status(self):
+        return self.msg[0] & 0xF0 if self.msg else 0
+
+    @property
+    def is_note_on(self):
+        return len(self.msg) == 3 and self.status == 0x90 and self.msg[2] > 0
+
+    @property
+    def is_note_off(self):
+        return len(self.msg) == 3 and (self.status == 0x80 or (self.status == 0x90 and self.msg[2] == 0))
+
+    @property
+    def is_cc(self):
+        return 2 <= len(self.msg) <= 3 and self.msg[0] < 0xF0 and self.status in CC_FAMILY
+
+
+def decode(data):
+    events = []
+    ppq = pos = 0
+    while pos + _HEADER.size <= len(data):
+        offset, flags, length = _HEADER.unpack_from(data, pos)
+        pos += _HEADER.size
+        ppq += offset
+        events.append(Event(ppq, flags, data[pos:pos + length]))
+        pos += length
+    return events
+
+
+def encode(events):
+    chunks = []
+    last_ppq = 0
+    for event in events:
+        chunks.append(_HEADER.pack(event.ppq - last_ppq, event.flags, len(event.msg)))
+        chunks.append(event.msg)
+        last_ppq = event.ppq
+    return b"".join(chunks)
+
+
+def _sort_key(event):
+    return (event.ppq, 0 if event.is_note_off else 1)
+
+
+class Take:
+    """A MIDI take holding its events in REAPER's stream order."""
+
+    def __init__(self, item, name="", events=()):
+        self.item = item
+        self.name = name
+        self.events = list(events)
+        self.changed()
+
+    def changed(self, structure=True):
+        """Drop cached views; in-place edits without a re-sort keep note pairs and order"""
+        if structure:
+            self._notes = None
+            self._ccs = None
+        self._data = None
+        self._hashes = {}
+
+    def sort(self):
+        self.events.sort(key=_sort_key)
+        self.changed()
+
+    @property
+    def notes(self):
+        """(note-on, note-off) event pairs in note-on order, as MIDI_GetNote indexes them"""
+        if self._notes is None:
+            notes, open_notes = [], {}
+            for event in self.events:
+                key = (event.msg[0] & 0x0F, event.msg[1]) if len(event.msg) == 3 else None
+                if event.is_note_on:
+                    pair = [event, None]
+                    notes.append(pair)
+                    open_notes.setdefault(key, []).append(pair)
+                elif event.is_note_off and open_notes.get(key):
+                    open_notes[key].pop(0)[1] = event
+            self._notes = [pair for pair in notes if pair[1] is not None]
+        return self._notes
+
+    @property
+    def ccs(self):
+        if self._ccs is None:
+            self._ccs = [event for event in self.events if event.is_cc]
+        return self._ccs
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = encode(self.events)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self.events = decode(data)
+        self.changed()
+
+    def hash(self, notes_only=False):
+        if notes_only not in self._hashes:
+            events = self.events
+            if notes_only:
+                events = [event for event in events if event.is_note_on or event.is_note_off]
+            self._hashes[notes_only] = "{:016X}".format(hash(encode(events)) & 0xFFFFFFFFFFFFFFFF)
+        return self._hashes[notes_only]
+
+
+class Item:
+    def __init__(self, track, position=0.0, length=4.0):
+        self.track = track
+        self.position = position
+        self.length = length
+        self.selected = False
+        self.takes = []
+        self.active = 0
+
+    @property
+    def active_take(self):
+        return self.takes[self.active] if self.takes else None
+
+
+class FX:
+    """An FX slot: its name, a base64 state chunk and named config parameters."""
+
+    def __init__(self, name, chunk=""):
+        self.name = name
+        self.params = {"fx_name": name, "vst_chunk": chunk}
+        self.enabled = True
+
+
+class Send:
+    def __init__(self, source, dest):
+        self.source = source
+        self.dest = dest
+        self.info = {"D_VOL": 1.0, "D_PAN": 0.0, "B_MUTE": 0.0, "I_SENDMODE": 0.0,
+                     "I_SRCCHAN": 0.0, "I_DSTCHAN": 0.0, "I_MIDIFLAGS": 0.0}
+
+
+class Track:
+    def __init__(self, project, name=""):
+        self.project = project
+        self.name = name
+        self.info = {"B_MUTE": 0.0, "I_SOLO": 0.0, "I_SELECTED": 0.0, "D_VOL": 1.0, "D_PAN": 0.0,
+                     "I_FOLDERDEPTH": 0.0, "B_SHOWINTCP": 1.0, "B_SHOWINMIXER": 1.0,
+                     "I_HEIGHTOVERRIDE": 0.0, "I_RECARM": 0.0, "I_CUSTOMCOLOR": 0.0}
+        self.items = []
+        self.fxs = []
+        self.sends = []
+
+    @property
+    def selected(self):
+        return bool(self.info["I_SELECTED"])
+
+    @selected.setter
+    def selected(self, value):
+        self.info["I_SELECTED"] = 1.0 if value else 0.0
+
+
+class Marker:
+    def __init__(self, number, position, name="", color=0, is_region=False, end=0.0):
+        self.number = number
+        self.position = position
+        self.name = name
+        self.color = color
+        self.is_region = is_region
+        self.end = end
+
+
+class TempoMarker:
+    def __init__(self, time, bpm, num=0, denom=0, linear=False):
+        self.time = time
+        self.bpm = bpm
+        self.num = num
+        self.denom = denom
+        self.linear = linear
+
+
+class TimeMap:
+    """Piecewise-constant tempo map with time signature changes on measure starts."""
+
+    def __init__(self, bpm=120.0, num=4, denom=4):
+        self.bpm = bpm
+        self.num = num
+        self.denom = denom
+        self.markers = []
+
+    def sort(self):
+        self.markers.sort(key=lambda marker: marker.time)
+
+    def _segments(self):
+        """(time, qn, bpm) where each tempo segment starts"""
+        segments = [(0.0, 0.0, self.bpm)]
+        for marker in self.markers:
+            time, qn, bpm = segments[-1]
+            if marker.time <= time:
+                segments[-1] = (time, qn, marker.bpm)
+                continue
+            segments.append((marker.time, qn + (marker.time - time) * bpm / 60, marker.bpm))
+        return segments
+
+    def time_to_qn(self, time):
+        segments = self._segments()
+        start, qn, bpm = segments[max(bisect.bisect_right([s[0] for s in segments], time) - 1, 0)]
+        return qn + (time - start) * bpm / 60
+
+    def qn_to_time(self, qn):
+        segments = self._segments()
+        start, start_qn, bpm = segments[max(bisect.bisect_right([s[1] for s in segments], qn) - 1, 0)]
+        return start + (qn - start_qn) * 60 / bpm
+
+    def bpm_at(self, time):
+        segments = self._segments()
+        return segments[max(bisect.bisect_right([s[0] for s in segments], time) - 1, 0)][2]
+
+    def _signatures(self):
+        """(qn, first measure index, quarters per measure, num, denom) per signature change"""
+        signatures = [(0.0, 0, 4.0 * self.num / self.denom, self.num, self.denom)]
+        for marker in self.markers:
+            if marker.num <= 0:
+                continue
+            qn = self.time_to_qn(marker.time)
+            start, measure, length, _, _ = signatures[-1]
+            # Signature changes snap forward to the next measure start
+            measure += int(-(-(qn - start - 1e-9) // length))
+            qn = start + (measure - signatures[-1][1]) * length
+            denom = marker.denom or signatures[-1][4]
+            signatures.append((qn, measure, 4.0 * marker.num / denom, marker.num, denom))
+        return signatures
+
+    def measure_at(self, qn):
+        """(measure index, measure start qn, measure end qn, num, denom) containing qn"""
+        signatures = self._signatures()
+        start, measure, length, num, denom = signatures[
+            max(bisect.bisect_right([s[0] for s in signatures], qn) - 1, 0)]
+        offset = int((qn - start) // length)
+        measure_start = start + offset * length
+        return measure + offset, measure_start, measure_start + length, num, denom
+
+    def measure_start(self, measure):
+        signatures = self._signatures()
+        start, first, length, _, _ = signatures[max(bisect.bisect_right([s[1] for s in signatures], measure) - 1, 0)]
+        return start + (measure - first) * length
+
+
+class Project:
+    """Everything one fake REAPER project holds."""
+
+    def __init__(self, pointers, name="Untitled"):
+        self.pointers = pointers
+        self.name = name
+        self.tracks = []
+        self.markers = []
+        self.time_map = TimeMap()
+        self.cursor = 0.0
+        self.play_state = 0
+        self.state_changes = 0
+        self.undo_stack = []
+        self.redo_stack = []
+        self.undo_depth = 0
+        self.undo_before = None
+        self.ui_refresh_depth = 0
+        pointers.register("ReaProject", self)
+
+    def touch(self):
+        self.state_changes += 1
+
+    # Building the project
+
+    def add_track(self, name="", index=None):
+        track = Track(self, name)
+        self.pointers.register("MediaTrack", track)
+        self.tracks.insert(len(self.tracks) if index is None else index, track)
+        return track
+
+    def add_item(self, track, position=0.0, length=4.0):
+        item = Item(track, position, length)
+        self.pointers.register("MediaItem", item)
+        track.items.append(item)
+        return item
+
+    def add_midi_take(self, item, name="", events=()):
+        take = Take(item, name, events)
+        self.pointers.register("MediaItem_Take", take)
+        item.takes.append(take)
+        take.sort()
+        return take
+
+    def add_marker(self, position, name="", color=0, is_region=False, end=0.0, number=-1):
+        if number < 0:
+            number = 1 + max((marker.number for marker in self.markers if marker.is_region == is_region), default=0)
+        marker = Marker(number, position, name, color, is_region, end)
+        self.markers.append(marker)
+        self.markers.sort(key=lambda m: (m.position, m.is_region))
+        return marker
+
+    def delete_track(self, track):
+        self.tracks.remove(track)
+        self.pointers.forget(track)
+        for other in self.tracks:
+            other.sends = [send for send in other.sends if send.dest is not track]
+
+    @property
+    def all_items(self):
+        return [item for track in self.tracks for item in track.items]
+
+    @property
+    def selected_items(self):
+        return [item for item in self.all_items if item.selected]
+
+    @property
+    def selected_tracks(self):
+        return [track for track in self.tracks if track.selected]
+
+    # Undo: snapshots of MIDI, markers, tempo map and track state
+
+    def snapshot(self):
+        return {
+            "takes": {take.id: list(take.events) for item in self.all_items for take in item.takes},
+            "markers": [Marker(m.number, m.position, m.name, m.color, m.is_region, m.end) for m in self.markers],
+            "tempo": [TempoMarker(t.time, t.bpm, t.num, t.denom, t.linear) for t in self.time_map.markers],
+            "tracks": {track.id: (track.name, dict(track.info), list(track.sends)) for track in self.tracks},
+        }
+
+    def restore(self, snapshot):
+        for pointer, events in snapshot["takes"].items():
+            take = self.pointers.resolve(pointer)
+            if take is not None:
+                take.events = list(events)
+                take.changed()
+        self.markers = snapshot["markers"]
+        self.time_map.markers = snapshot["tempo"]
+        for pointer, (name, info, sends) in snapshot["tracks"].items():
+            track = self.pointers.resolve(pointer)
+            if track is not None:
+                track.name, track.info, track.sends = name, info, sends
+        self.touch()
+
+    def begin_undo(self):
+        if self.undo_depth == 0:
+            self.undo_before = self.snapshot()
+        self.undo_depth += 1
+
+    def end_undo(self, description, record=True):
+        self.undo_depth = max(self.undo_depth - 1, 0)
+        if self.undo_depth == 0 and self.undo_before is not None:
+            if record:
+                self.undo_stack.append((description, self.undo_before, self.snapshot()))
+                self.redo_stack.clear()
+            self.undo_before = None
+
+    def undo(self):
+        if not self.undo_stack:
+            return False
+        entry = self.undo_stack.pop()
+        self.restore(entry[1])
+        self.redo_stack.append(entry)
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        entry = self.redo_stack.pop()
+        self.restore(entry[2])
+        self.undo_stack.append(entry)
+        return True
+
+
+class Reaper:
+    """The whole fake REAPER session: open projects and the MIDI editor state."""
+
+    def __init__(self):
+        self.pointers = Pointers()
+        self.projects = [Project(self.pointers)]
+        self.current = 0
+        self.main_hwnd = self.pointers.register("HWND", self)
+        self.midi_editor = None
+        # (track, fx index) of the FX window last shown, or None
+        self.focused_fx = None
+        self.ext_state = {}
+
+    @property
+    def project(self):
+        return self.projects[self.current]
+
+    def resolve_project(self, proj):
+        """Project for a ReaProject pointer, where 0/None/null means the current one"""
+        if not proj or (isinstance(proj, str) and proj.endswith("0x0000000000000000")):
+            return self.project
+        project = self.pointers.resolve(proj)
+        return project if isinstance(project, Project) else self.project
+
+    def project_of(self, obj):
+        if isinstance(obj, Take):
+            obj = obj.item
+        if isinstance(obj, Item):
+            obj = obj.track
+        return obj.project if isinstance(obj, Track) else self.project
+
+
+class MidiEditor:
+    def __init__(self, reaper, take):
+        self.take = take
+        self.settings = {"scroll_x": 0, "scroll_y": 0, "zoom": 100, "default_note_len": 0,
+                         "default_note_vel": 96, "default_note_chan": 0}
+        reaper.pointers.register("HWND", self)
+
+
+def demo_session(tracks=4, notes_per_take=256, markers=8):
+    """A Reaper with a few MIDI tracks, notes, CC ramps, markers and a tempo change."""
+    reaper = Reaper()
+    project = reaper.project
+    for index in range(tracks):
+        track = project.add_track(f"Track {index + 1}")
+        track.fxs.append(FX("VSTi: ReaSynth (Cockos)", "UmVhU3ludGg="))
+        item = project.add_item(track, 0.0, notes_per_take / 4 * 0.5)
+        item.selected = index == 0
+        events = []
+        for n in range(notes_per_take):
+            start = n * TICKS_PER_QUARTER // 4
+            pitch = 36 + (n * 7 + index * 5) % 48
+            velocity = 40 + (n * 13) % 80
+            events.append(Event(start, 0, bytes([0x90, pitch, velocity])))
+            events.append(Event(start + TICKS_PER_QUARTER // 8, 0, bytes([0x80, pitch, 0])))
+            if n % 4 == 0:
+                events.append(Event(start, 0, bytes([0xB0, 1, (n * 3) % 128])))
+        project.add_midi_take(item, f"Take {index + 1}", events)
+    for index, track in enumerate(project.tracks[1:], 1):
+        track.sends.append(Send(track, project.tracks[0]))
+    for index in range(markers):
+        project.add_marker(index * 2.0, f"Marker {index + 1}")
+    project.time_map.markers.append(TempoMarker(8.0, 140.0))
+    project.tracks[0].selected = True
+    reaper.midi_editor = MidiEditor(reaper, project.tracks[0].items[0].takes[0])
+    return reaper
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import types
+import argparse
+import threading
+import subprocess
+from urllib import request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules.fake_reaper.api import FakeApi
+from modules.fake_reaper.model import Reaper, demo_session
+
+# Defaults one above reapy's own, so a real REAPER can keep running alongside
+DEFAULT_SERVER_PORT = 2316
+DEFAULT_WEB_INTERFACE_PORT = 2317
+
+# REAPER runs deferred scripts (and so the reapy server) about 30 times a second
+DEFAULT_TICK = 1 / 30
+
+_PORT_PATH = "/_/GET/EXTSTATE/reapy/server_port"
+
+
+def install(api):
+    """Make this process look like REAPER's embedded Python with api behind it.
+
+    Registers a reaper_python module exposing api as RPR_* functions, marks
+    __main__ the way REAPER does, imports reapy and points its ReaScript
+    functions (including the ctypes overrides of reapy.additional_api) at
+    api. Has to run before anything else imports reapy.
+    """
+    if "reapy" in sys.modules:
+        raise RuntimeError("reapy was imported before the fake REAPER was installed")
+    functions = api.functions()
+    module = types.ModuleType("reaper_python")
+    for name, func in functions.items():
+        setattr(module, "RPR_" + name, func)
+    sys.modules["reaper_python"] = module
+    sys.modules["__main__"].obj = None
+
+    import reapy
+    from reapy import reascript_api
+    for name, func in functions.items():
+        setattr(reascript_api, name, func)
+    reascript_api.__all__ = sorted(functions)
+    return reapy
+
+
+def _web_interface(server_port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # reapy reads the value after the last tab, minus the trailing newline
+            body = f"EXTSTATE\treapy\tserver_port\t{server_port}\n" if self.path == _PORT_PATH else ""
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class FakeReaperServer:
+    """reapy's distant API server plus REAPER's web interface, answered by a FakeApi.
+
+    Requests are handled the way REAPER handles them: a batch of pending
+    requests once per tick, or back to back while a client holds the
+    connection. Every API call is delayed by latency seconds on top.
+    """
+
+    def __init__(self, api, port=DEFAULT_SERVER_PORT, web_interface_port=DEFAULT_WEB_INTERFACE_PORT,
+                 latency=0.0, tick=DEFAULT_TICK, host="0.0.0.0"):
+        self.api = api
+        self.port = port
+        self.web_interface_port = web_interface_port
+        self.latency = latency
+        self.tick = tick
+        self.host = host
+        self.running = False
+        self.requests = 0
+
+    def _make_server(self):
+        from reapy.tools.network.server import Server
+
+        outer = self
+
+        class LatencyServer(Server):
+            def _process_request(self, request, address):
+                if request["function"] not in ("HOLD", "RELEASE"):
+                    outer.requests += 1
+                    if outer.latency:
+                        time.sleep(outer.latency)
+                return super()._process_request(request, address)
+
+        return LatencyServer(self.port)
+
+    def serve_forever(self):
+        web = ThreadingHTTPServer((self.host, self.web_interface_port), _web_interface(self.port))
+        threading.Thread(target=web.serve_forever, daemon=True).start()
+        server = self._make_server()
+        self.running = True
+        try:
+            while self.running:
+                server.accept()
+                requests = server.get_requests()
+                results = server.process_requests(requests)
+                server.send_results(results)
+                time.sleep(self.tick)
+        finally:
+            web.shutdown()
+            server.close()
+
+    def stop(self):
+        self.running = False
+
+
+def spawn(port=DEFAULT_SERVER_PORT, web_interface_port=DEFAULT_WEB_INTERFACE_PORT, latency=0.0,
+          tick=DEFAULT_TICK, demo=True, timeout=10.0):
+    """Start a fake REAPER in a child process and return it once it answers.
+
+    reapy decides at import time whether it runs inside REAPER, so the fake
+    always lives in its own process. Stop it with .terminate().
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = [sys.executable, "-m", "modules.fake_reaper", "--port", str(port),
+            "--web-interface-port", str(web_interface_port), "--latency", str(latency * 1000),
+            "--tick", str(tick * 1000)]
+    if not demo:
+        args.append("--empty")
+    process = subprocess.Popen(args, cwd=root)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            request.urlopen(f"http://localhost:{web_interface_port}{_PORT_PATH}", timeout=0.5).read()
+            return process
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("Fake REAPER did not start")
+            time.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an in-memory REAPER over reapy's distant API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT, help="reapy server port")
+    parser.add_argument("--web-interface-port", type=int, default=DEFAULT_WEB_INTERFACE_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="extra milliseconds per API call")
+    parser.add_argument("--tick", type=float, default=DEFAULT_TICK * 1000,
+                        help="milliseconds between request batches outside held connections")
+    parser.add_argument("--empty", action="store_true", help="start with an empty project instead of demo content")
+    args = parser.parse_args(argv)
+
+    api = FakeApi(Reaper() if args.empty else demo_session())
+    install(api)
+    server = FakeReaperServer(api, args.port, args.web_interface_port, args.latency / 1000,
+                              args.tick / 1000, args.host)
+    print(f"Fake REAPER listening on {args.host}:{args.port} "
+          f"(web interface {args.web_interface_port}, {args.latency:g} ms latency)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,71 @@
+import numpy as np
+from modules.note_table import NoteTable
+from modules.take_buffer import get_ticks_per_quarter
+
+# uniform spreads evenly over +-amount, gaussian treats amount as two standard
+# deviations, beat is gaussian with notes on the beat kept tighter than off-beat ones
+DISTRIBUTIONS = ("gaussian", "uniform", "beat")
+
+# (lowest pitch, highest pitch, timing scale, length scale, velocity scale)
+DEFAULT_PROFILES = (
+    (0, 47, 0.5, 1.0, 0.75),  # Bass sits tight
+)
+
+
+def draw(rng, shape, distribution="gaussian"):
+    """Draw unit jitter values, mostly within -1..1, in a single call."""
+    if distribution == "uniform":
+        return rng.uniform(-1.0, 1.0, size=shape)
+    return np.clip(rng.normal(0.0, 0.5, size=shape), -1.0, 1.0)
+
+
+def profile_scales(pitches, profiles=DEFAULT_PROFILES):
+    """Per-note (timing, length, velocity) scale factors from pitch-range profiles."""
+    pitches = np.asarray(pitches)
+    scales = np.ones((3, len(pitches)))
+    for low, high, *factors in profiles:
+        in_range = (pitches >= low) & (pitches <= high)
+        scales[:, in_range] = np.asarray(factors, dtype=np.float64)[:, None]
+    return scales
+
+
+def beat_weights(starts, ticks_per_quarter):
+    """0.25 for notes on a beat rising to 1.0 halfway between beats."""
+    position = np.mod(np.asarray(starts, dtype=np.float64) / ticks_per_quarter, 1.0)
+    offbeat = 2 * np.minimum(position, 1 - position)
+    return 0.25 + 0.75 * offbeat
+
+
+def humanize_notes(table, rng, timing=0, length=0, velocity=0, distribution="gaussian",
+                   ticks_per_quarter=960, profiles=DEFAULT_PROFILES):
+    """Jitter note timing, length and velocity of a NoteTable in place.
+
+    timing and length are in ticks, velocity in velocity steps. Timing moves
+    whole notes, length jitter moves only the ends. All random values come
+    from one draw on rng, so the same seed reproduces the same result.
+    """
+    count = len(table)
+    if not count:
+        return 0
+
+    amounts = np.array([timing, length, velocity], dtype=np.float64)[:, None]
+    offsets = draw(rng, (3, count), distribution) * amounts * profile_scales(table.pitch, profiles)
+    if distribution == "beat":
+        offsets[:2] *= beat_weights(table.start, ticks_per_quarter)
+    time_shift, length_shift, velocity_shift = np.round(offsets)
+
+    lengths = np.maximum(table.end - table.start + length_shift, 1)
+    table.start[:] = np.maximum(table.start + time_shift, 0)
+    table.end[:] = table.start + lengths
+    table.velocity[:] = np.clip(table.velocity + velocity_shift, 1, 127)
+    return count
+
+
+def humanize_selected(buffer, rng, timing=10, length=0, velocity=8, distribution="gaussian"):
+    """Humanize a TakeBuffer's selected notes with humanize_notes(); returns the note count."""
+    table = NoteTable.from_buffer(buffer, selected_only=True)
+    if not len(table):
+        return 0
+    humanize_notes(table, rng, timing, length, velocity, distribution, get_ticks_per_quarter(buffer.take_id))
+    table.apply()
+    return len(table)
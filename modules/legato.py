@@ -0,0 +1,140 @@
+import numpy as np
+from modules.note_table import NoteTable
+
+# How notes are grouped before looking for the next onset
+LEGATO_MODES = ("all", "channel", "pitch")
+
+# What happens to same-pitch notes that overlap
+OVERLAP_MODES = ("trim", "merge")
+
+
+def _group_ids(table, by):
+    if by == "pitch":
+        return table.channel.astype(np.int64) * 128 + table.pitch
+    if by == "channel":
+        return table.channel.astype(np.int64)
+    return np.zeros(len(table), dtype=np.int64)
+
+
+def _sweep_order(table, by):
+    """Sort notes by group then start, and return (order, groups, keyed starts, keyed ends).
+
+    Positions are offset by group rank so one flat searchsorted or running
+    maximum never crosses from one group into the next.
+    """
+    groups = _group_ids(table, by)
+    order = np.lexsort((table.start, groups))
+    sorted_groups = groups[order]
+    rank = np.concatenate(([0], np.cumsum(sorted_groups[1:] != sorted_groups[:-1])))
+    span = max(float(table.end.max()), float(table.start.max())) + 1
+    starts = table.start[order] + rank * span
+    ends = table.end[order] + rank * span
+    return order, rank, starts, ends
+
+
+def _next_onsets(rank, starts):
+    """Index (into sorted order) of the next strictly later onset in the same group, or -1."""
+    following = np.searchsorted(starts, starts, side="right")
+    valid = following < len(starts)
+    following = np.where(valid, following, 0)
+    valid &= rank[following] == rank
+    return np.where(valid, following, -1)
+
+
+def make_legato(table, gap=10, by="all"):
+    """Extend (or shorten) every note to the next onset minus gap ticks, in place.
+
+    by="all" treats the take as one voice, "channel" one voice per channel and
+    "pitch" one voice per channel and pitch. Notes in a chord share the next
+    onset. Returns the number of notes changed.
+    """
+    if not len(table):
+        return 0
+    order, rank, starts, _ = _sweep_order(table, by)
+    following = _next_onsets(rank, starts)
+    has_next = following >= 0
+    new_ends = starts[following] - gap
+    valid = has_next & (new_ends > starts)
+    targets = order[valid]
+    # Keyed positions share the group offset, so the difference is the real length
+    new_lengths = (new_ends - starts)[valid]
+    before = table.end[targets].copy()
+    table.end[targets] = table.start[targets] + new_lengths
+    return int(np.count_nonzero(table.end[targets] != before))
+
+
+def resolve_overlaps(table, mode="trim"):
+    """Fix overlapping notes of the same channel and pitch in one sweep.
+
+    mode="trim" cuts each note at the next onset of that pitch; mode="merge"
+    joins each run of overlapping notes into its first note. Returns the
+    indices of notes that should be removed from the buffer (always empty for
+    trim); end changes are made in place.
+    """
+    if not len(table):
+        return np.empty(0, dtype=np.int64)
+    order, rank, starts, ends = _sweep_order(table, "pitch")
+
+    if mode == "merge":
+        # A note starts a new run unless it begins before everything earlier in its run has ended
+        reach = np.maximum.accumulate(ends)
+        new_run = np.ones(len(order), dtype=bool)
+        new_run[1:] = (starts[1:] >= reach[:-1]) | (rank[1:] != rank[:-1])
+        heads = np.flatnonzero(new_run)
+        run_ends = np.maximum.reduceat(ends, heads)
+        table.end[order[heads]] = table.start[order[heads]] + (run_ends - starts[heads])
+        return np.sort(order[~new_run])
+
+    following = _next_onsets(rank, starts)
+    overlapping = (following >= 0) & (ends > starts[following])
+    targets = order[overlapping]
+    table.end[targets] = table.start[targets] + (starts[following] - starts)[overlapping]
+    return np.empty(0, dtype=np.int64)
+
+
+def find_duplicates(table):
+    """Indices of stacked duplicates: notes with the same channel, pitch and start as another.
+
+    The longest (then loudest) note of each stack is kept.
+    """
+    if not len(table):
+        return np.empty(0, dtype=np.int64)
+    groups = _group_ids(table, "pitch")
+    order = np.lexsort((-table.velocity, -(table.end - table.start), table.start, groups))
+    same_as_previous = np.zeros(len(order), dtype=bool)
+    same_as_previous[1:] = ((groups[order][1:] == groups[order][:-1])
+                            & (table.start[order][1:] == table.start[order][:-1]))
+    return np.sort(order[same_as_previous])
+
+
+def legato_selected(buffer, gap=10):
+    """Make a TakeBuffer's selected notes legato and trim same-pitch overlaps; returns the note count."""
+    table = NoteTable.from_buffer(buffer, selected_only=True)
+    if not len(table):
+        return 0
+    make_legato(table, gap)
+    resolve_overlaps(table)
+    table.apply()
+    return len(table)
+
+
+def clean_overlaps(buffer, table, mode="trim"):
+    """Remove stacked duplicates, then resolve remaining overlaps, writing removals to the buffer.
+
+    The table is applied to its notes before anything is removed. Returns the
+    number of notes removed.
+    """
+    duplicates = find_duplicates(table)
+    keep = np.ones(len(table), dtype=bool)
+    keep[duplicates] = False
+    survivors = np.flatnonzero(keep)
+
+    # Sweep only the surviving notes, mapping removals back to table indices
+    sub_table = type(table)(table.rows[survivors], [table.notes[i] for i in survivors])
+    merged = survivors[resolve_overlaps(sub_table, mode)]
+    table.rows[survivors] = sub_table.rows
+    table.apply()
+
+    removed = np.concatenate((duplicates, merged))
+    buffer.remove_notes([table.notes[i] for i in removed])
+    return len(removed)
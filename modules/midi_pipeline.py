@@ -0,0 +1,292 @@
+import os
+import abc
+import ast
+import json
+import operator
+import numpy as np
+import reapy
+from modules.take_buffer import get_ticks_per_quarter
+from modules.note_table import NoteTable
+from modules.transpose import transpose_pitches
+from modules.quantize import QuantizeGrid, quantize_notes
+from modules.legato import make_legato
+from modules.humanize import humanize_notes
+from modules.edit_transaction import MidiEditTransaction
+from modules.transport import session
+
+PRESETS_PATH = os.path.join("config files", "midi_pipelines.json")
+
+# Arithmetic allowed in step arguments, so grids can be written as 1/16
+_ARG_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+class PipelineContext:
+    """Per-take values shared by every step of a pipeline run.
+
+    take and project place grid steps on the project's bars; without them
+    the grid starts at the take's PPQ 0.
+    """
+
+    def __init__(self, ticks_per_quarter, rng=None, take=None, project=None):
+        self.ticks_per_quarter = ticks_per_quarter
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.take = take
+        self.project = project
+
+
+class Transform(abc.ABC):
+    """A single in-memory step of a MIDI pipeline, chainable with ``|``."""
+    op = None
+
+    def __init__(self, **params):
+        self.params = params
+
+    def __or__(self, other):
+        return Pipeline([self]) | other
+
+    def __repr__(self):
+        args = ", ".join(f"{key}={value!r}" for key, value in self.params.items())
+        return f"{self.op}({args})"
+
+    @abc.abstractmethod
+    def apply(self, table, context):
+        """Edit the NoteTable in place"""
+
+    def to_dict(self):
+        return {"op": self.op, **self.params}
+
+
+class Quantize(Transform):
+    """Snap note starts to a grid given as a note value (1/16 = sixteenth), keeping lengths."""
+    op = "quantize"
+
+    def __init__(self, grid=1/16, strength=1.0, swing=0.0, window=1.0):
+        super().__init__(grid=grid, strength=strength, swing=swing, window=window)
+
+    def apply(self, table, context):
+        grid = self.params["grid"]
+        if grid <= 0:
+            return
+        if context.take is not None:
+            quantize_grid = QuantizeGrid.from_take(context.take, grid, table.start.min(), table.end.max(),
+                                                   context.project)
+        else:
+            quantize_grid = QuantizeGrid.uniform(table.start.min(), table.end.max(),
+                                                 context.ticks_per_quarter * 4 * grid)
+        quantize_notes(table, quantize_grid, self.params["strength"], self.params["swing"], self.params["window"])
+
+
+class Humanize(Transform):
+    """Random timing (ticks), length (ticks) and velocity offsets."""
+    op = "humanize"
+
+    def __init__(self, timing=0, vel=0, length=0, distribution="uniform"):
+        super().__init__(timing=timing, vel=vel, length=length, distribution=distribution)
+
+    def apply(self, table, context):
+        params = self.params
+        humanize_notes(table, context.rng, params["timing"], params["length"], params["vel"],
+                       params["distribution"], context.ticks_per_quarter)
+
+
+class Compress(Transform):
+    """Map the current velocity range onto min_vel..max_vel."""
+    op = "compress"
+
+    def __init__(self, min_vel=40, max_vel=110):
+        super().__init__(min_vel=min_vel, max_vel=max_vel)
+
+    def apply(self, table, context):
+        min_vel, max_vel = self.params["min_vel"], self.params["max_vel"]
+        velocities = table.velocity.astype(np.float64)
+        current_min, current_max = velocities.min(), velocities.max()
+        span = current_max - current_min
+        position = (velocities - current_min) / span if span else np.full(len(table), 0.5)
+        table.velocity[:] = np.clip(min_vel + position * (max_vel - min_vel), 1, 127).astype(np.int16)
+
+
+class Scale(Transform):
+    """Multiply velocities by a factor."""
+    op = "scale"
+
+    def __init__(self, factor=1.2):
+        super().__init__(factor=factor)
+
+    def apply(self, table, context):
+        table.velocity[:] = np.clip(table.velocity * self.params["factor"], 1, 127).astype(np.int16)
+
+
+class Velocity(Transform):
+    """Offset velocities by a fixed amount."""
+    op = "velocity"
+
+    def __init__(self, delta=0):
+        super().__init__(delta=delta)
+
+    def apply(self, table, context):
+        table.velocity[:] = np.clip(table.velocity + int(self.params["delta"]), 1, 127)
+
+
+class Transpose(Transform):
+    """Shift pitches by semitones, or by scale degrees when a scale name is given."""
+    op = "transpose"
+
+    def __init__(self, semitones=12, scale=None, root=0, edge="clamp"):
+        super().__init__(semitones=semitones, scale=scale, root=root, edge=edge)
+
+    def apply(self, table, context):
+        params = self.params
+        table.pitch[:] = transpose_pitches(
+            table.pitch, int(params["semitones"]), params["scale"], params["root"], params["edge"])
+
+
+class Legato(Transform):
+    """Extend every note to the next onset, minus a gap in ticks."""
+    op = "legato"
+
+    def __init__(self, gap=10, by="all"):
+        super().__init__(gap=gap, by=by)
+
+    def apply(self, table, context):
+        make_legato(table, self.params["gap"], self.params["by"])
+
+
+STEPS = {step.op: step for step in (Quantize, Humanize, Compress, Scale, Velocity, Transpose, Legato)}
+
+
+class Pipeline:
+    """A chain of transforms fused into one take read, one in-memory pass and one write."""
+
+    def __init__(self, steps=None, selected_only=False):
+        self.steps = list(steps or [])
+        self.selected_only = selected_only
+
+    def __or__(self, other):
+        other_steps = other.steps if isinstance(other, Pipeline) else [other]
+        return Pipeline(self.steps + other_steps, self.selected_only)
+
+    def __repr__(self):
+        return " | ".join(repr(step) for step in self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    @classmethod
+    def parse(cls, text):
+        """Build a pipeline from an expression like ``quantize(1/16) | humanize(timing=8, vel=6)``.
+
+        Only ``|`` between calls of known steps is accepted, with constants
+        (and arithmetic on numbers) as arguments; nothing in the text is run.
+        """
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid pipeline: {text}") from e
+        return cls(_parse_steps(tree.body))
+
+    def to_list(self):
+        return [step.to_dict() for step in self.steps]
+
+    @classmethod
+    def from_list(cls, data):
+        steps = []
+        for entry in data:
+            params = dict(entry)
+            op = params.pop("op")
+            if op not in STEPS:
+                raise ValueError(f"Unknown pipeline step: {op}")
+            steps.append(STEPS[op](**params))
+        return cls(steps)
+
+    def apply(self, table, context):
+        for step in self.steps:
+            step.apply(table, context)
+
+    def run(self, take, project=None, description=None, seed=None):
+        """Run the whole chain on a take and return the number of notes processed.
+
+        A seed makes the random steps repeat exactly across runs.
+        """
+        with MidiEditTransaction(description or f"MIDI Pipeline: {self!r}", project) as txn:
+            buffer = txn.open(take)
+            table = NoteTable.from_buffer(buffer, self.selected_only)
+            if not len(table):
+                print("No MIDI notes.")
+                return 0
+
+            context = PipelineContext(get_ticks_per_quarter(take), np.random.default_rng(seed), take, project)
+            self.apply(table, context)
+            table.apply()
+        return len(table)
+
+
+def _parse_steps(node):
+    """Steps of a parsed pipeline expression, whitelisting every node"""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return _parse_steps(node.left) + _parse_steps(node.right)
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in STEPS):
+        raise ValueError("A pipeline is steps like quantize(1/16) joined with |")
+    if any(keyword.arg is None for keyword in node.keywords):
+        raise ValueError("Unsupported syntax in pipeline: **")
+    args = [_parse_argument(arg) for arg in node.args]
+    kwargs = {keyword.arg: _parse_argument(keyword.value) for keyword in node.keywords}
+    try:
+        return [STEPS[node.func.id](*args, **kwargs)]
+    except TypeError as e:
+        raise ValueError(f"Invalid arguments for {node.func.id}: {e}") from e
+
+
+def _parse_argument(node):
+    """Value of a step argument: a constant, or arithmetic on numbers"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool, type(None))):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _parse_argument(node.operand)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARG_OPS:
+        left, right = _parse_argument(node.left), _parse_argument(node.right)
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (left, right)):
+            try:
+                return _ARG_OPS[type(node.op)](left, right)
+            except ZeroDivisionError as e:
+                raise ValueError("Division by zero in pipeline") from e
+    raise ValueError(f"Unsupported argument in pipeline: {ast.unparse(node)}")
+
+
+def load_presets():
+    """Load saved pipelines as a name -> Pipeline mapping"""
+    try:
+        with open(PRESETS_PATH, "r") as f:
+            return {name: Pipeline.from_list(steps) for name, steps in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, ValueError, TypeError) as e:
+        print(f"Invalid {PRESETS_PATH}: {e}")
+        return {}
+
+
+def save_preset(name, pipeline):
+    """Save a pipeline under a name, replacing any preset with the same name"""
+    presets = {key: value.to_list() for key, value in load_presets().items()}
+    presets[name] = pipeline.to_list()
+    os.makedirs(os.path.dirname(PRESETS_PATH), exist_ok=True)
+    with open(PRESETS_PATH, "w") as f:
+        json.dump(presets, f, indent=2)
+
+
+def run_preset(name):
+    """Run a saved pipeline on the active take of the first selected item"""
+    pipeline = load_presets().get(name)
+    if pipeline is None:
+        print(f"No MIDI pipeline preset named {name}")
+        return 0
+
+    with session():
+        project = reapy.Project()
+        item = project.get_selected_item(0)
+        take = item.active_take if item else None
+    if not take:
+        print("No selected item.")
+        return 0
+    return pipeline.run(take, project, f"MIDI Pipeline: {name}")
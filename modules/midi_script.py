@@ -0,0 +1,294 @@
+from functools import lru_cache
+import numpy as np
+from modules.take_buffer import CONTROL_CHANGE, PITCH_BEND, PROGRAM_CHANGE
+from modules.note_table import NOTE_DTYPE
+
+CC_DTYPE = np.dtype([
+    ("ppq", np.float64),
+    ("channel", np.uint8),
+    ("number", np.int16),
+    ("value", np.int16),
+    ("selected", np.bool_),
+    ("muted", np.bool_),
+])
+
+# Pitch bend value is signed, -8192..8191 with 0 at center
+PB_DTYPE = np.dtype([
+    ("ppq", np.float64),
+    ("channel", np.uint8),
+    ("value", np.int32),
+    ("selected", np.bool_),
+    ("muted", np.bool_),
+])
+
+PC_DTYPE = np.dtype([
+    ("ppq", np.float64),
+    ("channel", np.uint8),
+    ("program", np.int16),
+    ("selected", np.bool_),
+    ("muted", np.bool_),
+])
+
+@lru_cache(maxsize=128)
+def compile_script(source):
+    """Compile script source, reusing the code object of an identical recent script."""
+    return compile(source, "<midi script>", "exec")
+
+
+class ScriptTable:
+    """Structured array exposed to scripts with columns as attributes.
+
+    Reading ``notes.velocity`` gives an array view, and assigning
+    (``notes.velocity = notes.velocity * 1.1``) writes the column, so scripts
+    never touch REAPER objects directly.
+
+    Columns of a selected view are read-only copies, so in-place edits
+    (``selected_notes.velocity[0] = 1``, ``selected_notes.velocity += 1``)
+    raise instead of being lost; assign whole columns to change them.
+    """
+
+    def __init__(self, rows, mask=None):
+        object.__setattr__(self, "rows", rows)
+        object.__setattr__(self, "mask", mask)
+
+    def __len__(self):
+        return len(self.rows) if self.mask is None else int(self.mask.sum())
+
+    def __getattr__(self, name):
+        rows = object.__getattribute__(self, "rows")
+        if name not in rows.dtype.names:
+            raise AttributeError(name)
+        mask = object.__getattribute__(self, "mask")
+        if mask is None:
+            return rows[name]
+        column = rows[name][mask]
+        column.flags.writeable = False
+        return column
+
+    def __setattr__(self, name, value):
+        if name not in self.rows.dtype.names:
+            raise AttributeError(f"Unknown column: {name}")
+        if self.mask is None:
+            self.rows[name] = value
+        else:
+            column = self.rows[name]
+            column[self.mask] = value
+
+    def selected_view(self):
+        """A table over the same rows limited to selected events, writing through to them."""
+        return ScriptTable(self.rows, self.rows["selected"].copy())
+
+
+class ScriptSnapshot:
+    """Local NumPy copy of a take buffer for scripts, diffed and written back on commit."""
+
+    def __init__(self, buffer, ticks_per_quarter=960):
+        self.buffer = buffer
+        self.ticks_per_quarter = ticks_per_quarter
+        self.note_refs = list(buffer.notes)
+        self.cc_refs = [e for e in buffer.cc_events if e.status == CONTROL_CHANGE and len(e.msg) > 2]
+        self.pb_refs = [e for e in buffer.cc_events if e.status == PITCH_BEND and len(e.msg) > 2]
+        self.pc_refs = [e for e in buffer.cc_events if e.status == PROGRAM_CHANGE]
+
+        notes = np.empty(len(self.note_refs), dtype=NOTE_DTYPE)
+        for i, note in enumerate(self.note_refs):
+            notes[i] = (note.start, note.end, note.pitch, note.velocity, note.channel, note.selected, note.muted)
+        cc = np.empty(len(self.cc_refs), dtype=CC_DTYPE)
+        for i, event in enumerate(self.cc_refs):
+            cc[i] = (event.ppq, event.channel, event.msg[1], event.msg[2], event.selected, event.muted)
+        pb = np.empty(len(self.pb_refs), dtype=PB_DTYPE)
+        for i, event in enumerate(self.pb_refs):
+            pb[i] = (event.ppq, event.channel, (event.msg[2] << 7 | event.msg[1]) - 8192, event.selected, event.muted)
+        pc = np.empty(len(self.pc_refs), dtype=PC_DTYPE)
+        for i, event in enumerate(self.pc_refs):
+            pc[i] = (event.ppq, event.channel, event.msg[1], event.selected, event.muted)
+
+        self._load_arrays({"notes": notes, "cc": cc, "pb": pb, "pc": pc})
+
+    @classmethod
+    def from_arrays(cls, arrays, ticks_per_quarter=960):
+        """A snapshot without a buffer, as used by script worker processes."""
+        snapshot = cls.__new__(cls)
+        snapshot.buffer = None
+        snapshot.ticks_per_quarter = ticks_per_quarter
+        snapshot._load_arrays(arrays)
+        return snapshot
+
+    def _load_arrays(self, arrays):
+        self.notes, self.cc, self.pb, self.pc = (
+            ScriptTable(arrays[name]) for name in ("notes", "cc", "pb", "pc"))
+        self._original = {name: getattr(self, name).rows.copy() for name in ("notes", "cc", "pb", "pc")}
+        self.added = []
+        self.added_cc = []
+        self.removed = np.zeros(len(self.notes), dtype=bool)
+
+    def arrays(self):
+        """The event arrays, picklable for sending to a worker process."""
+        return {name: getattr(self, name).rows for name in ("notes", "cc", "pb", "pc")}
+
+    def edits(self):
+        """Everything a script changed, picklable for sending back from a worker process."""
+        return {"arrays": self.arrays(), "added": self.added, "added_cc": self.added_cc,
+                "removed": self.removed}
+
+    def apply_edits(self, edits):
+        """Take over the edits a worker made to a copy of this snapshot."""
+        for name, rows in edits["arrays"].items():
+            getattr(self, name).rows[:] = rows
+        self.added = list(edits["added"])
+        self.added_cc = list(edits["added_cc"])
+        self.removed = np.asarray(edits["removed"], dtype=bool)
+
+    def namespace(self, rng=None):
+        """Variables and helpers handed to a script."""
+        rng = rng if rng is not None else np.random.default_rng()
+        notes = self.notes
+
+        def add_notes(start, end, pitch, velocity, channel=0):
+            """Queue new notes; every argument may be a scalar or an array."""
+            columns = np.broadcast_arrays(start, end, pitch, velocity, channel)
+            self.added.extend(zip(*(column.ravel().tolist() for column in columns)))
+
+        def add_cc(ppq, number, value, channel=0):
+            """Queue new CC events; every argument may be a scalar or an array."""
+            columns = np.broadcast_arrays(ppq, number, value, channel)
+            self.added_cc.extend(zip(*(column.ravel().tolist() for column in columns)))
+
+        def remove_notes(mask):
+            """Remove the notes where mask is True."""
+            self.removed |= np.asarray(mask, dtype=bool)
+
+        def map_value(x, in_min, in_max, out_min, out_max):
+            return (np.asarray(x) - in_min) * (out_max - out_min) / (in_max - in_min) + out_min
+
+        def ramp(count, start, end):
+            return np.linspace(start, end, count)
+
+        def lfo(positions, period_quarters=1.0, depth=63.5, center=63.5, shape="sine"):
+            """Sample an LFO at PPQ positions, with the period in quarter notes."""
+            phase = np.asarray(positions, dtype=np.float64) / (self.ticks_per_quarter * period_quarters)
+            if shape == "triangle":
+                wave = 1 - 4 * np.abs(np.mod(phase + 0.25, 1) - 0.5)
+            elif shape == "square":
+                wave = np.where(np.mod(phase, 1) < 0.5, 1.0, -1.0)
+            elif shape == "saw":
+                wave = 2 * np.mod(phase, 1) - 1
+            else:
+                wave = np.sin(2 * np.pi * phase)
+            return center + depth * wave
+
+        def scale_velocities(factor):
+            notes.velocity = np.clip(notes.velocity * factor, 1, 127)
+
+        return {
+            "np": np,
+            "rng": rng,
+            "ticks_per_quarter": self.ticks_per_quarter,
+            "notes": notes,
+            "cc": self.cc,
+            "pb": self.pb,
+            "pc": self.pc,
+            "selected_notes": notes.selected_view(),
+            "selected_cc": self.cc.selected_view(),
+            "selected_pb": self.pb.selected_view(),
+            "selected_pc": self.pc.selected_view(),
+            "add_notes": add_notes,
+            "add_cc": add_cc,
+            "remove_notes": remove_notes,
+            "utils": {
+                "map_value": map_value,
+                "random_range": lambda min_val, max_val, size=None: rng.uniform(min_val, max_val, size),
+                "scale_velocities": scale_velocities,
+                "ramp": ramp,
+                "lfo": lfo,
+            },
+        }
+
+    def _changed(self, name):
+        rows = getattr(self, name).rows
+        return np.flatnonzero(rows != self._original[name])
+
+    def commit(self):
+        """Write array changes back into the buffer and return how many events changed."""
+        rows = self.notes.rows
+        changed = self._changed("notes")
+        for i in changed:
+            note, row = self.note_refs[i], rows[i]
+            note.start = float(row["start"])
+            note.end = float(max(row["end"], row["start"] + 1))
+            note.pitch = int(row["pitch"])
+            note.velocity = int(row["velocity"])
+            note.channel = int(row["channel"])
+            note.selected = bool(row["selected"])
+            note.muted = bool(row["muted"])
+
+        count = len(changed)
+        for name, refs, write in (("cc", self.cc_refs, self._write_cc),
+                                  ("pb", self.pb_refs, self._write_pb),
+                                  ("pc", self.pc_refs, self._write_pc)):
+            rows = getattr(self, name).rows
+            changed = self._changed(name)
+            for i in changed:
+                event, row = refs[i], rows[i]
+                event.ppq = float(row["ppq"])
+                event.selected = bool(row["selected"])
+                event.muted = bool(row["muted"])
+                event.msg[0] = (event.msg[0] & 0xF0) | (int(row["channel"]) & 0x0F)
+                write(event, row)
+            count += len(changed)
+
+        removed = [self.note_refs[i] for i in np.flatnonzero(self.removed)]
+        self.buffer.remove_notes(removed)
+        for start, end, pitch, velocity, channel in self.added:
+            self.buffer.add_note(start, max(end, start + 1), pitch, velocity, channel)
+        for ppq, number, value, channel in self.added_cc:
+            self.buffer.add_cc(ppq, number, value, channel)
+        return count + len(removed) + len(self.added) + len(self.added_cc)
+
+    @staticmethod
+    def _write_cc(event, row):
+        event.msg[1] = int(row["number"]) & 0x7F
+        event.msg[2] = min(max(int(row["value"]), 0), 127)
+
+    @staticmethod
+    def _write_pb(event, row):
+        value = min(max(int(row["value"]) + 8192, 0), 16383)
+        event.msg[1] = value & 0x7F
+        event.msg[2] = value >> 7
+
+    @staticmethod
+    def _write_pc(event, row):
+        event.msg[1] = min(max(int(row["program"]), 0), 127)
+
+
+# Examples for the Scripting tab, written against the snapshot runtime
+EXAMPLE_SCRIPTS = {
+    "Velocity Ramp": (
+        "# Ramp selected note velocities from soft to loud\n"
+        "selected_notes.velocity = utils['ramp'](len(selected_notes), 30, 120)\n"
+    ),
+    "CC LFO": (
+        "# Add a one-bar sine LFO on CC1 at 16 steps per quarter note\n"
+        "end = notes.end.max() if len(notes) else ticks_per_quarter * 16\n"
+        "positions = np.arange(0, end, ticks_per_quarter / 16)\n"
+        "add_cc(positions, 1, np.round(utils['lfo'](positions, period_quarters=4)))\n"
+    ),
+    "Arpeggiator": (
+        "# Turn each selected chord into sixteenth-note arpeggios\n"
+        "step = ticks_per_quarter / 4\n"
+        "order = np.lexsort((selected_notes.pitch, selected_notes.start))\n"
+        "starts = selected_notes.start[order]\n"
+        "rank = np.arange(len(order)) - np.searchsorted(starts, starts)\n"
+        "new_starts = starts + rank * step\n"
+        "add_notes(new_starts, new_starts + step, selected_notes.pitch[order], selected_notes.velocity[order],\n"
+        "          selected_notes.channel[order])\n"
+        "remove_notes(notes.selected)\n"
+    ),
+    "Humanize Timing": (
+        "# Nudge selected notes by up to 10 ticks and 8 velocity steps\n"
+        "shift = rng.integers(-10, 10, size=len(selected_notes), endpoint=True)\n"
+        "selected_notes.start = np.maximum(selected_notes.start + shift, 0)\n"
+        "selected_notes.end = selected_notes.end + shift\n"
+        "selected_notes.velocity = np.clip(selected_notes.velocity + rng.integers(-8, 8, size=len(selected_notes), endpoint=True), 1, 127)\n"
+    ),
+}
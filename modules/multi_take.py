@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.take_buffer import TakeBuffer
+from modules.edit_transaction import MidiEditTransaction
+from modules.transport import session
+
+
+class OperationCancelled(Exception):
+    """Raised when a multi-take run is cancelled before all takes were written."""
+
+
+class MultiTakeExecutor:
+    """Run one transform over many takes with a single read phase and pipelined writes.
+
+    All target takes are fetched up front, each take's transform runs on a
+    worker pool, and every finished take is written back while the remaining
+    ones are still being transformed. The whole run is one MidiEditTransaction,
+    so it produces one undo point and a cancelled or failed run is rolled back.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Request cancellation; the running pass stops before its next write."""
+        self.cancel_event.set()
+
+    def run(self, takes, transform, description, project=None, progress=None):
+        """Apply transform(buffer) to every take and return how many takes were processed.
+
+        progress, if given, is called as progress(done, total, take_id) after
+        each take has been written.
+        """
+        self.cancel_event.clear()
+
+        # Fetch every event buffer in one held session
+        with session():
+            buffers = [TakeBuffer.read(take) for take in takes]
+
+        total = len(buffers)
+        done = 0
+        with MidiEditTransaction(description, project) as txn:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(transform, buffer): buffer for buffer in buffers}
+                try:
+                    with session():
+                        for future in as_completed(futures):
+                            if self.cancel_event.is_set():
+                                raise OperationCancelled(f"Cancelled after {done} of {total} takes")
+                            buffer = futures[future]
+                            future.result()
+                            txn.flush(txn.stage(buffer))
+                            done += 1
+                            if progress:
+                                progress(done, total, buffer.take_id)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        return done
@@ -0,0 +1,93 @@
+import numpy as np
+
+NOTE_DTYPE = np.dtype([
+    ("start", np.float64),
+    ("end", np.float64),
+    ("pitch", np.int16),
+    ("velocity", np.int16),
+    ("channel", np.uint8),
+    ("selected", np.bool_),
+    ("muted", np.bool_),
+])
+
+
+class NoteTable:
+    """Columnar view of a take's notes backed by a NumPy structured array.
+
+    Columns are exposed as array views, so operations can be written as single
+    vectorized expressions (e.g. ``table.velocity[:] = np.clip(table.velocity * 1.2, 1, 127)``)
+    and written back to the TakeBuffer they came from with ``apply``.
+    """
+
+    def __init__(self, rows, notes=None):
+        self.rows = rows
+        self.notes = notes if notes is not None else []
+        self._original = rows.copy()
+
+    @classmethod
+    def from_notes(cls, notes):
+        rows = np.empty(len(notes), dtype=NOTE_DTYPE)
+        if notes:
+            rows["start"] = [note.start for note in notes]
+            rows["end"] = [note.end for note in notes]
+            rows["pitch"] = [note.pitch for note in notes]
+            rows["velocity"] = [note.velocity for note in notes]
+            rows["channel"] = [note.channel for note in notes]
+            rows["selected"] = [note.selected for note in notes]
+            rows["muted"] = [note.muted for note in notes]
+        return cls(rows, list(notes))
+
+    @classmethod
+    def from_buffer(cls, buffer, selected_only=False):
+        return cls.from_notes(buffer.selected_notes if selected_only else buffer.notes)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def start(self):
+        return self.rows["start"]
+
+    @property
+    def end(self):
+        return self.rows["end"]
+
+    @property
+    def pitch(self):
+        return self.rows["pitch"]
+
+    @property
+    def velocity(self):
+        return self.rows["velocity"]
+
+    @property
+    def channel(self):
+        return self.rows["channel"]
+
+    @property
+    def selected(self):
+        return self.rows["selected"]
+
+    @property
+    def muted(self):
+        return self.rows["muted"]
+
+    def changed_rows(self):
+        """Return indices of rows that differ from the state the table was built with."""
+        return np.flatnonzero(self.rows != self._original)
+
+    def apply(self):
+        """Push changed rows back into the underlying buffer notes and return how many changed."""
+        changed = self.changed_rows()
+        rows = self.rows
+        for i in changed:
+            note, row = self.notes[i], rows[i]
+            note.start = float(row["start"])
+            note.end = float(row["end"])
+            note.pitch = int(row["pitch"])
+            note.velocity = int(row["velocity"])
+            note.channel = int(row["channel"])
+            note.selected = bool(row["selected"])
+            note.muted = bool(row["muted"])
+        self._original = rows.copy()
+        return len(changed)
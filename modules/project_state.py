@@ -0,0 +1,206 @@
+from reapy import reascript_api as RPR
+from modules.transport import session, pipeline
+from modules.take_buffer import TakeBuffer
+
+# Views that follow REAPER's project state change count; the selected take is
+# followed through the active MIDI editor and its take's hash instead, since
+# opening an editor or selecting notes need not count as a project change
+PROJECT_VIEWS = ("tracks", "markers", "tempo", "selection")
+VIEWS = PROJECT_VIEWS + ("selected_take",)
+
+
+def _is_null(pointer):
+    return pointer.endswith("0x0000000000000000")
+
+
+def _track_id(pointer):
+    return "(MediaTrack*)0x{0:016X}".format(int(pointer))
+
+
+def read_tracks(project_id):
+    """[{'id', 'name', 'sends': [destination track ids]}] for every track, in order"""
+    count = RPR.CountTracks(project_id)
+    ids = pipeline([(RPR.GetTrack, (project_id, i)) for i in range(count)])
+    infos = pipeline([call for track_id in ids
+                      for call in ((RPR.GetTrackName, (track_id, "", 512)),
+                                   (RPR.GetTrackNumSends, (track_id, 0)))])
+    names, send_counts = [info[2] for info in infos[::2]], infos[1::2]
+    sends = pipeline([(RPR.GetTrackSendInfo_Value, (track_id, 0, j, "P_DESTTRACK"))
+                      for track_id, send_count in zip(ids, send_counts) for j in range(send_count)])
+    tracks = []
+    for track_id, name, send_count in zip(ids, names, send_counts):
+        tracks.append({'id': track_id, 'name': name,
+                       'sends': [_track_id(pointer) for pointer in sends[:send_count]]})
+        sends = sends[send_count:]
+    return tracks
+
+
+def read_markers(project_id):
+    """[{'index', 'position', 'name', 'number'}] of the project markers (not regions), by position"""
+    _, _, n_markers, n_regions = RPR.CountProjectMarkers(project_id, 0, 0)
+    infos = pipeline([(RPR.EnumProjectMarkers2, (project_id, i, 0, 0, 0, 0, 0))
+                      for i in range(n_markers + n_regions)])
+    markers = [{'index': index, 'position': info[4], 'name': info[6], 'number': info[7]}
+               for index, info in enumerate(infos) if not info[3]]
+    return sorted(markers, key=lambda m: m['position'])
+
+
+def _tempo_markers(project_id):
+    """GetTempoTimeSigMarker of every tempo/time signature marker, in one pipelined batch"""
+    count = RPR.CountTempoTimeSigMarkers(project_id)
+    return pipeline([(RPR.GetTempoTimeSigMarker, (project_id, i, 0, 0, 0, 0, 0, 0, False))
+                     for i in range(count)])
+
+
+def read_tempo(project_id):
+    """[(time, bpm, numerator, denominator)] of every tempo/time signature marker"""
+    return [(info[3], info[6], info[7], info[8]) for info in _tempo_markers(project_id)]
+
+
+def read_time_signatures(project_id):
+    """[(first measure, numerator, denominator)] of every time signature, from measure 0 on"""
+    with session():
+        _, _, num, denom, _ = RPR.TimeMap_GetTimeSigAtTime(project_id, 0, 0, 0, 0)
+        signatures = [(0, num, denom)]
+        for info in _tempo_markers(project_id):
+            measure, beat, marker_num, marker_denom = info[4], info[5], info[7], info[8]
+            if marker_num <= 0:
+                continue
+            # Signature changes start a measure; one set mid-measure starts the next one
+            measure += 1 if beat > 1e-9 else 0
+            signature = (measure, marker_num, marker_denom or signatures[-1][2])
+            if measure == signatures[-1][0]:
+                signatures[-1] = signature
+            else:
+                signatures.append(signature)
+    return signatures
+
+
+def read_selection(project_id):
+    """{'items': [...], 'tracks': [...]} ids of the selected items and tracks"""
+    n_items, n_tracks = pipeline([(RPR.CountSelectedMediaItems, (project_id,)),
+                                  (RPR.CountSelectedTracks, (project_id,))])
+    ids = pipeline([(RPR.GetSelectedMediaItem, (project_id, i)) for i in range(n_items)]
+                   + [(RPR.GetSelectedTrack, (project_id, i)) for i in range(n_tracks)])
+    return {'items': ids[:n_items], 'tracks': ids[n_items:]}
+
+
+READERS = {
+    "tracks": read_tracks,
+    "markers": read_markers,
+    "tempo": read_tempo,
+    "selection": read_selection,
+}
+
+
+class ProjectStateCache:
+    """Cached views of the current project, re-read only when REAPER reports a change.
+
+    poll() costs one round trip while nothing changes: REAPER's project state
+    change count and the current project. Only views that have been asked
+    for are kept up to date, and a view's version only moves when its data
+    really differs, so windows can redraw on version changes alone. The
+    selected take (the active MIDI editor's take) is keyed by its event hash
+    and is only read again when that hash changes.
+    """
+
+    def __init__(self):
+        self.project_id = None
+        self.change_count = None
+        self.take_key = None
+        self.data = {}
+        self.versions = dict.fromkeys(VIEWS, 0)
+
+    def _check_project(self):
+        """Re-read followed project views if the project changed; returns the views whose data changed"""
+        (project_id, *_), change_count = pipeline([(RPR.EnumProjects, (-1, "", 0)),
+                                                   (RPR.GetProjectStateChangeCount, (0,))])
+        if project_id == self.project_id and change_count == self.change_count:
+            return set()
+        self.project_id, self.change_count = project_id, change_count
+        changed = set()
+        for view in PROJECT_VIEWS:
+            if view in self.data:
+                changed |= self._store(view, READERS[view](project_id))
+        return changed
+
+    def _check_take(self):
+        """Re-read the selected take if the editor, the take or its notes changed"""
+        if "selected_take" not in self.data:
+            return set()
+        editor = RPR.MIDIEditor_GetActive()
+        take_id = None if _is_null(editor) else RPR.MIDIEditor_GetTake(editor)
+        if take_id is None or _is_null(take_id):
+            key = take_id = None
+        else:
+            # Full-stream hash, so CC edits and selection changes count too
+            key = (take_id, RPR.MIDI_GetHash(take_id, False, "", 64)[3])
+        if key == self.take_key:
+            return set()
+        self.take_key = key
+        return self._store("selected_take", TakeBuffer.read(take_id) if take_id else None)
+
+    def _store(self, view, value):
+        if view in self.data and self.data[view] == value:
+            return set()
+        self.data[view] = value
+        self.versions[view] += 1
+        return {view}
+
+    def poll(self):
+        """Look for changes in REAPER and return the set of views whose data changed"""
+        with session():
+            return self._check_project() | self._check_take()
+
+    def get(self, view):
+        """Cached data of a view, read now if it was not followed yet"""
+        if view not in self.data:
+            with session():
+                if view == "selected_take":
+                    self.data[view] = None
+                    self._check_take()
+                else:
+                    self._check_project()
+                    self._store(view, READERS[view](self.project_id))
+        return self.data[view]
+
+    def version(self, view):
+        return self.versions[view]
+
+    def invalidate(self, view=None):
+        """Forget cached data so the next get() or poll() reads it again"""
+        for name in VIEWS if view is None else (view,):
+            self.data.pop(name, None)
+        if view in (None, "selected_take"):
+            self.take_key = None
+        if view is None or view in PROJECT_VIEWS:
+            self.change_count = None
+
+    @property
+    def tracks(self):
+        return self.get("tracks")
+
+    @property
+    def markers(self):
+        return self.get("markers")
+
+    @property
+    def tempo(self):
+        return self.get("tempo")
+
+    @property
+    def selection(self):
+        return self.get("selection")
+
+    @property
+    def selected_take(self):
+        """TakeBuffer of the active MIDI editor's take, or None without one"""
+        return self.get("selected_take")
+
+
+_cache = ProjectStateCache()
+
+
+def get_project_state():
+    """The project state cache shared by every Yuneify window"""
+    return _cache
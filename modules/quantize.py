@@ -0,0 +1,277 @@
+import os
+import re
+import json
+import numpy as np
+from reapy import reascript_api as RPR
+from modules.take_buffer import TakeBuffer
+from modules.note_table import NoteTable
+from modules.transport import session, pipeline
+from modules.project_state import read_time_signatures
+
+GROOVES_DIR = os.path.join("config files", "grooves")
+
+# Grid values as note lengths (1/16 = sixteenth note)
+GRID_VALUES = {
+    "1/4": 1/4,
+    "1/8": 1/8,
+    "1/8T": 1/12,
+    "1/16": 1/16,
+    "1/16T": 1/24,
+    "1/32": 1/32,
+}
+
+
+class QuantizeGrid:
+    """Grid lines of a take in PPQ, each tagged with its slot index inside its measure.
+
+    Lines restart at every measure start, so odd meters and time signature
+    changes keep the grid aligned to the bar, and the slot index is what swing
+    and groove templates are keyed on.
+    """
+
+    def __init__(self, lines, slots, step):
+        self.lines = np.asarray(lines, dtype=np.float64)
+        self.slots = np.asarray(slots, dtype=np.int64)
+        self.step = float(step)
+
+    @classmethod
+    def uniform(cls, first, last, step):
+        """A plain grid from PPQ 0 that covers first..last, for callers without a project tempo map."""
+        count = int(np.ceil((last + step) / step)) + 1
+        lines = np.arange(count) * step
+        return cls(lines, np.arange(count), step)
+
+    @classmethod
+    def from_take(cls, take, grid, first, last, project=None):
+        """Build the grid for a take between two PPQ positions from the project's measures.
+
+        The time signature map is read once and the measures are laid out
+        here, so the cost doesn't grow with the length of the take.
+        """
+        take_id = take.id if hasattr(take, "id") else take
+        project_id = project.id if project is not None else 0
+        step_qn = 4 * grid
+
+        with session():
+            signatures = read_time_signatures(project_id)
+            # PPQ is linear in QN inside a take, so two lookups map every position
+            one, zero = pipeline([(RPR.MIDI_GetPPQPosFromProjQN, (take_id, 1)),
+                                  (RPR.MIDI_GetPPQPosFromProjQN, (take_id, 0))])
+        ticks_per_quarter = one - zero
+        first_qn = (first - zero) / ticks_per_quarter
+        end_qn = (last - zero) / ticks_per_quarter + step_qn
+
+        starts, ends = measures_between(signatures, first_qn, end_qn)
+        counts = np.ceil((ends - starts) / step_qn - 1e-9).astype(np.int64)
+        # Slot index inside each measure, restarting at every measure start
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        slots = np.arange(counts.sum()) - offsets
+        lines_qn = np.repeat(starts, counts) + slots * step_qn
+        return cls(zero + lines_qn * ticks_per_quarter, slots, step_qn * ticks_per_quarter)
+
+    def nearest(self, positions):
+        """Return the index of the grid line nearest to each position."""
+        positions = np.asarray(positions, dtype=np.float64)
+        right = np.clip(np.searchsorted(self.lines, positions), 1, len(self.lines) - 1)
+        left = right - 1
+        use_right = np.abs(self.lines[right] - positions) < np.abs(positions - self.lines[left])
+        return np.where(use_right, right, left)
+
+    def targets(self, swing=0.0, groove=None):
+        """Grid line positions after swing and groove offsets."""
+        lines = self.lines.copy()
+        if swing:
+            # At full swing every second line lands on the triplet position
+            lines[self.slots % 2 == 1] += swing * self.step / 3
+        if groove is not None:
+            lines += groove.offsets_for(self.slots) * self.step
+        return lines
+
+
+def measures_between(signatures, first_qn, end_qn):
+    """(starts, ends) in QN of the measures from the one holding first_qn to the last starting by end_qn.
+
+    signatures is [(first measure, numerator, denominator)] as read by
+    project_state.read_time_signatures().
+    """
+    starts, ends = [], []
+    segment_qn = 0.0
+    for index, (measure, num, denom) in enumerate(signatures):
+        length = 4.0 * num / denom
+        if index + 1 < len(signatures):
+            count = signatures[index + 1][0] - measure
+            segment_end = segment_qn + count * length
+        else:
+            count, segment_end = None, np.inf
+        if segment_end > first_qn and segment_qn <= end_qn:
+            lo = max(int(np.floor((first_qn - segment_qn) / length)), 0)
+            hi = int(np.floor((end_qn - segment_qn) / length)) + 1
+            if count is not None:
+                hi = min(hi, count)
+            measure_starts = segment_qn + np.arange(lo, hi) * length
+            starts.append(measure_starts)
+            ends.append(measure_starts + length)
+        if count is None or segment_qn > end_qn:
+            break
+        segment_qn = segment_end
+    if not starts:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(starts), np.concatenate(ends)
+
+
+class GrooveTemplate:
+    """Per-slot timing offsets (fractions of a grid step) and velocity ratios.
+
+    Slots are counted from each measure start, so a groove taken from a
+    short take applies to a longer one (and the other way round) bar by bar.
+    """
+
+    def __init__(self, grid, offsets, velocities=None):
+        self.grid = grid
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.velocities = (np.asarray(velocities, dtype=np.float64)
+                           if velocities is not None else np.ones(len(self.offsets)))
+
+    def offsets_for(self, slots):
+        return self.offsets[np.asarray(slots) % len(self.offsets)]
+
+    def velocities_for(self, slots):
+        return self.velocities[np.asarray(slots) % len(self.velocities)]
+
+    @classmethod
+    def extract(cls, quantize_grid, starts, velocities, grid):
+        """Average how far notes sit from each grid slot, and how loud they are relative to the mean."""
+        starts = np.asarray(starts, dtype=np.float64)
+        velocities = np.asarray(velocities, dtype=np.float64)
+        nearest = quantize_grid.nearest(starts)
+        slots = quantize_grid.slots[nearest]
+        slot_count = int(quantize_grid.slots.max()) + 1 if len(quantize_grid.slots) else 1
+        offsets = (starts - quantize_grid.lines[nearest]) / quantize_grid.step
+
+        hits = np.bincount(slots, minlength=slot_count)
+        offset_sum = np.bincount(slots, weights=offsets, minlength=slot_count)
+        velocity_sum = np.bincount(slots, weights=velocities, minlength=slot_count)
+        mean_velocity = velocities.mean() if len(velocities) else 1.0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slot_offsets = np.where(hits > 0, offset_sum / hits, 0.0)
+            slot_velocities = np.where(hits > 0, velocity_sum / hits / mean_velocity, 1.0)
+        return cls(grid, slot_offsets, slot_velocities)
+
+    @classmethod
+    def from_take(cls, take, grid, project=None):
+        """Extract a groove from the notes of a reference take."""
+        table = NoteTable.from_buffer(TakeBuffer.read(take))
+        if not len(table):
+            return None
+        quantize_grid = QuantizeGrid.from_take(take, grid, table.start.min(), table.start.max(), project)
+        return cls.extract(quantize_grid, table.start, table.velocity, grid)
+
+    def apply(self, table, quantize_grid, timing=1.0, velocity=1.0, window=1.0):
+        """Pull notes onto the grooved grid and blend in its accents; returns how many notes moved."""
+        return quantize_notes(table, quantize_grid, strength=timing, window=window,
+                              groove=self, groove_velocity=velocity)
+
+    def to_dict(self):
+        # Four decimals is well below a tick at any usual grid and keeps groove files small
+        return {
+            "grid": self.grid,
+            "offsets": np.round(self.offsets, 4).tolist(),
+            "velocities": np.round(self.velocities, 4).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["grid"], data["offsets"], data.get("velocities"))
+
+
+def quantize_notes(table, quantize_grid, strength=1.0, swing=0.0, window=1.0,
+                   preserve_length=True, groove=None, groove_velocity=0.0):
+    """Quantize a NoteTable in place and return how many notes moved.
+
+    strength and swing are 0..1, window is the fraction of a grid step around
+    each line that gets quantized (notes further away are left alone), and with
+    preserve_length the ends move with the starts, otherwise ends are snapped
+    to the grid too. groove_velocity blends velocities towards the groove's
+    per-slot accents.
+    """
+    if not len(table) or not len(quantize_grid.lines):
+        return 0
+
+    targets = quantize_grid.targets(swing, groove)
+    starts = table.start.copy()
+    nearest = quantize_grid.nearest(starts)
+    distance = targets[nearest] - starts
+    in_window = np.abs(starts - quantize_grid.lines[nearest]) <= window * quantize_grid.step / 2
+    shift = np.where(in_window, distance * strength, 0.0)
+
+    new_starts = starts + shift
+    if preserve_length:
+        new_ends = table.end + shift
+    else:
+        ends = table.end.copy()
+        end_shift = (targets[quantize_grid.nearest(ends)] - ends) * strength
+        new_ends = np.where(in_window, ends + end_shift, ends + shift)
+        # A note snapped to zero length keeps its original length instead
+        collapsed = new_ends <= new_starts
+        new_ends[collapsed] = new_starts[collapsed] + (table.end - starts)[collapsed]
+
+    table.start[:] = np.maximum(new_starts, 0)
+    table.end[:] = np.maximum(new_ends, table.start + 1)
+    if groove is not None and groove_velocity:
+        accents = groove.velocities_for(quantize_grid.slots[nearest])
+        scaled = table.velocity * (1 + (accents - 1) * groove_velocity)
+        table.velocity[:] = np.where(in_window, np.clip(np.round(scaled), 1, 127), table.velocity)
+    return int(np.count_nonzero(shift))
+
+
+def quantize_selected(buffer, grid=1/16, strength=1.0):
+    """Quantize a TakeBuffer's selected notes to the project grid; returns how many notes moved."""
+    table = NoteTable.from_buffer(buffer, selected_only=True)
+    if not len(table):
+        return 0
+    quantize_grid = QuantizeGrid.from_take(buffer.take_id, grid, table.start.min(), table.end.max())
+    moved = quantize_notes(table, quantize_grid, strength)
+    table.apply()
+    return moved
+
+
+def _groove_path(name):
+    return os.path.join(GROOVES_DIR, re.sub(r"[^\w\- ]", "_", name).strip() + ".json")
+
+
+def list_grooves():
+    """Names of the grooves saved in the library"""
+    try:
+        files = os.listdir(GROOVES_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.splitext(file)[0] for file in files if file.endswith(".json"))
+
+
+def load_groove(name):
+    """Load a groove from the library, or None if it is missing or unreadable"""
+    path = _groove_path(name)
+    try:
+        with open(path, "r") as f:
+            return GrooveTemplate.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        print(f"Invalid {path}: {e}")
+        return None
+
+
+def save_groove(name, groove):
+    """Save a groove to the library, replacing any groove with the same name"""
+    os.makedirs(GROOVES_DIR, exist_ok=True)
+    with open(_groove_path(name), "w") as f:
+        json.dump(groove.to_dict(), f, separators=(",", ":"))
+
+
+def delete_groove(name):
+    """Remove a groove from the library; returns False if there was none"""
+    try:
+        os.remove(_groove_path(name))
+    except FileNotFoundError:
+        return False
+    return True
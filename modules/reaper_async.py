@@ -0,0 +1,259 @@
+import time
+import asyncio
+import itertools
+import functools
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QHBoxLayout
+from reapy import reascript_api as RPR
+from modules.transport import session
+from modules.take_buffer import TakeBuffer
+from modules.edit_transaction import MidiEditTransaction
+from modules.project_state import read_tracks, read_selection
+
+# Workers for blocking work that doesn't touch REAPER (AI requests, file I/O),
+# so a slow model reply doesn't hold up the REAPER I/O thread
+BLOCKING_WORKERS = 2
+
+
+class Operation:
+    """One job scheduled on the REAPER I/O thread, cancellable until it finishes.
+
+    Cancelling takes effect at the job's next await; a REAPER call already
+    in flight completes first. Jobs built from edit_take() write nothing
+    when cancelled before their write starts.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, description, done=None, failed=None, quiet=False):
+        self.id = next(self._ids)
+        self.description = description
+        self.done = done
+        self.failed = failed
+        # Quiet jobs (the watcher's samples) are left out of the in-flight list
+        self.quiet = quiet
+        self.started = time.monotonic()
+        self.state = "pending"
+        self.future = None
+        self.result = None
+        self.error = None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        """Request cancellation; returns False when the job already finished"""
+        if self.finished or self.future is None:
+            return False
+        self.future.cancel()
+        return True
+
+    def __repr__(self):
+        return f"<Operation {self.id} {self.description!r} {self.state}>"
+
+
+class ReaperIO(QObject):
+    """An asyncio loop on a dedicated thread that owns the slow REAPER work.
+
+    Qt handlers read their widgets, submit() a coroutine built from the
+    helpers below and return straight away; the coroutine runs on the I/O
+    thread and done(result) or failed(error) is called back on the Qt
+    thread. In-flight jobs are listed in operations and announced through
+    operations_changed, and each can be cancelled.
+    """
+    # Emitted on the I/O thread, delivered on the Qt thread
+    _finished = Signal(object)
+    operations_changed = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.operations = []
+        self.blocking = ThreadPoolExecutor(BLOCKING_WORKERS, thread_name_prefix="yuneify-blocking")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="yuneify-reaper-io", daemon=True)
+        self.thread.start()
+        self._finished.connect(self._finish)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine, description, done=None, failed=None, quiet=False):
+        """Schedule a coroutine on the I/O thread and return its Operation"""
+        operation = Operation(description, done, failed, quiet)
+        operation.future = asyncio.run_coroutine_threadsafe(self._track(operation, coroutine), self.loop)
+        operation.future.add_done_callback(lambda future: self._finished.emit(operation))
+        if not quiet:
+            self.operations.append(operation)
+            self.operations_changed.emit()
+        return operation
+
+    def run(self, func, *args, description, done=None, failed=None, quiet=False):
+        """Schedule a blocking REAPER function (as with call()) and return its Operation"""
+        return self.submit(call(func, *args), description, done, failed, quiet)
+
+    @staticmethod
+    async def _track(operation, coroutine):
+        operation.state = "running"
+        return await coroutine
+
+    def _finish(self, operation):
+        try:
+            operation.result = operation.future.result()
+            operation.state = "done"
+        except CancelledError:
+            operation.state = "cancelled"
+        except Exception as e:
+            operation.error = e
+            operation.state = "failed"
+        if operation in self.operations:
+            self.operations.remove(operation)
+            self.operations_changed.emit()
+
+        if operation.state == "done" and operation.done is not None:
+            operation.done(operation.result)
+        elif operation.state == "failed":
+            if operation.failed is not None:
+                operation.failed(operation.error)
+            else:
+                print(f"{operation.description} error: {operation.error}")
+
+    def cancel_all(self):
+        for operation in list(self.operations):
+            operation.cancel()
+
+    def close(self):
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(1)
+        self.blocking.shutdown(wait=False)
+
+
+_io = None
+
+
+def get_reaper_io():
+    """The REAPER I/O thread shared by every window in this process (create it on the Qt thread)"""
+    global _io
+    if _io is None:
+        _io = ReaperIO()
+    return _io
+
+
+# Awaitable REAPER operations, for coroutines running on the I/O thread
+
+async def call(func, *args):
+    """Run a blocking REAPER function in a held session; a cancelled job stops before it"""
+    await asyncio.sleep(0)
+    with session():
+        return func(*args)
+
+
+async def offload(func, *args, **kwargs):
+    """Run blocking work that doesn't touch REAPER (AI requests) off the I/O thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_reaper_io().blocking, functools.partial(func, *args, **kwargs))
+
+
+def _editor_take():
+    editor = RPR.MIDIEditor_GetActive()
+    if editor.endswith("0x0000000000000000"):
+        return None
+    take_id = RPR.MIDIEditor_GetTake(editor)
+    return None if take_id.endswith("0x0000000000000000") else take_id
+
+
+async def active_take():
+    """Take id of the active MIDI editor, or None"""
+    return await call(_editor_take)
+
+
+async def read_take(take):
+    """TakeBuffer of a take, read in one call"""
+    return await call(TakeBuffer.read, take)
+
+
+def _commit(buffer, description):
+    with MidiEditTransaction(description) as txn:
+        txn.stage(buffer)
+
+
+async def write_take(buffer, description):
+    """Write a buffer's changes back as one undo point"""
+    await call(_commit, buffer, description)
+
+
+async def edit_take(take, description, edit):
+    """Read a take, run edit(buffer) and write the changes back as one undo point.
+
+    Returns edit's result. Cancelling before the write leaves the take untouched.
+    """
+    buffer = await read_take(take)
+    result = await call(edit, buffer)
+    await write_take(buffer, description)
+    return result
+
+
+async def edit_active_take(description, edit):
+    """edit_take() on the active MIDI editor's take; None without an editor"""
+    take = await active_take()
+    if take is None:
+        return None
+    return await edit_take(take, description, edit)
+
+
+async def tracks(project_id=0):
+    """[{'id', 'name', 'sends'}] of every track, as read by the project state cache"""
+    return await call(read_tracks, project_id)
+
+
+async def selected_tracks(project_id=0):
+    """Ids of the selected tracks"""
+    return (await call(read_selection, project_id))['tracks']
+
+
+@contextlib.asynccontextmanager
+async def undo_block(description, project_id=0):
+    """One REAPER undo point around the awaited calls in the block"""
+    await call(RPR.Undo_BeginBlock2, project_id)
+    try:
+        yield
+    finally:
+        # Not awaited, so a cancelled block still closes its undo point
+        with session():
+            RPR.Undo_EndBlock2(project_id, description, -1)
+
+
+class OperationsBar(QWidget):
+    """Shows the oldest in-flight REAPER job of the shared I/O thread with a Cancel button."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.io = get_reaper_io()
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel()
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        layout.addWidget(self.label, 1)
+        layout.addWidget(self.cancel_button)
+        self.io.operations_changed.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        operations = self.io.operations
+        self.setVisible(bool(operations))
+        if operations:
+            more = f" (+{len(operations) - 1} more)" if len(operations) > 1 else ""
+            self.label.setText(f"{operations[0].description}...{more}")
+
+    def cancel(self):
+        if self.io.operations:
+            self.io.operations[0].cancel()
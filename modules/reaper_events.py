@@ -0,0 +1,215 @@
+import time
+import traceback
+from PySide6.QtCore import QObject, QTimer, Signal
+from reapy import reascript_api as RPR
+from modules.transport import session
+from modules.project_state import get_project_state
+from modules.reaper_async import get_reaper_io
+
+# Seconds between samples: FAST_INTERVAL right after a change or user input,
+# growing by BACKOFF per quiet tick up to IDLE_INTERVAL
+FAST_INTERVAL = 0.1
+IDLE_INTERVAL = 2.0
+BACKOFF = 1.5
+
+
+class ReaperEvent:
+    """Something that changed in REAPER; subclasses name the project state view they follow."""
+    name = "reaper-event"
+    view = None
+
+    def __init__(self, **data):
+        self.time = time.time()
+        self.__dict__.update(data)
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.__dict__.items() if key != "time")
+        return f"{self.name}({fields})"
+
+
+class SelectionChanged(ReaperEvent):
+    """selection: {'items': [...], 'tracks': [...]} ids of the selected items and tracks"""
+    name = "selection-changed"
+    view = "selection"
+
+
+class TakeEdited(ReaperEvent):
+    """take: TakeBuffer of the active MIDI editor's take, or None when no editor is open"""
+    name = "take-edited"
+    view = "selected_take"
+
+
+class MarkersChanged(ReaperEvent):
+    """markers: the project markers, sorted by position"""
+    name = "markers-changed"
+    view = "markers"
+
+
+class TrackCountChanged(ReaperEvent):
+    """count: number of tracks in the project"""
+    name = "track-count-changed"
+    view = "tracks"
+
+
+class FxWindowFocus(ReaperEvent):
+    """track_number (1-based, 0 = master), item_number and fx_number of the focused FX, or None for each"""
+    name = "fx-window-focus"
+
+
+class ReaperWatcher(QObject):
+    """Samples REAPER once per tick and publishes ReaperEvents to subscribers.
+
+    Every window subscribes here instead of running its own timer. A tick
+    is one ProjectStateCache.poll() (plus GetFocusedFX while anyone wants
+    focus events), and only the views that subscribers need are followed.
+    The interval drops to FAST_INTERVAL after a change or poke() and backs
+    off to IDLE_INTERVAL while nothing happens.
+
+    Samples run on the shared REAPER I/O thread, so a tick never waits on a
+    long edit; events are published on the Qt thread.
+    """
+    # Emitted from any thread (e.g. input listeners) to poke() on the Qt thread
+    poke_requested = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.poke_requested.connect(self.poke)
+        self.state = get_project_state()
+        self.subscribers = {}
+        self.interval = FAST_INTERVAL
+        self.sampling = None
+        # None until the first sample after subscribing sets the baseline
+        self.focused_fx = None
+        self.track_count = None
+        # View versions already published; windows that poll the shared cache
+        # themselves may have consumed a change before the watcher's tick
+        self.versions = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+
+    def subscribe(self, event_type, callback):
+        """Call callback(event) for every event_type (or subclass) event; starts the watcher"""
+        if event_type is FxWindowFocus and FxWindowFocus not in self.subscribers:
+            self.focused_fx = None
+        self.subscribers.setdefault(event_type, []).append(callback)
+        if event_type.view is not None and event_type.view not in self.versions:
+            # Followed from the next sample on, so the first event is a real change
+            self.versions[event_type.view] = None
+            if event_type.view == "tracks":
+                self.track_count = None
+        self.poke()
+
+    def unsubscribe(self, event_type, callback):
+        callbacks = self.subscribers.get(event_type, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.subscribers.pop(event_type, None)
+        for view in list(self.versions):
+            if not any(subscribed.view == view for subscribed in self.subscribers):
+                del self.versions[view]
+        if not self.active:
+            self.timer.stop()
+
+    @property
+    def active(self):
+        """Whether any subscriber needs REAPER sampled; catch-all subscribers alone don't"""
+        return bool(self.versions) or FxWindowFocus in self.subscribers
+
+    def poke(self):
+        """Note user activity: sample at the fast rate again"""
+        self.interval = FAST_INTERVAL
+        if self.sampling is not None:
+            return
+        if self.active and (not self.timer.isActive() or self.timer.remainingTime() > FAST_INTERVAL * 1000):
+            self.timer.start(int(FAST_INTERVAL * 1000))
+
+    def publish(self, event):
+        for event_type, callbacks in list(self.subscribers.items()):
+            if isinstance(event, event_type):
+                for callback in list(callbacks):
+                    try:
+                        callback(event)
+                    except Exception:
+                        print(f"Error handling {event.name}:\n{traceback.format_exc()}")
+
+    @staticmethod
+    def _focused_fx():
+        kind, track_number, item_number, fx_number = RPR.GetFocusedFX(0, 0, 0)
+        return (track_number, item_number, fx_number) if kind else (None, None, None)
+
+    def sample(self, views, want_focus):
+        """Read REAPER for one tick (on the I/O thread); returns ({view: (version, data)}, focused FX).
+
+        Only reads: the watcher's own bookkeeping is left to _sampled() on the
+        Qt thread. The focused FX is None when want_focus is false.
+        """
+        with session():
+            for view in views:
+                # Followed from here on; a view read for the first time just sets the baseline
+                self.state.get(view)
+            self.state.poll()
+            focused_fx = self._focused_fx() if want_focus else None
+            return {view: (self.state.version(view), self.state.get(view)) for view in views}, focused_fx
+
+    def tick(self):
+        if not self.active or self.sampling is not None:
+            return
+        self.sampling = get_reaper_io().run(self.sample, list(self.versions), FxWindowFocus in self.subscribers,
+                                            description="Watch REAPER", quiet=True,
+                                            done=self._sampled, failed=self._sample_failed)
+
+    def _events(self, samples, focused_fx):
+        """Events of one sample, skipping views and focus nobody follows any more"""
+        events = []
+        changed = {}
+        for view, (version, data) in samples.items():
+            if view not in self.versions:
+                # Unsubscribed while the sample was running
+                continue
+            previous, self.versions[view] = self.versions[view], version
+            if previous is not None and previous != version:
+                changed[view] = data
+        if "selection" in changed:
+            events.append(SelectionChanged(selection=changed["selection"]))
+        if "selected_take" in changed:
+            events.append(TakeEdited(take=changed["selected_take"]))
+        if "markers" in changed:
+            events.append(MarkersChanged(markers=changed["markers"]))
+        if "tracks" in samples and "tracks" in self.versions:
+            count = len(samples["tracks"][1])
+            if count != self.track_count and self.track_count is not None:
+                events.append(TrackCountChanged(count=count))
+            self.track_count = count
+        if focused_fx is not None and FxWindowFocus in self.subscribers and focused_fx != self.focused_fx:
+            if self.focused_fx is not None:
+                track_number, item_number, fx_number = focused_fx
+                events.append(FxWindowFocus(track_number=track_number, item_number=item_number,
+                                            fx_number=fx_number))
+            self.focused_fx = focused_fx
+        return events
+
+    def _sampled(self, result):
+        self.sampling = None
+        events = self._events(*result)
+        for event in events:
+            self.publish(event)
+        self.interval = FAST_INTERVAL if events else min(self.interval * BACKOFF, IDLE_INTERVAL)
+        if self.active:
+            self.timer.start(int(self.interval * 1000))
+
+    def _sample_failed(self, error):
+        print(f"REAPER watcher error: {error}")
+        self._sampled(({}, None))
+
+
+_watcher = None
+
+
+def get_watcher():
+    """The REAPER watcher shared by every window in this process (needs a QApplication)"""
+    global _watcher
+    if _watcher is None:
+        _watcher = ReaperWatcher()
+    return _watcher
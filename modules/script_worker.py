@@ -0,0 +1,161 @@
+import time
+import multiprocessing
+from modules.midi_script import ScriptSnapshot, compile_script
+
+try:
+    import resource
+except ImportError:
+    # Windows has no rlimits, so the wall-clock timeout is the only limit there
+    resource = None
+
+DEFAULT_CPU_SECONDS = 10
+DEFAULT_MEMORY_MB = 2048
+DEFAULT_WALL_SECONDS = 30
+
+
+class ScriptWorker:
+    """A pre-started worker process that runs MIDI scripts on snapshot arrays.
+
+    Scripts run under CPU-time and memory limits (POSIX rlimits) plus a
+    wall-clock timeout enforced from this side. A worker that dies, times
+    out or is cancelled is replaced right away, so the next script finds a
+    warm process waiting.
+    """
+
+    def __init__(self, cpu_seconds=DEFAULT_CPU_SECONDS, memory_mb=DEFAULT_MEMORY_MB,
+                 wall_seconds=DEFAULT_WALL_SECONDS):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.process = None
+        self.conn = None
+        self.started = None
+        self._start()
+
+    def _start(self):
+        # spawn keeps the worker free of the UI process's Qt state
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.started = None
+
+    def _restart(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+        self.conn.close()
+        self._start()
+
+    @property
+    def busy(self):
+        return self.started is not None
+
+    def submit(self, source, arrays, ticks_per_quarter):
+        """Send a script and its snapshot arrays to the worker without waiting."""
+        if self.busy:
+            raise RuntimeError("A script is already running")
+        if not self.process.is_alive():
+            self._restart()
+        self.conn.send((source, arrays, ticks_per_quarter, self.cpu_seconds, self.memory_mb * 1024 * 1024))
+        self.started = time.monotonic()
+
+    def poll(self):
+        """Return None while the script runs, else ("ok", edits) or ("error", message)."""
+        if not self.busy:
+            return None
+        try:
+            if self.conn.poll():
+                result = self.conn.recv()
+                self.started = None
+                return result
+        except (EOFError, OSError):
+            pass
+        else:
+            if self.process.is_alive():
+                if time.monotonic() - self.started > self.wall_seconds:
+                    self._restart()
+                    return "error", f"Script timed out after {self.wall_seconds} s"
+                return None
+
+        self._restart()
+        return "error", "Script worker stopped, the script exceeded its CPU or memory limit"
+
+    def wait(self, interval=0.01):
+        """Block until the running script finishes and return its result."""
+        while True:
+            result = self.poll()
+            if result is not None:
+                return result
+            time.sleep(interval)
+
+    def cancel(self):
+        """Kill the running script and start a fresh worker."""
+        if self.busy:
+            self._restart()
+
+    def close(self):
+        if self.process is not None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+
+
+_shared_worker = None
+
+
+def get_worker():
+    """The process-wide script worker, started on first use."""
+    global _shared_worker
+    if _shared_worker is None:
+        _shared_worker = ScriptWorker()
+    return _shared_worker
+
+
+def _apply_limits(cpu_seconds, memory_bytes):
+    if resource is None:
+        return
+    if cpu_seconds:
+        # RLIMIT_CPU counts the whole process lifetime, so extend it from current usage
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+        hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    if memory_bytes:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        if hard != resource.RLIM_INFINITY:
+            memory_bytes = min(memory_bytes, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def _worker_main(conn):
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        source, arrays, ticks_per_quarter, cpu_seconds, memory_bytes = job
+        _apply_limits(cpu_seconds, memory_bytes)
+        try:
+            snapshot = ScriptSnapshot.from_arrays(arrays, ticks_per_quarter)
+            namespace = snapshot.namespace()
+            exec(compile_script(source), {"__builtins__": __builtins__}, namespace)
+            conn.send(("ok", snapshot.edits()))
+        except MemoryError:
+            conn.send(("error", "Script exceeded the memory limit"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
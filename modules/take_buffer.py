@@ -0,0 +1,478 @@
+import struct
+from reapy import reascript_api as RPR
+from modules.transport import pipeline
+
+# Upper bound for the packed event stream returned by MIDI_GetAllEvts
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Upper bound for one text or sysex event read with MIDI_GetTextSysexEvt
+MAX_TEXT_SIZE = 4096
+
+# Per-event flag bits in the packed stream
+FLAG_SELECTED = 0x01
+FLAG_MUTED = 0x02
+
+# Channel message status nibbles
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+POLY_AFTERTOUCH = 0xA0
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+CHANNEL_PRESSURE = 0xD0
+PITCH_BEND = 0xE0
+
+# Everything REAPER addresses through MIDI_GetCC / MIDI_SetCC
+CC_FAMILY = (POLY_AFTERTOUCH, CONTROL_CHANGE, PROGRAM_CHANGE, CHANNEL_PRESSURE, PITCH_BEND)
+
+# Above this many changed events a single bulk write beats per-event setters
+SPARSE_WRITE_LIMIT = 64
+
+_HEADER = struct.Struct("<iBi")
+_UNSET = object()
+
+# Whether the ReaScript binding carries packed event streams intact; None
+# until a take with events has been read both ways and compared
+_bulk_transfer = None
+
+
+class MidiEvent:
+    """A single decoded event of a take's packed MIDI stream."""
+    __slots__ = ("ppq", "flags", "msg")
+
+    def __init__(self, ppq, flags, msg):
+        self.ppq = ppq
+        self.flags = flags
+        self.msg = bytearray(msg)
+
+    @property
+    def status(self):
+        return self.msg[0] & 0xF0 if self.msg else 0
+
+    @property
+    def channel(self):
+        return self.msg[0] & 0x0F if self.msg else 0
+
+    @property
+    def selected(self):
+        return bool(self.flags & FLAG_SELECTED)
+
+    @selected.setter
+    def selected(self, value):
+        self.flags = (self.flags | FLAG_SELECTED) if value else (self.flags & ~FLAG_SELECTED)
+
+    @property
+    def muted(self):
+        return bool(self.flags & FLAG_MUTED)
+
+    @muted.setter
+    def muted(self, value):
+        self.flags = (self.flags | FLAG_MUTED) if value else (self.flags & ~FLAG_MUTED)
+
+    @property
+    def is_note_on(self):
+        return len(self.msg) == 3 and self.status == NOTE_ON and self.msg[2] > 0
+
+    @property
+    def is_note_off(self):
+        return len(self.msg) == 3 and (
+            self.status == NOTE_OFF or (self.status == NOTE_ON and self.msg[2] == 0)
+        )
+
+    @property
+    def is_cc_family(self):
+        return 2 <= len(self.msg) <= 3 and self.msg[0] < 0xF0 and self.status in CC_FAMILY
+
+
+class BufferNote:
+    """A note made of a paired note-on / note-off event inside a TakeBuffer."""
+    __slots__ = ("on", "off")
+
+    def __init__(self, on, off):
+        self.on = on
+        self.off = off
+
+    @property
+    def start(self):
+        return self.on.ppq
+
+    @start.setter
+    def start(self, ppq):
+        self.on.ppq = ppq
+
+    @property
+    def end(self):
+        return self.off.ppq
+
+    @end.setter
+    def end(self, ppq):
+        self.off.ppq = ppq
+
+    @property
+    def pitch(self):
+        return self.on.msg[1]
+
+    @pitch.setter
+    def pitch(self, pitch):
+        pitch = min(max(int(pitch), 0), 127)
+        self.on.msg[1] = pitch
+        self.off.msg[1] = pitch
+
+    @property
+    def velocity(self):
+        return self.on.msg[2]
+
+    @velocity.setter
+    def velocity(self, velocity):
+        # A zero velocity note-on would turn into a note-off
+        self.on.msg[2] = min(max(int(velocity), 1), 127)
+
+    @property
+    def channel(self):
+        return self.on.channel
+
+    @channel.setter
+    def channel(self, channel):
+        channel = int(channel) & 0x0F
+        self.on.msg[0] = NOTE_ON | channel
+        self.off.msg[0] = (self.off.msg[0] & 0xF0) | channel
+
+    @property
+    def selected(self):
+        return self.on.selected
+
+    @selected.setter
+    def selected(self, value):
+        self.on.selected = value
+        self.off.selected = value
+
+    @property
+    def muted(self):
+        return self.on.muted
+
+    @muted.setter
+    def muted(self, value):
+        self.on.muted = value
+        self.off.muted = value
+
+
+def decode_events(data):
+    """Decode a packed MIDI_GetAllEvts stream into events with absolute PPQ positions."""
+    events = []
+    ppq = 0
+    pos = 0
+    size = len(data)
+    header_size = _HEADER.size
+    while pos + header_size <= size:
+        offset, flags, length = _HEADER.unpack_from(data, pos)
+        pos += header_size
+        ppq += offset
+        events.append(MidiEvent(ppq, flags, data[pos:pos + length]))
+        pos += length
+    return events
+
+
+def _sort_key(event):
+    # Note-offs go first at equal positions so back-to-back notes stay intact
+    return (event.ppq, 0 if event.is_note_off else 1)
+
+
+def encode_events(events):
+    """Encode events back into a packed MIDI_SetAllEvts stream, sorted by position."""
+    chunks = []
+    last_ppq = 0
+    for event in sorted(events, key=_sort_key):
+        ppq = int(round(event.ppq))
+        chunks.append(_HEADER.pack(ppq - last_ppq, event.flags & 0xFF, len(event.msg)))
+        chunks.append(bytes(event.msg))
+        last_ppq = ppq
+    return b"".join(chunks)
+
+
+def pair_notes(events):
+    """Pair note-on and note-off events, returning notes in note-on order."""
+    notes = []
+    open_notes = {}
+    for event in events:
+        if event.is_note_on:
+            note = BufferNote(event, None)
+            notes.append(note)
+            open_notes.setdefault((event.channel, event.msg[1]), []).append(note)
+        elif event.is_note_off:
+            pending = open_notes.get((event.channel, event.msg[1]))
+            if pending:
+                pending.pop(0).off = event
+    # Drop hanging note-ons that were never closed
+    return [note for note in notes if note.off is not None]
+
+
+class TakeBuffer:
+    """Local copy of a take's whole event stream, read and written in one call each."""
+
+    def __init__(self, take_id, events, snapshot=None):
+        self.take_id = take_id
+        self.events = events
+        # Packed stream as it was read, used to roll the take back
+        self.snapshot = snapshot
+        self._notes = None
+        self._mark_baseline()
+
+    def _mark_baseline(self):
+        # Event state as last synced with REAPER, in REAPER's own event order
+        self._baseline = [(event, event.ppq, event.flags, bytes(event.msg)) for event in self.events]
+
+    @classmethod
+    def read(cls, take):
+        """Fetch the take's packed event stream with a single MIDI_GetAllEvts call.
+
+        REAPER's Python binding passes the buffer as a C string, which can
+        cut the stream at its first NUL byte or re-encode bytes above 0x7F.
+        Until a take with events has come through intact, each read is
+        checked against MIDI_CountEvts; if it did not survive, this and every
+        later read and write go through the per-event API instead.
+        """
+        global _bulk_transfer
+        take_id = take.id if hasattr(take, "id") else take
+        if _bulk_transfer is False:
+            events = read_events_per_event(take_id)
+            return cls(take_id, events, encode_events(events))
+
+        if _bulk_transfer:
+            (_, _, data, _), = pipeline([(RPR.MIDI_GetAllEvts, (take_id, "", MAX_BUFFER_SIZE))])
+        else:
+            (_, _, data, _), counts = pipeline([(RPR.MIDI_GetAllEvts, (take_id, "", MAX_BUFFER_SIZE)),
+                                                (RPR.MIDI_CountEvts, (take_id, 0, 0, 0))])
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        events = decode_events(data)
+        if not _bulk_transfer:
+            _, _, note_count, cc_count, _ = counts
+            notes = len(pair_notes(events))
+            ccs = sum(1 for event in events if event.is_cc_family)
+            # The stream may hold an end-of-source CC that MIDI_CountEvts leaves out
+            if notes != note_count or ccs < cc_count:
+                print("MIDI_GetAllEvts stream was not carried intact, using per-event MIDI calls.")
+                _bulk_transfer = False
+                return cls.read(take_id)
+            if note_count or cc_count:
+                _bulk_transfer = True
+        return cls(take_id, events, data)
+
+    @property
+    def notes(self):
+        if self._notes is None:
+            self._notes = pair_notes(self.events)
+        return self._notes
+
+    @property
+    def length(self):
+        """PPQ position of the last event, normally the end-of-source marker."""
+        return max((event.ppq for event in self.events), default=0)
+
+    @property
+    def selected_notes(self):
+        return [note for note in self.notes if note.selected]
+
+    @property
+    def cc_events(self):
+        return [event for event in self.events if event.is_cc_family]
+
+    def add_note(self, start, end, pitch, velocity, channel=0, selected=False, muted=False):
+        """Append a note to the local buffer."""
+        flags = (FLAG_SELECTED if selected else 0) | (FLAG_MUTED if muted else 0)
+        channel = int(channel) & 0x0F
+        pitch = min(max(int(pitch), 0), 127)
+        on = MidiEvent(start, flags, (NOTE_ON | channel, pitch, min(max(int(velocity), 1), 127)))
+        off = MidiEvent(end, flags, (NOTE_OFF | channel, pitch, 0))
+        # Pair existing notes before the new events join the stream
+        notes = self.notes
+        self.events.extend((on, off))
+        note = BufferNote(on, off)
+        notes.append(note)
+        return note
+
+    def add_cc(self, ppq, number, value, channel=0, selected=False, muted=False):
+        """Append a control change event to the local buffer."""
+        flags = (FLAG_SELECTED if selected else 0) | (FLAG_MUTED if muted else 0)
+        event = MidiEvent(ppq, flags, (CONTROL_CHANGE | (int(channel) & 0x0F), int(number) & 0x7F,
+                                       min(max(int(value), 0), 127)))
+        self.events.append(event)
+        return event
+
+    def remove_events(self, events):
+        """Remove non-note events from the local buffer in a single pass."""
+        removed = {id(event) for event in events}
+        if removed:
+            self.events = [event for event in self.events if id(event) not in removed]
+
+    def remove_note(self, note):
+        """Remove a note from the local buffer."""
+        self.events = [event for event in self.events if event is not note.on and event is not note.off]
+        self.notes.remove(note)
+
+    def remove_notes(self, notes):
+        """Remove many notes from the local buffer in a single pass."""
+        removed = {id(event) for note in notes for event in (note.on, note.off)}
+        if not removed:
+            return
+        self.events = [event for event in self.events if id(event) not in removed]
+        self._notes = [note for note in self.notes if id(note.on) not in removed]
+
+    def replace_events(self, events):
+        """Swap in a new event list, dropping the cached note pairing."""
+        self.events = events
+        self._notes = None
+
+    def encode(self):
+        return encode_events(self.events)
+
+    def diff(self):
+        """Return events changed since the last sync, or None when events were added or removed."""
+        if len(self.events) != len(self._baseline):
+            return None
+        baseline_ids = {id(event) for event, _, _, _ in self._baseline}
+        if any(id(event) not in baseline_ids for event in self.events):
+            return None
+        return [
+            event for event, ppq, flags, msg in self._baseline
+            if event.ppq != ppq or event.flags != flags or event.msg != msg
+        ]
+
+    def _sparse_calls(self, changes):
+        """Translate changed events into index-addressed setter calls, or None if some cannot be."""
+        changed_ids = {id(event) for event in changes}
+        note_index = {}
+        cc_index = {}
+        note_count = cc_count = 0
+        for event, _, _, _ in self._baseline:
+            if event.is_note_on:
+                note_index[id(event)] = note_count
+                note_count += 1
+            elif event.is_cc_family:
+                if id(event) in changed_ids:
+                    cc_index[id(event)] = cc_count
+                cc_count += 1
+
+        calls = []
+        handled = set()
+        for note in self.notes:
+            if id(note.on) in changed_ids or id(note.off) in changed_ids:
+                if id(note.on) not in note_index:
+                    return None
+                calls.append((RPR.MIDI_SetNote, (
+                    self.take_id, note_index[id(note.on)], note.selected, note.muted,
+                    note.start, note.end, note.channel, note.pitch, note.velocity, True
+                )))
+                handled.update((id(note.on), id(note.off)))
+        for event in changes:
+            if id(event) in handled:
+                continue
+            if id(event) not in cc_index:
+                return None
+            msg = event.msg
+            calls.append((RPR.MIDI_SetCC, (
+                self.take_id, cc_index[id(event)], event.selected, event.muted,
+                event.ppq, event.status, event.channel, msg[1], msg[2] if len(msg) > 2 else 0, True
+            )))
+        return calls
+
+    def write(self, changes=_UNSET):
+        """Send changes back to REAPER and return how many events changed.
+
+        Nothing is sent when the buffer is unchanged; a few in-place edits go out
+        as MIDI_SetNote / MIDI_SetCC calls with noSort=True, anything larger or
+        structural as one MIDI_SetAllEvts call.
+        """
+        if changes is _UNSET:
+            changes = self.diff()
+        if changes is not None and not changes:
+            return 0
+
+        calls = self._sparse_calls(changes) if changes is not None and len(changes) <= SPARSE_WRITE_LIMIT else None
+        if calls is None:
+            write_events(self.take_id, self.encode())
+        else:
+            pipeline(calls)
+
+        # Mirror the order REAPER holds the events in once they are sorted
+        self.events.sort(key=_sort_key)
+        self._mark_baseline()
+        return len(changes) if changes is not None else len(self.events)
+
+    def restore(self):
+        """Write the stream captured at read time back to the take."""
+        if self.snapshot is not None:
+            write_events(self.take_id, self.snapshot)
+
+
+def get_ticks_per_quarter(take):
+    """Return the take's PPQ resolution (ticks per quarter note)."""
+    take_id = take.id if hasattr(take, "id") else take
+    one, zero = pipeline([(RPR.MIDI_GetPPQPosFromProjQN, (take_id, 1)),
+                          (RPR.MIDI_GetPPQPosFromProjQN, (take_id, 0))])
+    return one - zero
+
+
+def write_events(take_id, data):
+    """Replace a take's whole event stream with a packed buffer."""
+    if _bulk_transfer is False:
+        write_events_per_event(take_id, decode_events(data))
+        return
+    RPR.MIDI_SetAllEvts(take_id, data.decode("latin-1"), len(data))
+
+
+def read_events_per_event(take_id):
+    """Read a take's events with MIDI_GetNote / MIDI_GetCC / MIDI_GetTextSysexEvt, sorted by position."""
+    _, _, note_count, cc_count, text_count = RPR.MIDI_CountEvts(take_id, 0, 0, 0)
+    results = pipeline(
+        [(RPR.MIDI_GetNote, (take_id, i, 0, 0, 0, 0, 0, 0, 0)) for i in range(note_count)]
+        + [(RPR.MIDI_GetCC, (take_id, i, 0, 0, 0, 0, 0, 0, 0)) for i in range(cc_count)]
+        + [(RPR.MIDI_GetTextSysexEvt, (take_id, i, 0, 0, 0, 0, "", MAX_TEXT_SIZE)) for i in range(text_count)]
+    )
+    events = []
+    for _, _, _, selected, muted, start, end, channel, pitch, velocity in results[:note_count]:
+        flags = (FLAG_SELECTED if selected else 0) | (FLAG_MUTED if muted else 0)
+        events.append(MidiEvent(start, flags, (NOTE_ON | channel, pitch, velocity)))
+        events.append(MidiEvent(end, flags, (NOTE_OFF | channel, pitch, 0)))
+    for _, _, _, selected, muted, ppq, status, channel, msg2, msg3 in results[note_count:note_count + cc_count]:
+        flags = (FLAG_SELECTED if selected else 0) | (FLAG_MUTED if muted else 0)
+        msg = (status | channel, msg2) if status in (PROGRAM_CHANGE, CHANNEL_PRESSURE) else (status | channel, msg2, msg3)
+        events.append(MidiEvent(ppq, flags, msg))
+    for _, _, _, selected, muted, ppq, kind, text, _ in results[note_count + cc_count:]:
+        flags = (FLAG_SELECTED if selected else 0) | (FLAG_MUTED if muted else 0)
+        body = text.encode("latin-1") if isinstance(text, str) else bytes(text)
+        # Sysex comes without its F0..F7 framing, text events as meta events
+        msg = b"\xf0" + body + b"\xf7" if kind == -1 else bytes((0xFF, kind)) + body
+        events.append(MidiEvent(ppq, flags, msg))
+    events.sort(key=_sort_key)
+    return events
+
+
+def write_events_per_event(take_id, events):
+    """Replace a take's events with MIDI_Delete* / MIDI_Insert* calls and one MIDI_Sort."""
+    _, _, note_count, cc_count, text_count = RPR.MIDI_CountEvts(take_id, 0, 0, 0)
+    calls = [(RPR.MIDI_DeleteTextSysexEvt, (take_id, i)) for i in reversed(range(text_count))]
+    calls += [(RPR.MIDI_DeleteCC, (take_id, i)) for i in reversed(range(cc_count))]
+    calls += [(RPR.MIDI_DeleteNote, (take_id, i)) for i in reversed(range(note_count))]
+    for note in pair_notes(events):
+        calls.append((RPR.MIDI_InsertNote, (
+            take_id, note.selected, note.muted, note.start, note.end, note.channel, note.pitch, note.velocity, True
+        )))
+    for event in events:
+        msg = event.msg
+        if event.is_cc_family:
+            calls.append((RPR.MIDI_InsertCC, (
+                take_id, event.selected, event.muted, event.ppq, event.status, event.channel,
+                msg[1], msg[2] if len(msg) > 2 else 0
+            )))
+        elif msg[:1] == b"\xf0":
+            body = msg[1:-1] if msg[-1:] == b"\xf7" else msg[1:]
+            calls.append((RPR.MIDI_InsertTextSysexEvt, (
+                take_id, event.selected, event.muted, event.ppq, -1, bytes(body).decode("latin-1"), len(body)
+            )))
+        elif msg[:1] == b"\xff" and len(msg) >= 2:
+            body = msg[2:]
+            calls.append((RPR.MIDI_InsertTextSysexEvt, (
+                take_id, event.selected, event.muted, event.ppq, msg[1], bytes(body).decode("latin-1"), len(body)
+            )))
+    calls.append((RPR.MIDI_Sort, (take_id,)))
+    pipeline(calls)
@@ -0,0 +1,283 @@
+import os
+import time
+import inspect
+import threading
+import contextlib
+import reapy
+import reapy.config
+from reapy import reascript_api as RPR
+from reapy.errors import DistError
+from reapy.tools import json
+from reapy.tools.network import machines
+
+# Requests written before their replies are read; large enough to hide latency,
+# small enough that neither side's socket buffer fills while the other waits
+PIPELINE_WINDOW = 64
+
+# Which REAPER to talk to: {"host": ..., "web_interface_port": ...}, overridden
+# by YUNEIFY_REAPER_BACKEND="host:port", e.g. to point CI at modules.fake_reaper
+BACKEND_PATH = os.path.join("config files", "reaper_backend.json")
+BACKEND_ENV = "YUNEIFY_REAPER_BACKEND"
+
+
+class TransportStats:
+    """Request and round-trip counters for measuring distant API overhead."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.round_trips = 0
+        self.seconds = 0.0
+
+    @property
+    def ms_per_request(self):
+        return 1000 * self.seconds / self.requests if self.requests else 0.0
+
+    def __repr__(self):
+        return (f"{self.requests} requests in {self.round_trips} round trips, "
+                f"{self.ms_per_request:.3f} ms per request")
+
+
+class Transport:
+    """One held connection to REAPER's distant API, shared by every Yuneify subsystem.
+
+    session() holds REAPER's server on the persistent reapy connection for a
+    scope (re-entrant, so nested scopes cost nothing), batch() collects
+    calls issued through defer() and sends them together on exit, and
+    pipeline() writes a group of independent requests before reading any
+    reply, so the group costs one round trip instead of one per call.
+
+    Only callables that live in reapy (RPR functions and reapy object
+    methods) can be shipped to REAPER; anything else runs locally in order.
+    Inside REAPER, or without a distant API, every call runs directly.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.pending = None
+        self.stats = TransportStats()
+
+    def _client(self):
+        if reapy.is_inside_reaper():
+            return None
+        client = machines.get_selected_client()
+        if client is not None:
+            self.guard(client)
+        return client
+
+    def guard(self, client):
+        """Make reapy's own requests on client take this transport's lock.
+
+        Calls made straight through reapy (outside session()) then can't
+        interleave with another thread's held session on the same socket.
+        """
+        if getattr(client, "_transport_lock", None) is self.lock:
+            return
+        request = client.request
+
+        def locked_request(*args, **kwargs):
+            with self.lock:
+                return request(*args, **kwargs)
+
+        client.request = locked_request
+        client._transport_lock = self.lock
+
+    def _exchange(self, client, requests):
+        start = time.perf_counter()
+        for request in requests:
+            client.send(json.dumps(request).encode())
+        replies = [json.loads(client.recv(timeout=None).decode()) for _ in requests]
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.requests += len(requests)
+        self.stats.round_trips += 1
+        return replies
+
+    @contextlib.contextmanager
+    def session(self):
+        """Hold the connection for the scope so calls skip REAPER's defer-loop wait."""
+        with self.lock:
+            client = self._client()
+            if self.depth == 0 and client is not None:
+                self._exchange(client, [{"function": "HOLD", "input": None}])
+            self.depth += 1
+            try:
+                yield self
+            finally:
+                self.depth -= 1
+                if self.depth == 0 and client is not None:
+                    self._exchange(client, [{"function": "RELEASE", "input": None}])
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Collect deferred calls and send them as one pipelined group when the scope ends.
+
+        Calls still pending when the scope raises are dropped, not sent.
+        """
+        with self.session():
+            outer = self.pending is None
+            if outer:
+                self.pending = []
+            try:
+                yield self
+                if outer:
+                    self.flush()
+            finally:
+                if outer:
+                    self.pending = None
+
+    def defer(self, func, *args):
+        """Queue a call in the open batch, or make it right away outside one."""
+        if self.pending is None:
+            return self.call(func, *args)
+        self.pending.append((func, args))
+        return None
+
+    def flush(self):
+        """Send the calls queued so far and return their results."""
+        if not self.pending:
+            return []
+        calls, self.pending[:] = list(self.pending), []
+        return self.pipeline(calls)
+
+    def call(self, func, *args):
+        """Make one call after anything already queued, and return its result."""
+        if self.pending:
+            self.flush()
+        return self.pipeline([(func, args)])[0]
+
+    @staticmethod
+    def _remote(func, args):
+        if inspect.ismethod(func):
+            args = (func.__self__,) + tuple(args)
+            func = func.__func__
+        module = getattr(func, "__module__", None) or ""
+        if module == "reapy" or module.startswith("reapy."):
+            return {"function": func, "input": {"args": list(args), "kwargs": {}}}
+        return None
+
+    def pipeline(self, calls):
+        """Run (func, args) calls in order and return their results.
+
+        Consecutive shippable calls are written back to back and their
+        replies read afterwards. The first remote error is raised once every
+        reply of its group has been read, so the connection stays in step.
+        """
+        calls = list(calls)
+        client = self._client()
+        if client is None:
+            return [func(*args) for func, args in calls]
+
+        results = []
+        with self.session():
+            group = []
+            for func, args in calls + [(None, ())]:
+                request = self._remote(func, args) if func is not None else None
+                if request is not None and len(group) < PIPELINE_WINDOW:
+                    group.append(request)
+                    continue
+                if group:
+                    for reply in self._exchange(client, group):
+                        if reply["type"] == "error":
+                            raise DistError(reply["traceback"])
+                        results.append(reply["value"])
+                    group = []
+                if request is not None:
+                    group.append(request)
+                elif func is not None:
+                    results.append(func(*args))
+        return results
+
+
+_transport = Transport()
+
+
+def get_transport():
+    """The transport shared by every Yuneify module in this process."""
+    return _transport
+
+
+def session():
+    """Shorthand for get_transport().session()."""
+    return _transport.session()
+
+
+def batch():
+    """Shorthand for get_transport().batch()."""
+    return _transport.batch()
+
+
+def defer(func, *args):
+    """Shorthand for get_transport().defer()."""
+    return _transport.defer(func, *args)
+
+
+def pipeline(calls):
+    """Shorthand for get_transport().pipeline()."""
+    return _transport.pipeline(calls)
+
+
+def load_backend():
+    """(host, web interface port) of the configured REAPER, or None for reapy's default."""
+    setting = os.environ.get(BACKEND_ENV)
+    if setting:
+        host, _, port = setting.rpartition(":")
+        return host or "localhost", int(port)
+    if os.path.exists(BACKEND_PATH):
+        with open(BACKEND_PATH, "r") as f:
+            backend = json.loads(f.read())
+        return backend.get("host", "localhost"), int(backend.get("web_interface_port", reapy.config.WEB_INTERFACE_PORT))
+    return None
+
+
+def connect_backend(host=None, web_interface_port=None):
+    """Connect reapy to the configured REAPER (or to host:web_interface_port).
+
+    Does nothing when no backend is configured or when running inside REAPER.
+    """
+    if host is None:
+        backend = load_backend()
+        if backend is None or reapy.is_inside_reaper():
+            return False
+        host, web_interface_port = backend
+    if web_interface_port is not None:
+        reapy.config.WEB_INTERFACE_PORT = web_interface_port
+    # Drop a client registered on another port so the host is looked up again
+    machines.CLIENTS.pop(host, None)
+    reapy.connect(host)
+    # reapy.FX caches the TrackFX_/TakeFX_ functions that existed at import time
+    reapy.FX.functions = {
+        prefix: {name[len(prefix):]: func for name, func in vars(RPR).items() if name.startswith(prefix)}
+        for prefix in ("TrackFX_", "TakeFX_")
+    }
+    client = machines.get_selected_client()
+    if client is not None:
+        _transport.guard(client)
+    return client is not None
+
+
+def measure_overhead(count=200):
+    """Time count cheap API calls made one by one, in a held session and pipelined.
+
+    Returns milliseconds per call for each mode, to compare distant API
+    overhead before and after routing calls through the transport.
+    """
+    results = {}
+
+    start = time.perf_counter()
+    for _ in range(count):
+        RPR.GetPlayState()
+    results["unheld"] = 1000 * (time.perf_counter() - start) / count
+
+    with session():
+        start = time.perf_counter()
+        for _ in range(count):
+            RPR.GetPlayState()
+        results["held"] = 1000 * (time.perf_counter() - start) / count
+
+        start = time.perf_counter()
+        pipeline([(RPR.GetPlayState, ())] * count)
+        results["pipelined"] = 1000 * (time.perf_counter() - start) / count
+    return results
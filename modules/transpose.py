@@ -0,0 +1,63 @@
+import numpy as np
+
+# Scale intervals from the root, None meaning plain chromatic movement
+SCALES = {
+    "Chromatic": None,
+    "Major": (0, 2, 4, 5, 7, 9, 11),
+    "Minor": (0, 2, 3, 5, 7, 8, 10),
+    "Harmonic Minor": (0, 2, 3, 5, 7, 8, 11),
+    "Dorian": (0, 2, 3, 5, 7, 9, 10),
+    "Mixolydian": (0, 2, 4, 5, 7, 9, 10),
+    "Major Pentatonic": (0, 2, 4, 7, 9),
+    "Minor Pentatonic": (0, 3, 5, 7, 10),
+}
+
+# How pitches that leave the 0-127 range are handled
+EDGE_MODES = ("clamp", "fold", "skip")
+
+
+def apply_edge(original, shifted, edge="clamp"):
+    """Bring shifted pitches back into 0-127.
+
+    clamp pins them to the range edge, fold moves them by whole octaves until
+    they fit, skip leaves those notes at their original pitch.
+    """
+    shifted = np.asarray(shifted, dtype=np.int64)
+    if edge == "fold":
+        above = shifted > 127
+        shifted[above] -= 12 * np.ceil((shifted[above] - 127) / 12).astype(np.int64)
+        below = shifted < 0
+        shifted[below] += 12 * np.ceil(-shifted[below] / 12).astype(np.int64)
+        return shifted
+    if edge == "skip":
+        out_of_range = (shifted < 0) | (shifted > 127)
+        return np.where(out_of_range, original, shifted)
+    return np.clip(shifted, 0, 127)
+
+
+def transpose_pitches(pitches, amount, scale=None, root=0, edge="clamp"):
+    """Transpose an array of pitches.
+
+    Without a scale, amount is in semitones. With a scale (a name from SCALES or
+    a tuple of intervals), amount counts scale degrees relative to root, and
+    notes outside the scale keep their chromatic offset from the degree below.
+    """
+    if isinstance(scale, str):
+        scale = SCALES[scale]
+    pitches = np.asarray(pitches, dtype=np.int64)
+    if scale is None:
+        return apply_edge(pitches, pitches + amount, edge)
+
+    degrees = np.asarray(scale, dtype=np.int64)
+    octave, pitch_class = np.divmod(pitches - root, 12)
+    degree = np.searchsorted(degrees, pitch_class, side="right") - 1
+    offset = pitch_class - degrees[degree]
+    new_octave, new_degree = np.divmod(octave * len(degrees) + degree + amount, len(degrees))
+    shifted = root + new_octave * 12 + degrees[new_degree] + offset
+    return apply_edge(pitches, shifted, edge)
+
+
+def invert_pitches(pitches, center=60, edge="clamp"):
+    """Mirror pitches around a center pitch."""
+    pitches = np.asarray(pitches, dtype=np.int64)
+    return apply_edge(pitches, 2 * center - pitches, edge)
@@ -0,0 +1,161 @@
+import numpy as np
+from reapy import reascript_api as RPR
+from modules.take_buffer import NOTE_ON, FLAG_SELECTED, TakeBuffer
+from modules.transport import pipeline
+
+
+def _note_on_velocities(events):
+    """(velocities, selected) arrays of the note-ons in (ppq, flags, msg) event tuples"""
+    velocities, selected = [], []
+    for _, flags, msg in events:
+        if len(msg) > 2 and msg[0] & 0xF0 == NOTE_ON and msg[2]:
+            velocities.append(msg[2])
+            selected.append(bool(flags & FLAG_SELECTED))
+    return np.array(velocities, dtype=np.int64), np.array(selected, dtype=bool)
+
+
+class VelocityHistogram:
+    """128-bin velocity histogram with O(1) count, min, max, median and percentiles."""
+
+    def __init__(self, counts=None):
+        self.counts = np.zeros(128, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_velocities(cls, velocities):
+        return cls(np.bincount(np.asarray(velocities, dtype=np.int64), minlength=128)[:128])
+
+    def add(self, velocities, sign=1):
+        np.add.at(self.counts, np.asarray(velocities, dtype=np.int64), sign)
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    @property
+    def min(self):
+        used = np.flatnonzero(self.counts)
+        return int(used[0]) if len(used) else None
+
+    @property
+    def max(self):
+        used = np.flatnonzero(self.counts)
+        return int(used[-1]) if len(used) else None
+
+    @property
+    def mean(self):
+        count = len(self)
+        return float(self.counts @ np.arange(128)) / count if count else None
+
+    def percentile(self, q):
+        """Velocity at percentile q (0..100), interpolated like numpy.percentile"""
+        count = len(self)
+        if not count:
+            return None
+        cumulative = np.cumsum(self.counts)
+        position = q / 100 * (count - 1)
+        lower, upper = np.searchsorted(cumulative, [np.floor(position) + 1, np.ceil(position) + 1])
+        return float(lower + (upper - lower) * (position - np.floor(position)))
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+
+class VelocityStats:
+    """Velocity histograms of all notes and of the selected notes of one take."""
+
+    def __init__(self, all_notes=None, selected=None):
+        self.all = all_notes if all_notes is not None else VelocityHistogram()
+        self.selected = selected if selected is not None else VelocityHistogram()
+
+    @classmethod
+    def from_events(cls, events):
+        velocities, selected = _note_on_velocities(events)
+        return cls(VelocityHistogram.from_velocities(velocities),
+                   VelocityHistogram.from_velocities(velocities[selected]))
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls.from_events((event.ppq, event.flags, event.msg) for event in buffer.events)
+
+    def update(self, removed, added):
+        """Apply a (removed, added) event diff as recorded by the edit journal"""
+        for events, sign in ((removed, -1), (added, 1)):
+            velocities, selected = _note_on_velocities(events)
+            self.all.add(velocities, sign)
+            self.selected.add(velocities[selected], sign)
+
+    def histogram(self, selected_only=False):
+        return self.selected if selected_only else self.all
+
+
+def take_state(take_id):
+    """REAPER's hash of a take's notes, which changes whenever the notes do"""
+    return RPR.MIDI_GetHash(take_id, True, "", 64)[3]
+
+
+def take_states(take_ids):
+    """take_state() of several takes in one pipelined round trip, by take id"""
+    take_ids = list(take_ids)
+    hashes = pipeline([(RPR.MIDI_GetHash, (take_id, True, "", 64)) for take_id in take_ids])
+    return {take_id: result[3] for take_id, result in zip(take_ids, hashes)}
+
+
+class VelocityStatsCache:
+    """Per-take velocity statistics, keyed by take and the take's note hash.
+
+    A lookup costs one hash call instead of reading every note. Edits made
+    through MidiEditTransaction update cached takes from their event diffs,
+    so only takes edited elsewhere are read again.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, take, buffer=None):
+        """VelocityStats of a take; buffer, if given, saves the read on a cache miss"""
+        take_id = take.id if hasattr(take, "id") else take
+        state = take_state(take_id)
+        entry = self.entries.get(take_id)
+        if entry is not None and entry[0] == state:
+            return entry[1]
+        stats = VelocityStats.from_buffer(buffer if buffer is not None else TakeBuffer.read(take_id))
+        self.entries[take_id] = (state, stats)
+        return stats
+
+    def __contains__(self, take_id):
+        return take_id in self.entries
+
+    def update(self, take_id, removed, added, before):
+        """Apply an edit diff to a cached take and re-key it to the take's new state
+
+        before is the take's state just ahead of the edit; when it is not the
+        state the stats were cached for, the take changed outside Yuneify and
+        the entry is dropped instead.
+        """
+        entry = self.entries.get(take_id)
+        if entry is None:
+            return
+        if entry[0] != before:
+            del self.entries[take_id]
+            return
+        stats = entry[1]
+        stats.update(removed, added)
+        if (stats.all.counts < 0).any() or (stats.selected.counts < 0).any():
+            # The take changed outside Yuneify before this edit, so rebuild on next use
+            del self.entries[take_id]
+            return
+        self.entries[take_id] = (take_state(take_id), stats)
+
+    def invalidate(self, take_id=None):
+        if take_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(take_id, None)
+
+
+_cache = VelocityStatsCache()
+
+
+def get_velocity_cache():
+    """The velocity statistics cache shared by every Yuneify MIDI operation"""
+    return _cache
@@ -0,0 +1,20 @@
+import pytest
+
+# Ports one above the fake REAPER's defaults, so a running one is left alone
+SERVER_PORT = 2336
+WEB_INTERFACE_PORT = 2337
+
+
+@pytest.fixture(scope="session")
+def reaper():
+    """A fake REAPER with the demo project, connected to through reapy's distant API"""
+    from modules.fake_reaper.server import spawn
+    from modules.transport import connect_backend
+    server = spawn(SERVER_PORT, WEB_INTERFACE_PORT)
+    try:
+        assert connect_backend("localhost", WEB_INTERFACE_PORT)
+        from reapy import reascript_api as RPR
+        yield RPR
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from modules.event_query import EventTable, compile_query
+
+
+def table(**columns):
+    count = len(next(iter(columns.values())))
+    full = {name: np.full(count, np.nan) for name in (
+        "kind", "ppq", "beat", "channel", "pitch", "velocity", "length",
+        "cc", "program", "pb", "value", "selected", "muted"
+    )}
+    full.update({name: np.asarray(values, dtype=np.float64) for name, values in columns.items()})
+    return EventTable(full, [()] * count)
+
+
+@pytest.mark.parametrize("query", [
+    "pitch in _span(x.__class__, 127)",
+    "pitch in _span(().__class__.__base__, 127)",
+    "pitch in _span(open(0), 127)",
+    "pitch in _span(1, 2, 3)",
+    "pitch in _span(1, high=2)",
+])
+def test_range_bounds_are_whitelisted(query):
+    compile_query.cache_clear()
+    with pytest.raises(ValueError):
+        compile_query(query)
+
+
+def test_range_bound_can_be_a_column():
+    evaluate = compile_query("pitch in _span(vel, 127)")
+    mask = evaluate(table(kind=[0, 0, 0], pitch=[60, 40, 90], velocity=[50, 50, 100]))
+    assert mask.tolist() == [True, False, False]
+
+
+def test_span_syntax_still_works():
+    evaluate = compile_query("note and pitch in C3..C4")
+    mask = evaluate(table(kind=[0, 0, 1], pitch=[48, 72, 50]))
+    assert mask.tolist() == [True, False, False]
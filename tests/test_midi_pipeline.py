@@ -0,0 +1,32 @@
+import pytest
+from modules.midi_pipeline import Pipeline, Transform, Quantize, Humanize
+
+
+def test_parse_builds_steps():
+    pipeline = Pipeline.parse("quantize(1/16, strength=0.5) | humanize(timing=8, vel=-6, distribution='gaussian')")
+    assert [type(step) for step in pipeline.steps] == [Quantize, Humanize]
+    assert pipeline.steps[0].params["grid"] == 1 / 16
+    assert pipeline.steps[1].params["vel"] == -6
+
+
+@pytest.mark.parametrize("text", [
+    "().__class__.__base__.__subclasses__()",
+    "quantize(().__class__)",
+    "quantize(grid=open('x'))",
+    "__import__('os').system('true')",
+    "quantize(1/16) | humanize(**{'timing': 8})",
+    "quantize(1/0)",
+    "quantize(spacing=2)",
+    "quantize(1/16",
+])
+def test_parse_rejects_anything_else(text):
+    with pytest.raises(ValueError):
+        Pipeline.parse(text)
+
+
+def test_step_without_apply_fails_when_created():
+    class Unfinished(Transform):
+        op = "unfinished"
+
+    with pytest.raises(TypeError):
+        Unfinished()
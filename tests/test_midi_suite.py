@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6")
+
+from modules.note_table import NoteTable
+from modules.quantize import GRID_VALUES, GrooveTemplate, QuantizeGrid
+from modules.take_buffer import TakeBuffer
+
+
+def test_groove_grid_wins_over_the_grid_combobox(reaper):
+    from modules.CWheel_func.MIDI_Suite import MidiNoteQuantizer
+
+    item = reaper.GetMediaItem(0, 2)
+    reaper.SelectAllMediaItems(0, False)
+    reaper.SetMediaItemSelected(item, True)
+    take = reaper.GetActiveTake(item)
+
+    quantizer = MidiNoteQuantizer()
+    # A straight 1/8 groove: no offsets, no accents
+    quantizer.groove = GrooveTemplate(GRID_VALUES["1/8"], np.zeros(8))
+    quantizer.run(GRID_VALUES["1/16"], strength=1.0, use_groove=True)
+
+    table = NoteTable.from_buffer(TakeBuffer.read(take))
+    eighths = QuantizeGrid.from_take(take, GRID_VALUES["1/8"], table.start.min(), table.end.max())
+    assert np.isin(table.start, eighths.lines).all()
@@ -0,0 +1,41 @@
+from modules.edit_transaction import MidiEditTransaction
+from modules.velocity_stats import VelocityStats, get_velocity_cache, take_state
+from modules.take_buffer import TakeBuffer
+
+
+def first_take(RPR, index=0):
+    return RPR.GetActiveTake(RPR.GetMediaItem(0, index))
+
+
+def scale_velocities(take, factor):
+    with MidiEditTransaction("Scale Velocities") as txn:
+        buffer = txn.open(take)
+        for note in buffer.notes:
+            note.velocity = note.velocity * factor
+
+
+def test_transaction_updates_cached_stats(reaper):
+    take = first_take(reaper, 0)
+    cache = get_velocity_cache()
+    cache.get(take)
+    scale_velocities(take, 0.5)
+    assert take in cache
+    assert cache.entries[take][0] == take_state(take)
+    expected = VelocityStats.from_buffer(TakeBuffer.read(take))
+    assert (cache.get(take).all.counts == expected.all.counts).all()
+
+
+def test_take_edited_outside_between_caching_and_transaction(reaper):
+    take = first_take(reaper, 1)
+    cache = get_velocity_cache()
+    cache.get(take)
+    # Edited outside Yuneify to a velocity the take already has, so the
+    # stale diff cannot drive any count negative
+    notes = TakeBuffer.read(take).notes
+    other = next(note.velocity for note in notes if note.velocity != notes[0].velocity)
+    reaper.MIDI_SetNote(take, 0, notes[0].selected, notes[0].muted, notes[0].start, notes[0].end,
+                        notes[0].channel, notes[0].pitch, other, False)
+    scale_velocities(take, 0.5)
+    assert take not in cache
+    expected = VelocityStats.from_buffer(TakeBuffer.read(take))
+    assert (cache.get(take).all.counts == expected.all.counts).all()